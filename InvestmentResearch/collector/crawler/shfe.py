@@ -3,48 +3,52 @@
 __author__ = 'Bruce Frank Wong'
 
 
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, List, Optional, Tuple, Union, Any
 import datetime as dt
 from pathlib import Path
 import zipfile
 import json
 
-import peewee
 import requests
 from lxml import etree
 
 from ...utility import CONFIGS, PACKAGE_PATH
-from ...database.model import Country, Holiday, Exchange, FuturesProduct, FuturesContract
+from ...trading_calendar import trading_calendar
+from ...database.model import Country, Exchange, FuturesProduct, FuturesContract
 from ...database.model.quote import FuturesQuoteDaily
+from ...database.reference import reference
 
 
-try:
-    exchange_shfe = Exchange.get(Exchange.symbol == 'SHFE')
-except peewee.OperationalError:
+def get_exchange_shfe() -> Exchange:
+    """
+    Exchange of SHFE, created with Country of China if not existed.
+    Called by crawlers when needed, rather than at import.
+
+    :return: Exchange.
+    """
+    Country.create_table()
     Exchange.create_table()
-    try:
-        country = Country.get(Country.alpha3 == 'CHN')
-    except peewee.OperationalError:
-        Country.create_table()
-        country = Country(
-            name_zh='中国',
-            name_en='China',
-            fullname_zh='中华人民共和国',
-            fullname_en="People's Republic of China",
-            alpha2='CN',
-            alpha3='CHN',
-            numeric='156'
-        )
-        country.save()
-    finally:
-        exchange_shfe = Exchange(
-            symbol='SHFE',
-            name='上期所',
-            fullname='上海期货交易所',
-            url='http://www.shfe.com.cn/',
-            country=Country.get(Country.alpha3 == 'CHN')
-        )
-        exchange_shfe.save()
+    country, _ = Country.get_or_create(
+        alpha3='CHN',
+        defaults={
+            'name_zh': '中国',
+            'name_en': 'China',
+            'fullname_zh': '中华人民共和国',
+            'fullname_en': "People's Republic of China",
+            'alpha2': 'CN',
+            'numeric': '156',
+        }
+    )
+    exchange, _ = Exchange.get_or_create(
+        symbol='SHFE',
+        defaults={
+            'name': '上期所',
+            'fullname': '上海期货交易所',
+            'url': 'http://www.shfe.com.cn/',
+            'country': country,
+        }
+    )
+    return exchange
 
 
 def handle_date_list(data_begin: dt.date, day: Optional[Union[dt.date, List[dt.date]]] = None) -> List[dt.date]:
@@ -63,13 +67,7 @@ def handle_date_list(data_begin: dt.date, day: Optional[Union[dt.date, List[dt.d
                 if d >= data_begin:
                     result.append(d)
     else:
-        result = []
-        country: Country = Country.get(Country.alpha3 == 'CHN')
-        holiday_list: List[dt.date] = Holiday.select().where(Holiday.country == country)
-        for x in range((dt.date.today() - data_begin).days + 1):
-            d = data_begin + dt.timedelta(days=x)
-            if d not in holiday_list:
-                result.append(d)
+        result = trading_calendar('SHFE').trading_day_list(data_begin, dt.date.today())
     return result
 
 
@@ -103,7 +101,7 @@ def get_contract_from_shfe(day: Optional[Union[dt.date, List[dt.date]]] = None):
                 f'Basis price: {float(item["BASISPRICE"])}, '
             )
             # product, _ = FuturesProduct.get_or_create(
-            #     crawler=exchange_shfe,
+            #     crawler=get_exchange_shfe(),
             #     symbol=item['INSTRUMENTID'][:2],
             #     delivery_month=item['INSTRUMENTID'][3:],
             #     defaults={
@@ -120,28 +118,7 @@ def get_contract_from_shfe(day: Optional[Union[dt.date, List[dt.date]]] = None):
 def get_futures_info_from_shfe(day: Optional[Union[dt.date, List[dt.date]]] = None):
     data_begin: dt.date = dt.date.fromisoformat('2002-01-07')
 
-    download_list: List[dt.date]
-    if day is not None:
-        if isinstance(day, dt.date):
-            if day < data_begin:
-                raise ValueError(
-                    f'SHFE could not provide data before {data_begin}, so <year> should not less than {data_begin}.'
-                )
-            else:
-                download_list = [day]
-        else:
-            download_list = []
-            for d in day:
-                if d >= data_begin:
-                    download_list.append(d)
-    else:
-        download_list = []
-        country: Country = Country.get(Country.alpha3 == 'CHN')
-        holiday_list: List[dt.date] = Holiday.select().where(Holiday.country == country)
-        for x in range((dt.date.today() - data_begin).days + 1):
-            d = data_begin + dt.timedelta(days=x)
-            if d not in holiday_list:
-                download_list.append(d)
+    download_list: List[dt.date] = handle_date_list(data_begin, day)
     print(download_list)
 
     result: List[FuturesQuoteDaily] = []
@@ -151,7 +128,7 @@ def get_futures_info_from_shfe(day: Optional[Union[dt.date, List[dt.date]]] = No
 
     url: str = 'http://www.shfe.com.cn/data/dailydata/kx/kx{date}.dat'
 
-    exchange = Exchange.get(Exchange.symbol == 'SHFE')
+    exchange = get_exchange_shfe()
 
     product_skip_list: List[str] = [
         'sc_tas',
@@ -163,29 +140,31 @@ def get_futures_info_from_shfe(day: Optional[Union[dt.date, List[dt.date]]] = No
     if response.status_code == 200:
         print('data got.')
         data: dict = json.loads(response.text)
+        product_list: List[Dict[str, Any]] = []
+        contract_list: List[Tuple[str, str]] = []
         for item in data['o_curinstrument']:
-            print(item)
             product_id = item['PRODUCTGROUPID'].strip()
             if len(product_id) == 0 or product_id in product_skip_list:
                 continue
-            product, _ = FuturesProduct.get_or_create(
-                exchange=exchange,
-                symbol=product_id,
-                defaults={
+            product_list.append(
+                {
+                    'exchange': exchange.id,
+                    'symbol': product_id,
                     'name_zh': item['PRODUCTNAME'].strip(),
                 }
             )
-            print(product, type(product), _)
 
             delivery_month = item['DELIVERYMONTH'].strip()
             if delivery_month in delivery_skip_list:
                 continue
-            print(delivery_month)
-            contract, _ = FuturesContract.get_or_create(
-                product=product,
-                delivery_month=delivery_month,
-            )
-            print(contract, type(contract), _)
+            contract_list.append((product_id, delivery_month))
+
+        # Missing products and contracts are inserted in batches, others are found in the cache.
+        product_map: Dict[str, int] = reference.ensure('futures_product', product_list)
+        reference.ensure(
+            'futures_contract',
+            [{'product': product_map[product_id], 'delivery_month': month} for product_id, month in contract_list]
+        )
         # for k, v in data['o_curinstrument'][0].items():
         #     print(k, v)
 
@@ -10,12 +10,45 @@ from .definition import (
     TdxRecordTypeEnum,
 )
 
+from .bar import (
+    Bar,
+    MinuteBar,
+    BarSeries,
+)
+
 from .quote import (
     show_quote,
     read_quote,
+    read_quote_chunks,
+    map_quote,
+)
+
+from .incremental import (
+    TdxQuoteCheckpoint,
+    read_quote_incremental,
+)
+
+from .market import (
+    scan_quote,
+    read_market,
+)
+
+from .cache import (
+    TdxQuoteCache,
+    read_quote_cached,
+)
+
+from .index import (
+    TdxQuoteFile,
+    open_index,
+    build_index,
+    changed_since,
+    symbols_on,
 )
 
 from .record import (
     show_record,
+    iter_record,
     read_record,
+    read_record_dataframe,
 )
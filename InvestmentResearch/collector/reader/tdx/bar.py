@@ -0,0 +1,158 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Dict, Iterator, NamedTuple, Union
+import datetime as dt
+
+import numpy as np
+
+from .definition import TdxPeriodEnum
+
+
+# The proleptic Gregorian ordinal of 1970-01-01, the epoch of datetime64.
+EPOCH_ORDINAL: int = 719163
+
+
+class Bar(NamedTuple):
+    """
+    Daily bar, prices are integers in 1 / PRICE_SCALE, as stored in TDX *.day files.
+    """
+    date: int           # proleptic Gregorian ordinal, dt.date.fromordinal(date)
+    open: int
+    high: int
+    low: int
+    close: int
+    amount: float
+    volume: int
+
+    PRICE_SCALE = 100
+
+    @property
+    def day(self) -> dt.date:
+        return dt.date.fromordinal(self.date)
+
+
+class MinuteBar(NamedTuple):
+    """
+    Minute bar, prices are integers in 1 / PRICE_SCALE.
+    """
+    datetime: int       # minutes since 1970-01-01 00:00, np.datetime64(datetime, 'm')
+    open: int
+    high: int
+    low: int
+    close: int
+    amount: float
+    volume: int
+
+    PRICE_SCALE = 1000
+
+    @property
+    def moment(self) -> dt.datetime:
+        return dt.datetime(1970, 1, 1) + dt.timedelta(minutes=self.datetime)
+
+
+BAR_DTYPE: np.dtype = np.dtype(
+    [
+        ('date', '<i4'),
+        ('open', '<i4'),
+        ('high', '<i4'),
+        ('low', '<i4'),
+        ('close', '<i4'),
+        ('amount', '<f8'),
+        ('volume', '<i8'),
+    ]
+)
+
+MINUTE_BAR_DTYPE: np.dtype = np.dtype(
+    [
+        ('datetime', '<i8'),
+        ('open', '<i4'),
+        ('high', '<i4'),
+        ('low', '<i4'),
+        ('close', '<i4'),
+        ('amount', '<f8'),
+        ('volume', '<i8'),
+    ]
+)
+
+
+class BarSeries:
+    """
+    Series of Bar or MinuteBar, backed by a structured array.
+    Slicing returns a BarSeries sharing the same array, indexing returns a Bar or MinuteBar.
+    """
+    _data: np.ndarray
+    _bar_type: type
+
+    def __init__(self, data: np.ndarray) -> None:
+        if data.dtype == BAR_DTYPE:
+            self._bar_type = Bar
+        elif data.dtype == MINUTE_BAR_DTYPE:
+            self._bar_type = MinuteBar
+        else:
+            raise ValueError(f'dtype of BarSeries should be BAR_DTYPE or MINUTE_BAR_DTYPE, got {data.dtype}.')
+        self._data = data
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._data
+
+    @property
+    def bar_type(self) -> type:
+        return self._bar_type
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Bar, MinuteBar, 'BarSeries']:
+        if isinstance(item, slice):
+            return BarSeries(self._data[item])
+        return self._bar_type._make(self._data[item].tolist())
+
+    def __iter__(self) -> Iterator[Union[Bar, MinuteBar]]:
+        return map(self._bar_type._make, self._data.tolist())
+
+    def __repr__(self) -> str:
+        return f'<BarSeries(bar_type={self._bar_type.__name__}, length={len(self._data)})>'
+
+    def to_numpy(self) -> Dict[str, np.ndarray]:
+        """
+        Columns as the Numpy result of read_quote.
+        """
+        scale: int = self._bar_type.PRICE_SCALE
+        column: Dict[str, np.ndarray] = {}
+        if self._bar_type is Bar:
+            column['date'] = (self._data['date'] - EPOCH_ORDINAL).astype('datetime64[D]')
+        else:
+            column['datetime'] = self._data['datetime'].astype('datetime64[m]')
+        for name in ('open', 'high', 'low', 'close'):
+            column[name] = self._data[name] / scale
+        column['amount'] = self._data['amount'].copy()
+        column['volume'] = self._data['volume'].copy()
+        return column
+
+
+def to_bar_series(column: Dict[str, np.ndarray], period: TdxPeriodEnum) -> BarSeries:
+    """
+    Convert decoded columns of read_quote to BarSeries.
+
+    :param column: Dict[str, np.ndarray], the Numpy result of read_quote.
+    :param period: TdxPeriodEnum.
+    :return: BarSeries.
+    """
+    data: np.ndarray
+    if period == TdxPeriodEnum.Day:
+        data = np.empty(len(column['date']), dtype=BAR_DTYPE)
+        data['date'] = column['date'].astype(np.int64) + EPOCH_ORDINAL
+        scale: int = Bar.PRICE_SCALE
+    else:
+        data = np.empty(len(column['datetime']), dtype=MINUTE_BAR_DTYPE)
+        data['datetime'] = column['datetime'].astype(np.int64)
+        scale = MinuteBar.PRICE_SCALE
+    for name in ('open', 'high', 'low', 'close'):
+        data[name] = np.rint(column[name] * scale)
+    data['amount'] = column['amount']
+    data['volume'] = column['volume']
+    return BarSeries(data)
@@ -0,0 +1,136 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Dict, List, Optional, Union
+from pathlib import Path
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from InvestmentResearch.utility import CONFIGS, PACKAGE_PATH
+from .definition import TdxExchangeEnum, TdxPeriodEnum, TdxQuoteTypeEnum
+from .quote import _quote_file, _record_dtype, _map_file, _decode_as_numpy
+
+
+# 2 GB.
+CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+
+class TdxQuoteCache:
+    """
+    Cache of decoded TDX quotes, one *.npz file of column arrays per quote file.
+
+    Cache files are named <digest of source path>-<digest of size and mtime>.npz,
+    so a changed source file misses the cache, and its stale entry is removed on the next write.
+    The least recently used entries are evicted when the total size exceeds <max_bytes>.
+    """
+    _cache_path: Path
+    _max_bytes: int
+
+    def __init__(self, cache_path: Optional[Path] = None, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        if cache_path is None:
+            cache_path = PACKAGE_PATH.joinpath(CONFIGS['path']['data_downloaded'], 'tdx_cache')
+        self._cache_path = cache_path
+        self._max_bytes = max_bytes
+
+    @property
+    def cache_path(self) -> Path:
+        return self._cache_path
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    def _entry(self, quote_file: Path, period: TdxPeriodEnum) -> Path:
+        stat: os.stat_result = quote_file.stat()
+        return self._cache_path.joinpath(
+            f'{_digest(str(quote_file.resolve()))}-'
+            f'{_digest(f"{period.name}|{stat.st_size}|{stat.st_mtime_ns}")}.npz'
+        )
+
+    def get(self, quote_file: Path, period: TdxPeriodEnum) -> Dict[str, np.ndarray]:
+        """
+        Get decoded columns of <quote_file>, from the cache if it is still valid.
+
+        :param quote_file: Path.
+        :param period: TdxPeriodEnum.
+        :return: Dict[str, np.ndarray] of columns.
+        """
+        entry: Path = self._entry(quote_file, period)
+        if entry.exists():
+            os.utime(entry)
+            with np.load(entry, allow_pickle=False) as npz:
+                return {name: npz[name] for name in npz.files}
+
+        column: Dict[str, np.ndarray] = _decode_as_numpy(_map_file(quote_file, _record_dtype(period)), period)
+        self._cache_path.mkdir(parents=True, exist_ok=True)
+        for stale in self._cache_path.glob(f'{entry.name.split("-")[0]}-*.npz'):
+            stale.unlink()
+        temporary: Path = entry.with_suffix('.tmp')
+        with open(temporary, 'wb') as f:
+            np.savez(f, **column)
+        os.replace(temporary, entry)
+        self.evict()
+        return column
+
+    def invalidate(self, quote_file: Optional[Path] = None) -> None:
+        """
+        Remove the cache of <quote_file>, or all caches if None.
+        """
+        if not self._cache_path.exists():
+            return
+        pattern: str = '*.npz' if quote_file is None else f'{_digest(str(quote_file.resolve()))}-*.npz'
+        for entry in self._cache_path.glob(pattern):
+            entry.unlink()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries, until the total size is within <max_bytes>.
+        """
+        entry_list: List[os.DirEntry] = sorted(
+            (entry for entry in os.scandir(self._cache_path) if entry.name.endswith('.npz')),
+            key=lambda x: x.stat().st_mtime_ns
+        )
+        total: int = sum(entry.stat().st_size for entry in entry_list)
+        for entry in entry_list:
+            if total <= self._max_bytes:
+                break
+            total -= entry.stat().st_size
+            os.unlink(entry.path)
+
+
+def read_quote_cached(
+        exchange: TdxExchangeEnum,
+        symbol: str,
+        period: TdxPeriodEnum,
+        result_type: TdxQuoteTypeEnum = TdxQuoteTypeEnum.Dataframe,
+        cache: Optional[TdxQuoteCache] = None
+) -> Union[Dict[str, np.ndarray], pd.DataFrame]:
+    """
+    Read quote files of TDX, served from TdxQuoteCache if the file is unchanged.
+
+    :param exchange: TdxExchangeEnum.
+    :param symbol: str, symbol without prefix, e.g. '600000'.
+    :param period: TdxPeriodEnum.
+    :param result_type: TdxQuoteTypeEnum, Dataframe or Numpy.
+    :param cache: TdxQuoteCache, None means the default one under CONFIGS['path']['data_downloaded'].
+    :return: pd.DataFrame, for Dataframe; Dict[str, np.ndarray] of columns, for Numpy.
+    """
+    if result_type not in (TdxQuoteTypeEnum.Dataframe, TdxQuoteTypeEnum.Numpy):
+        raise ValueError(
+            f'read_quote_cached only supports {TdxQuoteTypeEnum.Dataframe} and {TdxQuoteTypeEnum.Numpy}.'
+        )
+    if cache is None:
+        cache = TdxQuoteCache()
+    column: Dict[str, np.ndarray] = cache.get(_quote_file(exchange, symbol, period), period)
+    if result_type == TdxQuoteTypeEnum.Numpy:
+        return column
+    return pd.DataFrame(column)
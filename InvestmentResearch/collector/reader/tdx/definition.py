@@ -81,6 +81,8 @@ class TdxQuoteTypeEnum(Enum):
     Dict = 'Dict'
     Tuple = 'Tuple'
     Dataframe = 'Dataframe'
+    Numpy = 'Numpy'     # Dict[str, np.ndarray]，按列存放
+    Record = 'Record'   # BarSeries，元素为 Bar 或 MinuteBar
 
     def __repr__(self) -> str:
         return f'<TdxQuoteTypeEnum(value={self.value})>'
@@ -0,0 +1,130 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Any, Dict, Optional, Tuple
+from pathlib import Path
+import os
+
+import numpy as np
+
+from InvestmentResearch.utility import CONFIG_PATH, load_json, save_json
+from .definition import TdxExchangeEnum, TdxPeriodEnum, TdxQuoteTypeEnum
+from .quote import _quote_file, _record_dtype, _map_file, _format_record
+
+
+CHECKPOINT_FILE: Path = CONFIG_PATH.joinpath('tdx_checkpoint.json')
+
+
+class TdxQuoteCheckpoint:
+    """
+    Checkpoints of TDX quote files, persisted in a JSON file.
+
+    A checkpoint records, for each quote file, the byte offset already read,
+    the size and mtime of the file at that time, and the first and the last record read,
+    which are used to detect truncated or rewritten files.
+    """
+    _checkpoint_file: Path
+    _checkpoint: Dict[str, Dict[str, Any]]
+
+    def __init__(self, checkpoint_file: Optional[Path] = None) -> None:
+        self._checkpoint_file = CHECKPOINT_FILE if checkpoint_file is None else checkpoint_file
+        if self._checkpoint_file.exists():
+            self._checkpoint = load_json(self._checkpoint_file)
+        else:
+            self._checkpoint = {}
+
+    @property
+    def checkpoint_file(self) -> Path:
+        return self._checkpoint_file
+
+    def get(self, quote_file: Path) -> Optional[Dict[str, Any]]:
+        return self._checkpoint.get(str(quote_file))
+
+    def reset(self, quote_file: Optional[Path] = None) -> None:
+        """
+        Forget the checkpoint of <quote_file>, or of all files if None.
+        """
+        if quote_file is None:
+            self._checkpoint.clear()
+        else:
+            self._checkpoint.pop(str(quote_file), None)
+        self.save()
+
+    def save(self) -> None:
+        """
+        Write to a temporary file, then replace the checkpoint file,
+        so that an interrupted write does not corrupt checkpoints of other files.
+        """
+        temporary_file: Path = self._checkpoint_file.with_name(f'{self._checkpoint_file.name}.tmp')
+        save_json(self._checkpoint, temporary_file)
+        os.replace(temporary_file, self._checkpoint_file)
+
+    def read(self, quote_file: Path, dtype: np.dtype) -> Tuple[np.ndarray, bool]:
+        """
+        Read records appended to <quote_file> since the last call.
+
+        :param quote_file: Path.
+        :param dtype: np.dtype, the layout of records.
+        :return: Tuple[np.ndarray, bool], the records, and whether they are the full history.
+        """
+        stat: os.stat_result = quote_file.stat()
+        checkpoint: Optional[Dict[str, Any]] = self.get(quote_file)
+        if checkpoint is not None and \
+                checkpoint['size'] == stat.st_size and \
+                checkpoint['mtime'] == stat.st_mtime_ns:
+            return np.empty(0, dtype=dtype), False
+
+        record: np.ndarray = _map_file(quote_file, dtype)
+        offset: int = 0 if checkpoint is None else checkpoint['offset'] // dtype.itemsize
+        if 0 < offset <= len(record) and \
+                record[:1].tobytes().hex() == checkpoint['first'] and \
+                record[offset - 1:offset].tobytes().hex() == checkpoint['last']:
+            is_full = False
+        else:
+            # Never read, truncated or rewritten.
+            offset = 0
+            is_full = True
+
+        updated: Optional[Dict[str, Any]] = None
+        if len(record) > 0:
+            updated = {
+                'offset': len(record) * dtype.itemsize,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'first': record[:1].tobytes().hex(),
+                'last': record[-1:].tobytes().hex(),
+            }
+        # Saved only if changed, as the whole file is written.
+        if updated != checkpoint:
+            if updated is None:
+                self._checkpoint.pop(str(quote_file), None)
+            else:
+                self._checkpoint[str(quote_file)] = updated
+            self.save()
+        return record[offset:], is_full
+
+
+def read_quote_incremental(
+        exchange: TdxExchangeEnum,
+        symbol: str,
+        period: TdxPeriodEnum,
+        result_type: TdxQuoteTypeEnum,
+        checkpoint: Optional[TdxQuoteCheckpoint] = None
+) -> Tuple[Any, bool]:
+    """
+    Read quote files of TDX, returning only the records appended since the last call.
+    Falls back to a full read if the file was never read, or has been truncated or rewritten.
+
+    :param exchange: TdxExchangeEnum.
+    :param symbol: str, symbol without prefix, e.g. '600000'.
+    :param period: TdxPeriodEnum.
+    :param result_type: TdxQuoteTypeEnum.
+    :param checkpoint: TdxQuoteCheckpoint, None means the one saved in CHECKPOINT_FILE.
+    :return: Tuple, the result as read_quote returns, and whether it is the full history.
+    """
+    if checkpoint is None:
+        checkpoint = TdxQuoteCheckpoint()
+    record, is_full = checkpoint.read(_quote_file(exchange, symbol, period), _record_dtype(period))
+    return _format_record(record, period, result_type), is_full
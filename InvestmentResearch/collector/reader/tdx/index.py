@@ -0,0 +1,199 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+import datetime as dt
+import os
+
+import numpy as np
+from peewee import (
+    Model,
+    SqliteDatabase,
+    CharField,
+    DateField,
+    DateTimeField,
+    IntegerField,
+)
+
+from InvestmentResearch.utility import CONFIG_PATH
+from .definition import TdxExchangeEnum, TdxPeriodEnum
+from .quote import _quote_file, _record_dtype, _map_file, _decode_as_numpy, map_quote
+from .market import scan_quote
+
+
+INDEX_FILE: Path = CONFIG_PATH.joinpath('tdx_index.sqlite')
+
+# Initialized by open_index.
+index_db: SqliteDatabase = SqliteDatabase(None)
+
+
+class TdxQuoteFile(Model):
+    """
+    Index of a quote file in the vipdoc directory of TDX.
+    """
+    path = CharField(verbose_name='文件路径', primary_key=True)
+    exchange = CharField(verbose_name='交易所')
+    symbol = CharField(verbose_name='代码')
+    period = CharField(verbose_name='周期')
+    size = IntegerField(verbose_name='文件大小')
+    mtime = IntegerField(verbose_name='修改时间，纳秒')
+    count = IntegerField(verbose_name='记录数')
+    first_date = DateField(verbose_name='首个交易日', null=True)
+    last_date = DateField(verbose_name='最后交易日', null=True)
+    indexed = DateTimeField(verbose_name='索引时间')
+
+    class Meta:
+        database = index_db
+        legacy_table_names = False
+        indexes = (
+            (('exchange', 'symbol', 'period'), False),
+            (('period', 'first_date', 'last_date'), False),
+            (('mtime',), False),
+        )
+
+    def __repr__(self):
+        return f'<TdxQuoteFile(' \
+               f'exchange={self.exchange}, ' \
+               f'symbol={self.symbol}, ' \
+               f'period={self.period}, ' \
+               f'count={self.count}, ' \
+               f'first_date={self.first_date}, ' \
+               f'last_date={self.last_date}' \
+               f')>'
+
+
+def open_index(index_file: Optional[Path] = None) -> SqliteDatabase:
+    """
+    Open the index database, creating the table if not existed.
+
+    :param index_file: Path, None means INDEX_FILE.
+    :return: SqliteDatabase.
+    """
+    index_db.init(
+        str(INDEX_FILE if index_file is None else index_file),
+        pragmas={
+            'journal_mode': 'wal',
+            'encoding': 'utf8',
+        }
+    )
+    TdxQuoteFile.create_table()
+    return index_db
+
+
+def _first_and_last_date(record: np.ndarray, period: TdxPeriodEnum) -> Tuple[dt.date, dt.date]:
+    """
+    Decode the first and the last record only.
+    """
+    column: Dict[str, np.ndarray] = _decode_as_numpy(record[[0, -1]], period)
+    if period == TdxPeriodEnum.Day:
+        day: List[dt.date] = column['date'].astype(dt.date).tolist()
+    else:
+        day = [x.date() for x in column['datetime'].astype(dt.datetime).tolist()]
+    return day[0], day[1]
+
+
+def build_index(
+        period_list: Optional[List[TdxPeriodEnum]] = None,
+        exchange_list: Optional[List[TdxExchangeEnum]] = None
+) -> int:
+    """
+    Build or refresh the index of quote files, only files with changed size or mtime are read.
+    Files removed from TDX are removed from the index too.
+    The index should be opened by open_index first.
+
+    :param period_list: List[TdxPeriodEnum], None means all periods.
+    :param exchange_list: List[TdxExchangeEnum], None means all exchanges.
+    :return: int, count of files (re-)indexed.
+    """
+    indexed: Dict[str, Tuple[int, int]] = {
+        row.path: (row.size, row.mtime)
+        for row in TdxQuoteFile.select(TdxQuoteFile.path, TdxQuoteFile.size, TdxQuoteFile.mtime)
+    }
+    now: dt.datetime = dt.datetime.now()
+    seen: Dict[str, bool] = {}
+    row_list: List[Dict[str, Any]] = []
+    period: TdxPeriodEnum
+    for period in (list(TdxPeriodEnum) if period_list is None else period_list):
+        for exchange, symbol in scan_quote(period, exchange_list):
+            quote_file: Path = _quote_file(exchange, symbol, period)
+            path: str = str(quote_file)
+            if path in seen:    # SHFE and INE share the same files.
+                continue
+            seen[path] = True
+            stat: os.stat_result = quote_file.stat()
+            if indexed.get(path) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            record: np.ndarray = _map_file(quote_file, _record_dtype(period))
+            first_date, last_date = _first_and_last_date(record, period) if len(record) > 0 else (None, None)
+            row_list.append(
+                {
+                    'path': path,
+                    'exchange': exchange.name,
+                    'symbol': symbol,
+                    'period': period.name,
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime_ns,
+                    'count': len(record),
+                    'first_date': first_date,
+                    'last_date': last_date,
+                    'indexed': now,
+                }
+            )
+
+    # Only files of scanned periods and exchanges could be found removed.
+    query = TdxQuoteFile.select(TdxQuoteFile.path).where(
+        TdxQuoteFile.period.in_([x.name for x in (list(TdxPeriodEnum) if period_list is None else period_list)])
+    )
+    if exchange_list is not None:
+        query = query.where(TdxQuoteFile.exchange.in_([x.name for x in exchange_list]))
+    removed: List[str] = [row.path for row in query if row.path not in seen]
+
+    with index_db.atomic():
+        for i in range(0, len(row_list), 500):
+            TdxQuoteFile.insert_many(row_list[i:i + 500]).on_conflict_replace().execute()
+        for i in range(0, len(removed), 500):
+            TdxQuoteFile.delete().where(TdxQuoteFile.path.in_(removed[i:i + 500])).execute()
+    return len(row_list)
+
+
+def changed_since(moment: dt.datetime, period: Optional[TdxPeriodEnum] = None) -> List[TdxQuoteFile]:
+    """
+    Files modified at or after <moment>.
+
+    :param moment: dt.datetime, naive as local time.
+    :param period: TdxPeriodEnum, None means all periods.
+    :return: List[TdxQuoteFile].
+    """
+    query = TdxQuoteFile.select().where(TdxQuoteFile.mtime >= int(moment.timestamp() * 1e9))
+    if period is not None:
+        query = query.where(TdxQuoteFile.period == period.name)
+    return list(query.order_by(TdxQuoteFile.mtime))
+
+
+def symbols_on(day: dt.date, period: TdxPeriodEnum = TdxPeriodEnum.Day, exact: bool = True) -> List[TdxQuoteFile]:
+    """
+    Files have data on <day>.
+
+    :param day: dt.date.
+    :param period: TdxPeriodEnum.
+    :param exact: bool, if True, confirm by binary search in each candidate file,
+                  otherwise files of which <day> is between the first and the last date are returned,
+                  including those suspended on <day>.
+    :return: List[TdxQuoteFile].
+    """
+    candidate_list: List[TdxQuoteFile] = list(
+        TdxQuoteFile.select().where(
+            (TdxQuoteFile.period == period.name) &
+            (TdxQuoteFile.first_date <= day) &
+            (TdxQuoteFile.last_date >= day)
+        ).order_by(TdxQuoteFile.exchange, TdxQuoteFile.symbol)
+    )
+    if not exact:
+        return candidate_list
+    return [
+        x for x in candidate_list
+        if len(map_quote(TdxExchangeEnum[x.exchange], x.symbol, period, start=day, end=day)) > 0
+    ]
@@ -0,0 +1,122 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Dict, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import os
+
+import numpy as np
+import pandas as pd
+
+from InvestmentResearch.utility import CONFIGS
+from .definition import TdxExchangeEnum, TdxPeriodEnum, TdxQuoteTypeEnum
+from .quote import _quote_file, _record_dtype, _map_file, _decode_as_numpy
+
+
+def scan_quote(
+        period: TdxPeriodEnum,
+        exchange_list: Optional[List[TdxExchangeEnum]] = None
+) -> List[Tuple[TdxExchangeEnum, str]]:
+    """
+    Scan the vipdoc directory of TDX for quote files.
+    SHFE and INE share the same prefix in TDX, TdxExchangeEnum.INE is an alias of SHFE,
+    so files of both are listed once, under SHFE.
+
+    :param period: TdxPeriodEnum.
+    :param exchange_list: List[TdxExchangeEnum], None means all exchanges.
+    :return: List[Tuple[TdxExchangeEnum, str]], exchange and symbol, sorted.
+    """
+    tdx_path: Path = Path(CONFIGS['tdx'])
+    result: List[Tuple[TdxExchangeEnum, str]] = []
+    exchange: TdxExchangeEnum
+    for exchange in (list(TdxExchangeEnum) if exchange_list is None else exchange_list):
+        directory: Path = tdx_path.joinpath('vipdoc', exchange.value['directory'], period.value['directory'])
+        if not directory.exists():
+            continue
+        head: str = f'{exchange.value["prefix"]}{exchange.value["directory"]}'
+        for quote_file in sorted(directory.glob(f'{head}*.{period.value["suffix"]}')):
+            result.append((exchange, quote_file.stem[len(head):]))
+    return result
+
+
+def _load_quote_file(argument: Tuple[str, TdxPeriodEnum]) -> Dict[str, np.ndarray]:
+    """
+    Worker of read_market, runs in child processes.
+    """
+    quote_file, period = argument
+    return _decode_as_numpy(_map_file(Path(quote_file), _record_dtype(period)), period)
+
+
+def read_market(
+        period: TdxPeriodEnum,
+        result_type: TdxQuoteTypeEnum = TdxQuoteTypeEnum.Dataframe,
+        exchange_list: Optional[List[TdxExchangeEnum]] = None,
+        max_workers: Optional[int] = None
+) -> Union[Dict[str, np.ndarray], pd.DataFrame]:
+    """
+    Read quote files of the whole market in a process pool, as a long-format panel.
+
+    :param period: TdxPeriodEnum.
+    :param result_type: TdxQuoteTypeEnum, Dataframe or Numpy.
+    :param exchange_list: List[TdxExchangeEnum], None means all exchanges.
+    :param max_workers: int, processes in pool, None means the count of CPU, 1 means no pool.
+    :return: pd.DataFrame, with categorical <exchange> and <symbol> columns, for Dataframe;
+             Dict[str, np.ndarray] of columns, for Numpy.
+    """
+    if result_type not in (TdxQuoteTypeEnum.Dataframe, TdxQuoteTypeEnum.Numpy):
+        raise ValueError(f'read_market only supports {TdxQuoteTypeEnum.Dataframe} and {TdxQuoteTypeEnum.Numpy}.')
+
+    file_list: List[Tuple[TdxExchangeEnum, str]] = scan_quote(period, exchange_list)
+    argument_list: List[Tuple[str, TdxPeriodEnum]] = [
+        (str(_quote_file(exchange, symbol, period)), period) for exchange, symbol in file_list
+    ]
+
+    decoded_list: List[Dict[str, np.ndarray]]
+    worker_count: int = (os.cpu_count() or 1) if max_workers is None else max_workers
+    if worker_count == 1 or len(argument_list) <= 1:
+        decoded_list = [_load_quote_file(argument) for argument in argument_list]
+    else:
+        with ProcessPoolExecutor(max_workers=worker_count) as executor:
+            decoded_list = list(
+                executor.map(
+                    _load_quote_file,
+                    argument_list,
+                    chunksize=max(1, len(argument_list) // (worker_count * 4))
+                )
+            )
+
+    # Concatenate once, and encode exchange and symbol as codes of categories.
+    empty: Dict[str, np.ndarray] = _decode_as_numpy(np.empty(0, dtype=_record_dtype(period)), period)
+    # Daily quotes have <date>, minutely ones <datetime>, all have <close>.
+    count: np.ndarray = np.array([len(decoded['close']) for decoded in decoded_list], dtype=np.int64)
+    exchange_category: List[str] = [exchange.name for exchange in TdxExchangeEnum]
+    symbol_category: List[str] = sorted({symbol for _, symbol in file_list})
+    exchange_code: np.ndarray = np.repeat(
+        np.array([exchange_category.index(exchange.name) for exchange, _ in file_list], dtype=np.int8),
+        count
+    )
+    symbol_code: np.ndarray = np.repeat(
+        np.searchsorted(symbol_category, [symbol for _, symbol in file_list]).astype(np.int32),
+        count
+    )
+    column: Dict[str, np.ndarray] = {
+        name: np.concatenate([empty[name]] + [decoded[name] for decoded in decoded_list])
+        for name in empty.keys()
+    }
+
+    if result_type == TdxQuoteTypeEnum.Numpy:
+        return {
+            'exchange': np.array(exchange_category)[exchange_code],
+            'symbol': np.array(symbol_category, dtype=str)[symbol_code],
+            **column,
+        }
+    return pd.DataFrame(
+        {
+            'exchange': pd.Categorical.from_codes(exchange_code, categories=exchange_category),
+            'symbol': pd.Categorical.from_codes(symbol_code, categories=symbol_category),
+            **column,
+        }
+    )
@@ -3,30 +3,137 @@
 __author__ = 'Bruce Frank Wong'
 
 
-from typing import Any, Dict, List, Callable, Generator
+from typing import Any, Dict, List, Callable, Generator, Optional, Union
 from pathlib import Path
 import datetime as dt
 import struct
 
+import numpy as np
 import pandas as pd
 
 from InvestmentResearch.utility import CONFIGS
 from .definition import TdxExchangeEnum, TdxPeriodEnum, TdxQuoteTypeEnum
+from .bar import BarSeries, to_bar_series
 
 
-def _read_quote(exchange: TdxExchangeEnum, symbol: str, period: TdxPeriodEnum) -> bytes:
+# Layout of a record in TDX *.day file, 32 bytes.
+DAILY_DTYPE: np.dtype = np.dtype(
+    [
+        ('date', '<u4'),        # YYYYMMDD
+        ('open', '<u4'),        # price * 100
+        ('high', '<u4'),
+        ('low', '<u4'),
+        ('close', '<u4'),
+        ('amount', '<f4'),
+        ('volume', '<u4'),
+        ('reserved', '<u4'),
+    ]
+)
+
+# Layout of a record in TDX *.lc1/*.lc5 file, 32 bytes.
+MINUTELY_DTYPE: np.dtype = np.dtype(
+    [
+        ('date', '<u2'),        # (year - 2004) * 2048 + month * 100 + day
+        ('minute', '<u2'),      # minutes since midnight
+        ('open', '<f4'),
+        ('high', '<f4'),
+        ('low', '<f4'),
+        ('close', '<f4'),
+        ('amount', '<f4'),
+        ('volume', '<u4'),
+        ('reserved', '<u4'),
+    ]
+)
+
+# Records decoded at a time, when yielding per-record results of minute files.
+MINUTELY_CHUNK_SIZE: int = 65536
+
+DAILY_COLUMNS: List[str] = ['date', 'open', 'high', 'low', 'close', 'amount', 'volume']
+MINUTELY_COLUMNS: List[str] = ['datetime', 'open', 'high', 'low', 'close', 'amount', 'volume']
+
+
+def _quote_file(exchange: TdxExchangeEnum, symbol: str, period: TdxPeriodEnum) -> Path:
     tdx_path: Path = Path(CONFIGS['tdx'])
-    quote_file: Path = tdx_path.joinpath(
+    return tdx_path.joinpath(
         'vipdoc',
         exchange.value['directory'],
         period.value['directory'],
         f'{exchange.value["prefix"]}{exchange.value["directory"]}{symbol}.{period.value["suffix"]}'
     )
 
-    with open(quote_file, 'rb') as f:
-        raw = f.read()
 
-    return raw
+def _record_dtype(period: TdxPeriodEnum) -> np.dtype:
+    return DAILY_DTYPE if period == TdxPeriodEnum.Day else MINUTELY_DTYPE
+
+
+def _date_key(period: TdxPeriodEnum, day: dt.date) -> int:
+    """
+    The value of the <date> field in TDX files for <day>.
+    """
+    if period == TdxPeriodEnum.Day:
+        return day.year * 10000 + day.month * 100 + day.day
+    return (day.year - 2004) * 2048 + day.month * 100 + day.day
+
+
+def _bisect_left(field: np.ndarray, value: int, low: int = 0, high: Optional[int] = None) -> int:
+    """
+    Binary search on a (memory-mapped) sorted field, touching O(log n) items only.
+    np.searchsorted is not used here, because it copies a strided field before searching.
+    """
+    if high is None:
+        high = len(field)
+    while low < high:
+        middle: int = (low + high) // 2
+        if field[middle] < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _map_file(quote_file: Path, dtype: np.dtype) -> np.ndarray:
+    """
+    Memory-map a TDX quote file as a read-only structured array.
+    """
+    count: int = quote_file.stat().st_size // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(quote_file, dtype=dtype, mode='r', shape=(count,))
+
+
+def map_quote(
+        exchange: TdxExchangeEnum,
+        symbol: str,
+        period: TdxPeriodEnum,
+        start: Optional[dt.date] = None,
+        end: Optional[dt.date] = None
+) -> np.ndarray:
+    """
+    Memory-map a TDX quote file, and return the records between <start> and <end>.
+    The result is a zero-copy view, with dtype DAILY_DTYPE or MINUTELY_DTYPE.
+
+    :param exchange: TdxExchangeEnum.
+    :param symbol: str, symbol without prefix, e.g. '600000'.
+    :param period: TdxPeriodEnum.
+    :param start: dt.date, the first day included, None means from the beginning.
+    :param end: dt.date, the last day included, None means to the end.
+    :return: np.ndarray, structured.
+    """
+    record: np.ndarray = _map_file(_quote_file(exchange, symbol, period), _record_dtype(period))
+    field: np.ndarray = record['date']
+    begin_index: int = 0 if start is None else _bisect_left(field, _date_key(period, start))
+    end_index: int = len(record) if end is None else _bisect_left(field, _date_key(period, end) + 1)
+
+    # Refine by bar time, bars are in time order, so only the boundary days are searched by <minute>.
+    if period != TdxPeriodEnum.Day:
+        minute: np.ndarray = record['minute']
+        if isinstance(start, dt.datetime):
+            day_end: int = _bisect_left(field, _date_key(period, start) + 1, begin_index)
+            begin_index = _bisect_left(minute, start.hour * 60 + start.minute, begin_index, day_end)
+        if isinstance(end, dt.datetime):
+            day_begin: int = _bisect_left(field, _date_key(period, end), begin_index, end_index)
+            end_index = _bisect_left(minute, end.hour * 60 + end.minute + 1, max(day_begin, begin_index), end_index)
+    return record[begin_index:max(begin_index, end_index)]
 
 
 def _tuple_formatter_for_daily(raw: tuple) -> tuple:
@@ -41,22 +148,6 @@ def _tuple_formatter_for_daily(raw: tuple) -> tuple:
     )
 
 
-def _tuple_formatter_for_minutely(raw: tuple) -> tuple:
-    return (
-        dt.date(year=(raw[0] // 2048) + 2004,
-                month=(raw[0] % 2048) // 100,
-                day=(raw[0] % 2048) % 100),
-        dt.time(hour=(raw[1] // 60), minute=(raw[1] % 60)),
-        # Decimal(item[3]).quantize(Decimal('0.00'), rounding=ROUND_HALF_UP)
-        float(raw[2]),
-        float(raw[3]),
-        float(raw[4]),
-        float(raw[5]),
-        float(raw[6]),
-        int(raw[7])
-    )
-
-
 def _dict_formatter_for_daily(raw: tuple) -> Dict[str, Any]:
     return {
         'date': dt.datetime.strptime(str(raw[0]), "%Y%m%d").date(),
@@ -69,77 +160,215 @@ def _dict_formatter_for_daily(raw: tuple) -> Dict[str, Any]:
     }
 
 
-def _dict_formatter_for_minutely(raw: tuple) -> Dict[str, Any]:
+def _yyyymmdd_to_datetime64(value: np.ndarray) -> np.ndarray:
+    """
+    Convert integers like 20210716 to datetime64[D], without any per-item Python object.
+    """
+    value = value.astype(np.int64)
+    year_month: np.ndarray = (value // 10000 - 1970).astype('datetime64[Y]') \
+        + (value // 100 % 100 - 1).astype('timedelta64[M]')
+    return year_month.astype('datetime64[D]') + (value % 100 - 1).astype('timedelta64[D]')
+
+
+def _decode_daily(record: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Decode records of a TDX *.day file into column arrays.
+
+    :param record: np.ndarray, with dtype DAILY_DTYPE.
+    :return: Dict[str, np.ndarray], keyed by DAILY_COLUMNS.
+    """
     return {
-        'date': dt.date(year=(raw[0] // 2048) + 2004,
-                        month=(raw[0] % 2048) // 100,
-                        day=(raw[0] % 2048) % 100),
-        'time': dt.time(hour=(raw[1] // 60), minute=(raw[1] % 60)),
-        'open': float(format(raw[1] * 0.01, '.2f')),
-        'high': float(format(raw[2] * 0.01, '.2f')),
-        'low': float(format(raw[3] * 0.01, '.2f')),
-        'close': float(format(raw[4] * 0.01, '.2f')),
-        'amount': raw[5],
-        'volume': raw[6]
+        'date': _yyyymmdd_to_datetime64(record['date']),
+        'open': record['open'] / 100,
+        'high': record['high'] / 100,
+        'low': record['low'] / 100,
+        'close': record['close'] / 100,
+        'amount': record['amount'].astype(np.float64),
+        'volume': record['volume'].astype(np.int64),
+    }
+
+
+def _decode_minutely(record: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Decode records of a TDX *.lc1/*.lc5 file into column arrays.
+    The packed date and the minute-of-day are combined into datetime64[m], which is the end of the bar.
+
+    :param record: np.ndarray, with dtype MINUTELY_DTYPE.
+    :return: Dict[str, np.ndarray], keyed by MINUTELY_COLUMNS.
+    """
+    packed: np.ndarray = record['date'].astype(np.int64)
+    day: np.ndarray = _yyyymmdd_to_datetime64((packed // 2048 + 2004) * 10000 + packed % 2048)
+    return {
+        'datetime': day.astype('datetime64[m]') + record['minute'].astype('timedelta64[m]'),
+        'open': record['open'].astype(np.float64),
+        'high': record['high'].astype(np.float64),
+        'low': record['low'].astype(np.float64),
+        'close': record['close'].astype(np.float64),
+        'amount': record['amount'].astype(np.float64),
+        'volume': record['volume'].astype(np.int64),
     }
 
 
+def _decode_as_numpy(record: np.ndarray, period: TdxPeriodEnum) -> Dict[str, np.ndarray]:
+    if period == TdxPeriodEnum.Day:
+        return _decode_daily(record)
+    return _decode_minutely(record)
+
+
 def read_quote(
         exchange: TdxExchangeEnum,
         symbol: str,
         period: TdxPeriodEnum,
+        result_type: TdxQuoteTypeEnum,
+        start: Optional[dt.date] = None,
+        end: Optional[dt.date] = None
+) -> Union[Generator, Dict[str, np.ndarray], pd.DataFrame, BarSeries]:
+    """
+    Read quote files of TDX.
+
+    :param exchange: TdxExchangeEnum.
+    :param symbol: str, symbol without prefix, e.g. '600000'.
+    :param period: TdxPeriodEnum.
+    :param result_type: TdxQuoteTypeEnum.
+    :param start: dt.date, the first day included, None means from the beginning.
+    :param end: dt.date, the last day included, None means to the end.
+    :return: Generator of tuple or dict, for Tuple and Dict;
+             Dict[str, np.ndarray] of columns, for Numpy;
+             pd.DataFrame, for Dataframe;
+             BarSeries of Bar or MinuteBar, for Record.
+    """
+    record: np.ndarray = map_quote(exchange, symbol, period, start, end)
+    return _format_record(record, period, result_type)
+
+
+def _format_record(
+        record: np.ndarray,
+        period: TdxPeriodEnum,
         result_type: TdxQuoteTypeEnum
-) -> Generator:
+) -> Union[Generator, Dict[str, np.ndarray], pd.DataFrame, BarSeries]:
+    """
+    Convert structured records to the <result_type> of read_quote.
+    """
+    if result_type == TdxQuoteTypeEnum.Numpy:
+        return _decode_as_numpy(record, period)
+    elif result_type == TdxQuoteTypeEnum.Record:
+        return to_bar_series(_decode_as_numpy(record, period), period)
+    elif result_type == TdxQuoteTypeEnum.Dataframe:
+        return pd.DataFrame(_decode_as_numpy(record, period))
+    elif period == TdxPeriodEnum.Day:
+        return _iter_daily_record(record, result_type)
+    return _iter_minutely_record(record, result_type)
+
+
+def _iter_daily_record(record: np.ndarray, result_type: TdxQuoteTypeEnum) -> Generator:
 
     formatter: Callable
-    if result_type == TdxQuoteTypeEnum.Dataframe:
-        columns: List[str] = ['date', 'open', 'high', 'low', 'close', 'amount', 'volume'] \
-            if period == TdxPeriodEnum.Day else \
-            ['date', 'time', 'open', 'high', 'low', 'close', 'amount', 'volume']
-        return pd.DataFrame(
-            read_quote(exchange, symbol, period, TdxQuoteTypeEnum.Tuple),
-            columns=columns
-        )
-    elif result_type == TdxQuoteTypeEnum.Tuple:
-        if period == TdxPeriodEnum.Day:
-            formatter = _tuple_formatter_for_daily
-        else:
-            formatter = _tuple_formatter_for_minutely
+    if result_type == TdxQuoteTypeEnum.Tuple:
+        formatter = _tuple_formatter_for_daily
     else:   # result_type == ResultTypeEnum.Dict:
-        if period == TdxPeriodEnum.Day:
-            formatter = _dict_formatter_for_daily
-        else:
-            formatter = _dict_formatter_for_minutely
+        formatter = _dict_formatter_for_daily
 
-    pattern: struct.Struct
-    if period == TdxPeriodEnum.Day:
-        pattern = struct.Struct(r'<IIIIIfII')
-    else:
-        pattern = struct.Struct(r'<HHfffffII')
+    pattern: struct.Struct = struct.Struct(r'<IIIIIfII')
 
     offset: int
-    raw: bytes = _read_quote(exchange, symbol, period)
+    raw: np.ndarray = np.ascontiguousarray(record).view(np.uint8)
     for offset in range(0, len(raw), pattern.size):
         yield formatter(pattern.unpack_from(raw, offset))
 
 
+def _iter_minutely_record(record: np.ndarray, result_type: TdxQuoteTypeEnum) -> Generator:
+    """
+    Yield tuples or dicts of minute records, built from the columns of _decode_minutely,
+    so the values are the same as those of Numpy and Dataframe.
+    """
+    begin: int
+    for begin in range(0, len(record), MINUTELY_CHUNK_SIZE):
+        column: Dict[str, np.ndarray] = _decode_minutely(record[begin:begin + MINUTELY_CHUNK_SIZE])
+        row: tuple
+        for row in zip(
+            column['datetime'].astype(dt.datetime).tolist(),
+            column['open'].tolist(),
+            column['high'].tolist(),
+            column['low'].tolist(),
+            column['close'].tolist(),
+            column['amount'].tolist(),
+            column['volume'].tolist(),
+        ):
+            if result_type == TdxQuoteTypeEnum.Tuple:
+                yield (row[0].date(), row[0].time()) + row[1:]
+            else:
+                yield {
+                    'date': row[0].date(),
+                    'time': row[0].time(),
+                    'open': row[1],
+                    'high': row[2],
+                    'low': row[3],
+                    'close': row[4],
+                    'amount': row[5],
+                    'volume': row[6],
+                }
+
+
+def read_quote_chunks(
+        exchange: TdxExchangeEnum,
+        symbol: str,
+        period: TdxPeriodEnum,
+        chunk_rows: int = MINUTELY_CHUNK_SIZE,
+        result_type: TdxQuoteTypeEnum = TdxQuoteTypeEnum.Dataframe,
+        start: Optional[dt.date] = None,
+        end: Optional[dt.date] = None
+) -> Generator:
+    """
+    Read quote files of TDX in chunks, decoded from the memory-mapped file chunk by chunk,
+    so the memory used is bounded by <chunk_rows>. Prices are float32, volume is int64.
+
+    :param exchange: TdxExchangeEnum.
+    :param symbol: str, symbol without prefix, e.g. '600000'.
+    :param period: TdxPeriodEnum.
+    :param chunk_rows: int, records in each chunk, the last chunk may be shorter.
+    :param result_type: TdxQuoteTypeEnum, Dataframe or Numpy.
+    :param start: dt.date, the first day included, None means from the beginning.
+    :param end: dt.date, the last day included, None means to the end.
+    :return: Generator of pd.DataFrame, for Dataframe; of Dict[str, np.ndarray], for Numpy.
+    """
+    if result_type not in (TdxQuoteTypeEnum.Dataframe, TdxQuoteTypeEnum.Numpy):
+        raise ValueError(
+            f'read_quote_chunks only supports {TdxQuoteTypeEnum.Dataframe} and {TdxQuoteTypeEnum.Numpy}.'
+        )
+
+    record: np.ndarray = map_quote(exchange, symbol, period, start, end)
+    begin: int
+    for begin in range(0, len(record), chunk_rows):
+        column: Dict[str, np.ndarray] = _decode_as_numpy(record[begin:begin + chunk_rows], period)
+        for name in ('open', 'high', 'low', 'close'):
+            column[name] = column[name].astype(np.float32)
+        if result_type == TdxQuoteTypeEnum.Numpy:
+            yield column
+        else:
+            yield pd.DataFrame(column)
+
+
 def show_quote(
     exchange: TdxExchangeEnum,
     symbol: str,
     period: TdxPeriodEnum,
-    result_type: TdxQuoteTypeEnum
+    result_type: TdxQuoteTypeEnum,
+    start: Optional[dt.date] = None,
+    end: Optional[dt.date] = None
 ) -> None:
     result = read_quote(
         exchange=exchange,
         symbol=symbol,
         period=period,
-        result_type=result_type
+        result_type=result_type,
+        start=start,
+        end=end
     )
 
     pattern_daily: str = '{date}, ' \
                          'open: {open:.2f}, high: {high:.2f}, low: {low:.2f}, close: {close:.2f}, ' \
                          'amount: {amount:.2f}, volume: {volume}'
-    pattern_minutely: str = '{date}, {time}' \
+    pattern_minutely: str = '{date}, {time}, ' \
                             'open: {open:.2f}, high: {high:.2f}, low: {low:.2f}, close: {close:.2f}, ' \
                             'amount: {amount:.2f}, volume: {volume}'
     if result_type == TdxQuoteTypeEnum.Dict:
@@ -198,3 +427,23 @@ def show_quote(
                         volume=item[7],
                     )
                 )
+    elif result_type == TdxQuoteTypeEnum.Record:
+        scale: int = result.bar_type.PRICE_SCALE
+        for item in result:
+            if period == TdxPeriodEnum.Day:
+                prefix: Dict[str, str] = {'date': item.day.isoformat()}
+                pattern: str = pattern_daily
+            else:
+                prefix = {'date': item.moment.date().isoformat(), 'time': item.moment.time().isoformat()}
+                pattern = pattern_minutely
+            print(
+                pattern.format(
+                    **prefix,
+                    open=item.open / scale,
+                    high=item.high / scale,
+                    low=item.low / scale,
+                    close=item.close / scale,
+                    amount=item.amount,
+                    volume=item.volume,
+                )
+            )
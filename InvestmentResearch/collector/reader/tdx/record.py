@@ -3,14 +3,97 @@
 __author__ = 'Bruce Frank Wong'
 
 
-from typing import Dict, List, Any
+from typing import Any, Callable, Dict, Generator, List, Tuple
 from pathlib import Path
 import csv
 import datetime as dt
 
+import pandas as pd
+
 from .definition import TdxRecordTypeEnum
 
 
+# Columns of record files, (key, column in file, kind).
+# Values of kind:
+#   date, ="20210716" to date;
+#   time, ="09:31:00" to time;
+#   str, ="abc" to str;
+#   float / int, plain number;
+#   number, plain number or ="-1.23", to float.
+RECORD_COLUMN: Dict[TdxRecordTypeEnum, List[Tuple[str, str, str]]] = {
+    TdxRecordTypeEnum.Cash: [
+        ('date', '发生日期', 'date'),
+        ('time', '转帐时间', 'time'),
+        ('offset', '业务名称', 'str'),
+        ('amount', '转帐金额', 'number'),
+    ],
+    TdxRecordTypeEnum.Order: [
+        ('date', '委托日期', 'date'),
+        ('time', '委托时间', 'time'),
+        ('symbol', '证券代码', 'str'),
+        ('name', '证券名称', 'str'),
+        ('offset', '买卖标志', 'str'),
+        ('status', '状态说明', 'str'),
+        ('price_order', '委托价格', 'float'),
+        ('volume_order', '委托数量', 'int'),
+        ('order_sn', '委托编号', 'str'),
+        ('price_trade', '成交价格', 'float'),
+        ('volume_trade', '成交数量', 'float'),
+        ('mode', '报价方式', 'str'),
+        ('account', '股东代码', 'str'),
+    ],
+    TdxRecordTypeEnum.Trade: [
+        ('date', '成交日期', 'date'),
+        ('symbol', '证券代码', 'str'),
+        ('name', '证券名称', 'str'),
+        ('offset', '买卖标志', 'str'),
+        ('price', '成交价格', 'float'),
+        ('volume', '成交数量', 'int'),
+        ('trade_sn', '成交编号', 'str'),
+        ('order_sn', '委托编号', 'str'),
+        ('account', '股东代码', 'str'),
+    ],
+    TdxRecordTypeEnum.Settle: [
+        ('date', '发生日期', 'date'),
+        ('subject', '业务名称', 'str'),
+        ('change', '发生金额', 'number'),
+        ('balance', '剩余金额', 'float'),
+        ('currency', '币种', 'str'),
+        ('symbol', '证券代码', 'str'),
+        ('name', '证券名称', 'str'),
+        ('offset', '买卖标志', 'str'),
+        ('price', '成交价格', 'float'),
+        ('volume', '成交数量', 'float'),
+        ('commission', '佣金', 'float'),
+        ('tax', '印花税', 'float'),
+        ('transfer_fee', '过户费', 'float'),
+        ('other_fee', '其他费', 'float'),
+    ],
+}
+
+
+# Converters of a single value.
+_VALUE_CONVERTER: Dict[str, Callable[[str], Any]] = {
+    'date': lambda x: dt.date(year=int(x[2:6]), month=int(x[6:8]), day=int(x[8:10])),
+    'time': lambda x: dt.time.fromisoformat(x[2:-1]),
+    'str': lambda x: x[2:-1],
+    'float': float,
+    'int': int,
+    'number': lambda x: float(x) if '=' not in x else float(x[2:-1]),
+}
+
+
+# Converters of a whole column.
+_COLUMN_CONVERTER: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    'date': lambda x: pd.to_datetime(x.str.slice(2, 10), format='%Y%m%d'),
+    'time': lambda x: pd.to_timedelta(x.str.slice(2, -1)),
+    'str': lambda x: x.str.slice(2, -1),
+    'float': lambda x: pd.to_numeric(x).astype('float64'),
+    'int': lambda x: pd.to_numeric(x).astype('int64'),
+    'number': lambda x: pd.to_numeric(x.str.replace('="', '', regex=False).str.rstrip('"')).astype('float64'),
+}
+
+
 def show_record(record_file: Path) -> None:
     """
     Show content of record files generated by TDX.
@@ -23,6 +106,24 @@ def show_record(record_file: Path) -> None:
             print(row)
 
 
+def iter_record(record_file: Path, type_: TdxRecordTypeEnum) -> Generator[Dict[str, Any], None, None]:
+    """
+    Read record files generated by TDX, one row at a time.
+
+    :param record_file: Path, file to be read.
+    :param type_: TdxRecordTypeEnum.
+
+    :return: Generator, each item is a Dict[str, Any].
+    """
+    column_list: List[Tuple[str, str, Callable[[str], Any]]] = [
+        (key, column, _VALUE_CONVERTER[kind]) for key, column, kind in RECORD_COLUMN[type_]
+    ]
+    with open(record_file, mode='r', newline='', encoding='gbk') as csv_file:
+        reader = csv.DictReader(csv_file, delimiter='\t')
+        for row in reader:
+            yield {key: converter(row[column]) for key, column, converter in column_list}
+
+
 def read_record(record_file: Path, type_: TdxRecordTypeEnum) -> List[Dict[str, Any]]:
     """
     Read record files generated by TDX.
@@ -32,88 +133,28 @@ def read_record(record_file: Path, type_: TdxRecordTypeEnum) -> List[Dict[str, A
 
     :return: List, each item is a Dict[str, Any].
     """
-    record_list: List[Dict[str, Any]] = []
-    with open(record_file, mode='r', newline='', encoding='gbk') as csv_file:
-        reader = csv.DictReader(csv_file, delimiter='\t')
+    return list(iter_record(record_file, type_))
+
 
-        if type_ == TdxRecordTypeEnum.Cash:
-            for row in reader:
-                record_list.append(
-                    {
-                        'date': dt.date(
-                            year=int(row['发生日期'][2:6]),
-                            month=int(row['发生日期'][6:8]),
-                            day=int(row['发生日期'][8:10]),
-                        ),
-                        'time': dt.time.fromisoformat(row['转帐时间'][2:-1]),
-                        'offset': row['业务名称'][2:-1],
-                        'amount': float(row['转帐金额'][2:-1]),
-                    }
-                )
-        elif type_ == TdxRecordTypeEnum.Order:
-            for row in reader:
-                record_list.append(
-                    {
-                        'date': dt.date(
-                            year=int(row['委托日期'][2:6]),
-                            month=int(row['委托日期'][6:8]),
-                            day=int(row['委托日期'][8:10]),
-                        ),
-                        'time': dt.time.fromisoformat(row['委托时间'][2:-1]),
-                        'symbol': row['证券代码'][2:-1],
-                        'name': row['证券名称'][2:-1],
-                        'offset': row['买卖标志'][2:-1],
-                        'status': row['状态说明'][2:-1],
-                        'price_order': float(row['委托价格']),
-                        'volume_order': int(row['委托数量']),
-                        'order_sn': row['委托编号'][2:-1],
-                        'price_trade': float(row['成交价格']),
-                        'volume_trade': float(row['成交数量']),
-                        'mode': row['报价方式'][2:-1],
-                        'account': row['股东代码'][2:-1]
-                    }
-                )
-        elif type_ == TdxRecordTypeEnum.Trade:
-            for row in reader:
-                record_list.append(
-                    {
-                        'date': dt.date(
-                            year=int(row['成交日期'][2:6]),
-                            month=int(row['成交日期'][6:8]),
-                            day=int(row['成交日期'][8:10]),
-                        ),
-                        'symbol': row['证券代码'][2:-1],
-                        'name': row['证券名称'][2:-1],
-                        'offset': row['买卖标志'][2:-1],
-                        'price': float(row['成交价格']),
-                        'volume': int(row['成交数量']),
-                        'trade_sn': row['成交编号'][2:-1],
-                        'order_sn': row['委托编号'][2:-1],
-                        'account': row['股东代码'][2:-1]
-                    }
-                )
-        else:
-            for row in reader:
-                record_list.append(
-                    {
-                        'date': dt.date(
-                            year=int(row['发生日期'][2:6]),
-                            month=int(row['发生日期'][6:8]),
-                            day=int(row['发生日期'][8:10]),
-                        ),
-                        'subject': row['业务名称'][2:-1],
-                        'change': float(row['发生金额']) if '=' not in row['发生金额'] else float(row['发生金额'][2:-1]),
-                        'balance': float(row['剩余金额']),
-                        'currency': row['币种'][2:-1],
-                        'symbol': row['证券代码'][2:-1],
-                        'name': row['证券名称'][2:-1],
-                        'offset': row['买卖标志'][2:-1],
-                        'price': float(row['成交价格']),
-                        'volume': float(row['成交数量']),
-                        'commission': float(row['佣金']),
-                        'tax': float(row['印花税']),
-                        'transfer_fee': float(row['过户费']),
-                        'other_fee': float(row['其他费'])
-                    }
-                )
-    return record_list
+def read_record_dataframe(record_file: Path, type_: TdxRecordTypeEnum) -> pd.DataFrame:
+    """
+    Read record files generated by TDX, each column is converted in a single vectorized pass.
+    Columns are the keys of read_record, <date> is datetime64, <time> is timedelta64.
+
+    :param record_file: Path, file to be read.
+    :param type_: TdxRecordTypeEnum.
+
+    :return: pd.DataFrame.
+    """
+    raw: pd.DataFrame = pd.read_csv(
+        record_file,
+        sep='\t',
+        encoding='gbk',
+        dtype=str,
+        keep_default_na=False,
+        quoting=csv.QUOTE_NONE,
+        usecols=[column for _, column, _ in RECORD_COLUMN[type_]],
+    )
+    return pd.DataFrame(
+        {key: _COLUMN_CONVERTER[kind](raw[column]) for key, column, kind in RECORD_COLUMN[type_]}
+    )
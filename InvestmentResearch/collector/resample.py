@@ -0,0 +1,258 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Dict, List, Optional, Tuple, Union
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from InvestmentResearch.database.model.quote import QuotePeriod
+from InvestmentResearch.collector.reader.tdx import BarSeries
+
+
+Quote = Union[Dict[str, np.ndarray], pd.DataFrame, BarSeries]
+Session = Dict[str, List[Tuple[str, str]]]
+
+
+# Trading sessions of exchanges, each session is (open, close], as bars are stamped with their end time.
+# The night session of futures varies by product, the widest one is used,
+# it is harmless because the night session is counted apart from the day session.
+TRADING_SESSION: Dict[str, Session] = {
+    'SSE': {
+        'night': [],
+        'day': [('09:30', '11:30'), ('13:00', '15:00')],
+    },
+    'SZSE': {
+        'night': [],
+        'day': [('09:30', '11:30'), ('13:00', '15:00')],
+    },
+    'CFFEX': {
+        'night': [],
+        'day': [('09:30', '11:30'), ('13:00', '15:00')],
+    },
+    'SHFE': {
+        'night': [('21:00', '02:30')],
+        'day': [('09:00', '10:15'), ('10:30', '11:30'), ('13:30', '15:00')],
+    },
+    'INE': {
+        'night': [('21:00', '02:30')],
+        'day': [('09:00', '10:15'), ('10:30', '11:30'), ('13:30', '15:00')],
+    },
+    'DCE': {
+        'night': [('21:00', '23:00')],
+        'day': [('09:00', '10:15'), ('10:30', '11:30'), ('13:30', '15:00')],
+    },
+    'CZCE': {
+        'night': [('21:00', '23:00')],
+        'day': [('09:00', '10:15'), ('10:30', '11:30'), ('13:30', '15:00')],
+    },
+}
+
+# Length in trading minutes, and whether the night session is included.
+PERIOD_SPECIFICATION: Dict[QuotePeriod, Tuple[int, bool]] = {
+    QuotePeriod.Minute1: (1, True),
+    QuotePeriod.Minute3: (3, True),
+    QuotePeriod.Minute5: (5, True),
+    QuotePeriod.Minute15: (15, True),
+    QuotePeriod.Minute30: (30, False),
+    QuotePeriod.Minute30N: (30, True),
+    QuotePeriod.Hour1: (60, False),
+    QuotePeriod.Hour1N: (60, True),
+}
+
+# Bars stamped within this many minutes before a session opens, are call auction of the session.
+AUCTION_MINUTES: int = 30
+
+BLOCK_NIGHT: int = 0
+BLOCK_DAY: int = 1
+
+
+def _minute_of_day(value: str) -> int:
+    return int(value[:2]) * 60 + int(value[3:5])
+
+
+@lru_cache(maxsize=None)
+def _session_table(exchange: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map every minute of a day (the end time of a bar) to its trading block and its trading minute in the block.
+    Bars out of sessions are folded into the first bar of the following session if they are call auction,
+    otherwise into the last bar of the previous session.
+
+    :param exchange: str, key of TRADING_SESSION.
+    :return: Tuple of np.ndarray with length 1440, the block (BLOCK_NIGHT or BLOCK_DAY), and the trading minute.
+    """
+    session: Session = TRADING_SESSION[exchange]
+    block: np.ndarray = np.full(1440, -1, dtype=np.int8)
+    index: np.ndarray = np.full(1440, -1, dtype=np.int32)
+    opening: List[int] = []
+    for block_value, name in ((BLOCK_NIGHT, 'night'), (BLOCK_DAY, 'day')):
+        offset: int = 0
+        for begin, end in session[name]:
+            length: int = (_minute_of_day(end) - _minute_of_day(begin)) % 1440
+            minute: np.ndarray = (_minute_of_day(begin) + np.arange(1, length + 1)) % 1440
+            block[minute] = block_value
+            index[minute] = np.arange(offset, offset + length)
+            offset += length
+            opening.append(_minute_of_day(begin))
+
+    for minute in np.flatnonzero(block < 0).tolist():
+        if any(0 <= (x - minute) % 1440 < AUCTION_MINUTES for x in opening):
+            target: int = next((minute + k) % 1440 for k in range(1, 1441) if block[(minute + k) % 1440] >= 0)
+        else:
+            target = next((minute - k) % 1440 for k in range(1, 1441) if block[(minute - k) % 1440] >= 0)
+        block[minute] = block[target]
+        index[minute] = index[target]
+    return block, index
+
+
+class _Prepared:
+    """
+    Arrays shared by all periods, computed once for a quote.
+    """
+    def __init__(self, quote: Dict[str, np.ndarray], exchange: Optional[str]) -> None:
+        self.quote: Dict[str, np.ndarray] = quote
+        self.datetime: np.ndarray = quote['datetime'].astype('datetime64[m]')
+        size: int = len(self.datetime)
+        minute: np.ndarray = (self.datetime - self.datetime.astype('datetime64[D]')).astype(np.int64)
+
+        # Block and trading minute, by exchange of each row if not given.
+        if exchange is None and 'exchange' in quote:
+            exchange_list, exchange_code = np.unique(np.asarray(quote['exchange']).astype(str), return_inverse=True)
+        else:
+            exchange_list, exchange_code = np.array(['SSE' if exchange is None else exchange]), np.zeros(size, int)
+        unsupported: List[str] = [x for x in exchange_list.tolist() if x not in TRADING_SESSION]
+        if unsupported:
+            raise ValueError(
+                f'No trading session of exchange {unsupported}, rows of them should be filtered out, '
+                f'supported exchanges are {list(TRADING_SESSION.keys())}.'
+            )
+        table_list: List[Tuple[np.ndarray, np.ndarray]] = [_session_table(x) for x in exchange_list]
+        self.block: np.ndarray = np.stack([x[0] for x in table_list])[exchange_code, minute]
+        self.index: np.ndarray = np.stack([x[1] for x in table_list])[exchange_code, minute]
+
+        # Change of symbol.
+        self.symbol_change: np.ndarray = np.zeros(size, dtype=bool)
+        if 'symbol' in quote and size > 0:
+            symbol: np.ndarray = np.asarray(quote['symbol'])
+            self.symbol_change[1:] = symbol[1:] != symbol[:-1]
+
+        # Trading day, bars of night session belong to the day of the following bar of day session.
+        position: np.ndarray = np.where(self.block == BLOCK_DAY, np.arange(size), size)
+        position = np.minimum.accumulate(position[::-1])[::-1]
+        day: np.ndarray = self.datetime.astype('datetime64[D]')
+        self.trading_day: np.ndarray = np.where(
+            (position < size) & ~self.symbol_change_after(position),
+            day[np.minimum(position, size - 1)],
+            day
+        )
+
+    def symbol_change_after(self, position: np.ndarray) -> np.ndarray:
+        """
+        Whether the symbol changes between each row and the row at <position>.
+        """
+        change_count: np.ndarray = np.cumsum(self.symbol_change)
+        return change_count[np.minimum(position, len(position) - 1)] != change_count
+
+    def aggregate(self, mask: np.ndarray, key_list: List[np.ndarray], stamp: str) -> Dict[str, np.ndarray]:
+        """
+        Aggregate rows in <mask>, a new bar begins wherever any key of <key_list> changes.
+        """
+        row: np.ndarray = np.flatnonzero(mask)
+        change: np.ndarray = np.ones(len(row), dtype=bool)
+        if len(row) > 1:
+            change[1:] = False
+            for key in [self.symbol_change.cumsum()] + key_list:
+                key = key[row]
+                change[1:] |= key[1:] != key[:-1]
+        begin: np.ndarray = np.flatnonzero(change)
+        end: np.ndarray = np.append(begin[1:], len(row)) - 1
+
+        result: Dict[str, np.ndarray] = {}
+        for name in ('exchange', 'symbol'):
+            if name in self.quote:
+                result[name] = np.asarray(self.quote[name])[row[begin]]
+        if stamp == 'date':
+            result['date'] = self.trading_day[row[end]]
+        else:
+            result['datetime'] = self.datetime[row[end]]
+        if len(row) == 0:
+            for name in ('open', 'high', 'low', 'close', 'amount', 'volume'):
+                result[name] = np.asarray(self.quote[name])[:0]
+            return result
+        result['open'] = np.asarray(self.quote['open'])[row[begin]]
+        result['high'] = np.maximum.reduceat(np.asarray(self.quote['high'])[row], begin)
+        result['low'] = np.minimum.reduceat(np.asarray(self.quote['low'])[row], begin)
+        result['close'] = np.asarray(self.quote['close'])[row[end]]
+        result['amount'] = np.add.reduceat(np.asarray(self.quote['amount'])[row], begin)
+        result['volume'] = np.add.reduceat(np.asarray(self.quote['volume'])[row], begin)
+        return result
+
+    def resample(self, period: QuotePeriod) -> Dict[str, np.ndarray]:
+        everything: np.ndarray = np.ones(len(self.datetime), dtype=bool)
+        day_number: np.ndarray = self.trading_day.astype(np.int64)
+        if period == QuotePeriod.Day:
+            return self.aggregate(everything, [day_number], 'date')
+        elif period == QuotePeriod.Week:
+            # 1970-01-01 is Thursday, weeks begin on Monday.
+            return self.aggregate(everything, [(day_number + 3) // 7], 'date')
+        elif period in PERIOD_SPECIFICATION:
+            length, include_night = PERIOD_SPECIFICATION[period]
+            mask: np.ndarray = everything if include_night else self.block == BLOCK_DAY
+            return self.aggregate(mask, [day_number, self.block, self.index // length], 'datetime')
+        raise ValueError(f'{period} could not be resampled from 1 minute bars.')
+
+
+def _to_columns(quote: Quote) -> Dict[str, np.ndarray]:
+    if isinstance(quote, pd.DataFrame):
+        return {name: quote[name].to_numpy() for name in quote.columns}
+    elif isinstance(quote, BarSeries):
+        return quote.to_numpy()
+    return quote
+
+
+def _to_result(quote: Quote, result: Dict[str, np.ndarray]) -> Quote:
+    if isinstance(quote, pd.DataFrame):
+        df: pd.DataFrame = pd.DataFrame(result)
+        for name in ('exchange', 'symbol'):
+            if name in df.columns and isinstance(quote[name].dtype, pd.CategoricalDtype):
+                df[name] = pd.Categorical(df[name], categories=quote[name].cat.categories)
+        return df
+    return result
+
+
+def resample(quote: Quote, period: QuotePeriod, exchange: Optional[str] = None) -> Quote:
+    """
+    Resample 1 minute bars to <period>.
+
+    Bars are counted by trading minutes from the open of the night session and of the day session apart,
+    so bars never span the two. Minute30 and Hour1 cover the day session only,
+    Minute30N and Hour1N cover the night session too, other periods cover all sessions.
+    Day and Week are stamped with the trading day, bars of night session belong to the following trading day.
+
+    :param quote: Dict[str, np.ndarray] or pd.DataFrame, with columns datetime, open, high, low, close,
+                  amount, volume, and optionally exchange and symbol, sorted by symbol and datetime,
+                  as read_quote and read_market return; or BarSeries of MinuteBar.
+    :param period: QuotePeriod.
+    :param exchange: str, key of TRADING_SESSION. None means the <exchange> column, or 'SSE' without it.
+    :return: the same type as <quote>, except Dict[str, np.ndarray] for BarSeries,
+             stamped with the end of the last bar, or the trading day.
+    """
+    return _to_result(quote, _Prepared(_to_columns(quote), exchange).resample(period))
+
+
+def resample_all(quote: Quote, exchange: Optional[str] = None) -> Dict[QuotePeriod, Quote]:
+    """
+    Resample 1 minute bars to every QuotePeriod could be derived, sharing the preparation.
+
+    :param quote: the same as resample.
+    :param exchange: the same as resample.
+    :return: Dict[QuotePeriod, Quote].
+    """
+    prepared: _Prepared = _Prepared(_to_columns(quote), exchange)
+    return {
+        period: _to_result(quote, prepared.resample(period))
+        for period in list(PERIOD_SPECIFICATION.keys()) + [QuotePeriod.Day, QuotePeriod.Week]
+    }
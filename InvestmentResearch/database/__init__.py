@@ -3,7 +3,10 @@
 __author__ = 'Bruce Frank Wong'
 
 
-from .interface import db
+from typing import Any, Dict
+from importlib import import_module
+
+from .interface import db, init_db, connection
 from .model import (
     Country,
     Holiday,
@@ -12,22 +15,75 @@ from .model import (
     StockStatus,
     StockStatusEnum,
 )
-from .initializer import (
-    initialize_all,
-    initialize_country,
-    initialize_holiday,
-    initialize_exchange,
-    initialize_stock_status,
+# Not lazy, the name is of the submodule too, which is bound to the package when imported.
+from .reference import (
+    ReferenceCache,
+    reference,
 )
 
 
+# Imported on first access, ingestion pulls numpy, pandas and the TDX reader in,
+# which is not needed to reach the models.
+_LAZY: Dict[str, str] = {
+    'IngestionProgress': 'ingestion',
+    'upsert': 'ingestion',
+    'stock_id_map': 'ingestion',
+    'ingest_quote': 'ingestion',
+    'ingest_record': 'ingestion',
+    'CsvStream': 'bulk',
+    'bulk_load': 'bulk',
+    'sqlite_bulk_mode': 'bulk',
+    'CalendarUpdate': 'calendar',
+    'materialize_calendar': 'calendar',
+    'DadTree': 'dad',
+    'build_dad_closure': 'dad',
+    'dad_descendants': 'dad',
+    'dad_path': 'dad',
+    'initialize_all': 'initializer',
+    'initialize_country': 'initializer',
+    'initialize_holiday': 'initializer',
+    'initialize_exchange': 'initializer',
+    'initialize_stock_status': 'initializer',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value: Any = getattr(import_module(f'.{_LAZY[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
 __all__ = [
     'db',
+    'init_db',
+    'connection',
     'initialize_all',
     'initialize_country',
     'initialize_holiday',
     'initialize_exchange',
     'initialize_stock_status',
+    'CalendarUpdate',
+    'materialize_calendar',
+    'DadTree',
+    'build_dad_closure',
+    'dad_descendants',
+    'dad_path',
+    'CsvStream',
+    'bulk_load',
+    'sqlite_bulk_mode',
+    'ReferenceCache',
+    'reference',
+    'IngestionProgress',
+    'upsert',
+    'stock_id_map',
+    'ingest_quote',
+    'ingest_record',
     'Country',
     'Holiday',
     'Exchange',
@@ -0,0 +1,244 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+from contextlib import contextmanager
+from itertools import islice
+
+from peewee import (
+    Model,
+    Field,
+    Database,
+    SqliteDatabase,
+    MySQLDatabase,
+    PostgresqlDatabase,
+    IndexMetadata,
+    chunked,
+)
+
+from .interface import db, resolve_database, driver_errors
+
+
+# Rows converted to CSV at a time by CsvStream.
+COPY_CHUNK_ROWS: int = 10000
+
+# Rows in one executemany, MySQL drivers pack them into multi-row INSERT statements.
+BATCH_ROWS: int = 50000
+
+# Pragmas of SQLite in sqlite_bulk_mode.
+SQLITE_BULK_PRAGMAS: Dict[str, Any] = {
+    'synchronous': 0,           # OFF, the file may be corrupted by a power loss, but not by a crash of Python
+    'cache_size': -1048576,     # 1GB
+    'temp_store': 2,            # MEMORY
+}
+
+
+# Written unquoted for None, and declared as NULL in copy_sql.
+# Other values but numbers are quoted, so that empty strings are not NULL, as quoted values never are.
+NULL_MARKER: str = r'\N'
+
+
+def _csv_field(value: Any) -> str:
+    if value is None:
+        return NULL_MARKER
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class CsvStream:
+    """
+    File-like CSV text of rows, generated chunk by chunk, for COPY FROM STDIN of PostgreSQL.
+    None is written as NULL_MARKER, other values but numbers are quoted.
+    """
+    _row_iter: Iterator[Tuple]
+    _chunk_rows: int
+    _buffer: str
+    _count: int
+
+    def __init__(self, row_list: Iterable[Tuple], chunk_rows: int = COPY_CHUNK_ROWS) -> None:
+        self._row_iter = iter(row_list)
+        self._chunk_rows = chunk_rows
+        self._buffer = ''
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        """
+        Rows read from the iterable so far.
+        """
+        return self._count
+
+    def _next_chunk(self) -> str:
+        row_list: List[Tuple] = list(islice(self._row_iter, self._chunk_rows))
+        if not row_list:
+            return ''
+        self._count += len(row_list)
+        return ''.join(','.join(map(_csv_field, row)) + '\n' for row in row_list)
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            chunk: str = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data: str = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return data
+
+    def __iter__(self) -> Iterator[str]:
+        if self._buffer:
+            yield self.read()
+        chunk: str = self._next_chunk()
+        while chunk:
+            yield chunk
+            chunk = self._next_chunk()
+
+
+def copy_sql(model: Type[Model], field_list: List[Field]) -> str:
+    """
+    COPY statement of PostgreSQL, for <field_list> of <model> in CSV format.
+    """
+    column: str = ', '.join(f'"{x.column_name}"' for x in field_list)
+    return f'COPY "{model._meta.table_name}" ({column}) FROM STDIN WITH (FORMAT csv, NULL \'{NULL_MARKER}\')'
+
+
+def insert_sql(model: Type[Model], field_list: List[Field]) -> str:
+    """
+    Single-row INSERT statement with placeholders, for executemany.
+    Peewee puts columns in the order of fields of the model, so <field_list> should be in that order too.
+    """
+    sql, _ = model.insert({x: None for x in field_list}).returning().sql()
+    return sql
+
+
+def _load_postgresql(
+        database: Database,
+        model: Type[Model],
+        field_list: List[Field],
+        row_list: Iterable[Tuple]
+) -> int:
+    stream: CsvStream = CsvStream(row_list)
+    with database.atomic(), driver_errors():
+        cursor = database.cursor()
+        if hasattr(cursor, 'copy_expert'):     # psycopg2
+            cursor.copy_expert(copy_sql(model, field_list), stream)
+        else:                                   # psycopg 3
+            with cursor.copy(copy_sql(model, field_list)) as copy:
+                for chunk in stream:
+                    copy.write(chunk)
+    return stream.count
+
+
+def _load_mysql(
+        database: Database,
+        model: Type[Model],
+        field_list: List[Field],
+        row_list: Iterable[Tuple]
+) -> int:
+    sql: str = insert_sql(model, field_list)
+    count: int = 0
+    with database.atomic(), driver_errors():
+        cursor = database.cursor()
+        for batch in chunked(row_list, BATCH_ROWS):
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def _drop_indexes(database: SqliteDatabase, model: Type[Model], unique: bool = True) -> List[IndexMetadata]:
+    """
+    Drop indexes of the table of <model>, but those created with the table, e.g. by UNIQUE of columns.
+
+    :return: List[IndexMetadata], of which the sql builds the index again.
+    """
+    index_list: List[IndexMetadata] = [
+        x for x in database.get_indexes(model._meta.table_name) if x.sql is not None and (unique or not x.unique)
+    ]
+    for index in index_list:
+        database.execute_sql(f'DROP INDEX "{index.name}"')
+    return index_list
+
+
+def _create_indexes(database: SqliteDatabase, index_list: List[IndexMetadata]) -> None:
+    for index in index_list:
+        database.execute_sql(index.sql)
+
+
+def _load_sqlite(
+        database: Database,
+        model: Type[Model],
+        field_list: List[Field],
+        row_list: Iterable[Tuple]
+) -> int:
+    sql: str = insert_sql(model, field_list)
+    count: int = 0
+    with database.atomic(), driver_errors():
+        # Indexes are dropped and built again after loading, in the same transaction,
+        # so they are restored if loading fails, e.g. by duplicated keys.
+        index_list: List[IndexMetadata] = _drop_indexes(database, model)
+        cursor = database.cursor()
+        for batch in chunked(row_list, BATCH_ROWS):
+            cursor.executemany(sql, batch)
+            count += len(batch)
+        _create_indexes(database, index_list)
+    return count
+
+
+@contextmanager
+def sqlite_bulk_mode(model_list: List[Type[Model]], database: Optional[Database] = None) -> Iterator[SqliteDatabase]:
+    """
+    Bulk-load mode of SQLite, for the connection of the current thread.
+    On enter, SQLITE_BULK_PRAGMAS are set, and non-unique indexes of tables of <model_list> are dropped,
+    unique ones are kept, as conflicts of upsert and ingest_record are found by them.
+    On exit, the indexes are built again and the pragmas are restored, then ANALYZE if no exception.
+
+    :param model_list: List[Type[Model]], tables to be loaded.
+    :param database: Database, None means db.
+    :return: SqliteDatabase.
+    """
+    database = resolve_database(db if database is None else database)
+    if not isinstance(database, SqliteDatabase):
+        raise TypeError(f'Bulk-load mode is for SQLite, got {type(database).__name__}.')
+
+    saved: Dict[str, Any] = {x: database.pragma(x) for x in SQLITE_BULK_PRAGMAS.keys()}
+    for key, value in SQLITE_BULK_PRAGMAS.items():
+        database.pragma(key, value)
+    index_list: List[IndexMetadata] = []
+    try:
+        for model in model_list:
+            index_list += _drop_indexes(database, model, unique=False)
+        yield database
+    finally:
+        _create_indexes(database, index_list)
+        for key, value in saved.items():
+            database.pragma(key, value)
+    database.execute_sql('ANALYZE;')
+
+
+def bulk_load(model: Type[Model], row_list: Iterable[Tuple], field_list: List[Field]) -> int:
+    """
+    Load rows into the table of <model> in one transaction, by the fastest path of the database:
+        PostgreSQL, COPY FROM STDIN of CSV text;
+        MySQL, executemany, packed into multi-row INSERT by the driver;
+        SQLite, executemany of a prepared INSERT, with indexes built after loading.
+    Rows are not checked or converted by fields, values should be those of the database.
+    Errors of the driver, e.g. of duplicated keys, are raised as those of peewee by driver_errors.
+
+    :param model: Type[Model], the table should exist.
+    :param row_list: Iterable of tuple, values in the order of <field_list>.
+    :param field_list: List[Field], in the order of fields of <model>.
+    :return: int, count of rows loaded.
+    """
+    database: Database = resolve_database(model._meta.database)
+    if isinstance(database, PostgresqlDatabase):
+        return _load_postgresql(database, model, field_list, row_list)
+    if isinstance(database, MySQLDatabase):
+        return _load_mysql(database, model, field_list, row_list)
+    if isinstance(database, SqliteDatabase):
+        return _load_sqlite(database, model, field_list, row_list)
+    raise TypeError(f'Bulk load is not supported for {type(database).__name__}.')
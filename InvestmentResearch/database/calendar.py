@@ -0,0 +1,120 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import List, NamedTuple, Optional, Tuple
+import datetime as dt
+
+import numpy as np
+from peewee import Field, fn, chunked
+
+from ..trading_calendar import WEEKEND, weekend_mask, holiday_mask
+from .reference import reference
+from .bulk import bulk_load
+from .ingestion import MAX_VARIABLE
+from .model import Calendar, DayStatus, Holiday
+
+
+class CalendarUpdate(NamedTuple):
+    """
+    Rows of Calendar written by materialize_calendar.
+    """
+    inserted: int
+    updated: int
+
+
+def calendar_status(
+        holiday_list: List[Tuple[dt.date, dt.date]],
+        begin: dt.date,
+        end: dt.date,
+        weekend: Tuple[int, ...] = WEEKEND
+) -> np.ndarray:
+    """
+    DayStatus values of days from <begin> to <end>, in one vectorized pass.
+    Weekends in a holiday are Holiday.
+
+    :param holiday_list: List of (begin, end) of holidays, both inclusive.
+    :return: np.ndarray of int64, one per day.
+    """
+    status: np.ndarray = np.full((end - begin).days + 1, DayStatus.TradingDay.value, dtype=np.int64)
+    status[weekend_mask(begin, end, weekend)] = DayStatus.Weekend.value
+    status[holiday_mask(holiday_list, begin, end)] = DayStatus.Holiday.value
+    return status
+
+
+def materialize_calendar(
+        country: str = 'CHN',
+        begin: Optional[dt.date] = None,
+        end: Optional[dt.date] = None
+) -> CalendarUpdate:
+    """
+    Fill Calendar with every day of a span, from Holiday rows and weekends of <country>.
+    Only days missing or of which the status changed, e.g. by holidays added later, are written,
+    so it could be run after every change of Holiday.
+    TemporaryClose is not in Holiday, such rows are kept.
+
+    :param country: str, alpha3 of the country.
+    :param begin: dt.date, None means January 1 of the first year of holidays, or the first day in Calendar.
+    :param end: dt.date, None means December 31 of next year, or of the last year of holidays if later,
+                or the last day in Calendar.
+    :return: CalendarUpdate.
+    """
+    country_id: Optional[int] = reference.get('country_alpha3', country)
+    if country_id is None:
+        raise ValueError(f'Country {country} is not in the database.')
+
+    holiday_list: List[Tuple[dt.date, dt.date]] = list(
+        Holiday.select(Holiday.begin, Holiday.end).where(Holiday.country == country_id).tuples()
+    )
+    first, last = Calendar.select(fn.MIN(Calendar.date), fn.MAX(Calendar.date)).where(
+        Calendar.country == country_id
+    ).scalar(as_tuple=True)
+    if begin is None:
+        first_year: int = min(x for x, _ in holiday_list).year if holiday_list else dt.date.today().year
+        begin = min(dt.date(first_year, 1, 1), Calendar.date.python_value(first) or dt.date.max)
+    if end is None:
+        last_year: int = max([y.year for _, y in holiday_list] + [dt.date.today().year]) + 1
+        end = max(dt.date(last_year, 12, 31), Calendar.date.python_value(last) or dt.date.min)
+
+    status: np.ndarray = calendar_status(holiday_list, begin, end)
+    day: np.ndarray = np.arange(np.datetime64(begin, 'D'), np.datetime64(end, 'D') + 1)
+
+    # Days in Calendar, of the span, as (index in <day>, status).
+    existed: np.ndarray = np.asarray(
+        [
+            ((Calendar.date.python_value(x) - begin).days, y)
+            for x, y in Calendar.select(Calendar.date, Calendar.status).where(
+                (Calendar.country == country_id) & (Calendar.date >= begin) & (Calendar.date <= end)
+            ).tuples()
+        ],
+        dtype=np.int64
+    ).reshape(-1, 2)
+    missing: np.ndarray = np.ones(len(day), dtype=np.bool_)
+    missing[existed[:, 0]] = False
+    changed: np.ndarray = existed[
+        (existed[:, 1] != status[existed[:, 0]]) & (existed[:, 1] != DayStatus.TemporaryClose.value), 0
+    ]
+
+    field_list: List[Field] = [Calendar.date, Calendar.status, Calendar.country]
+    row_list: List[Tuple[str, int, int]] = list(zip(
+        np.datetime_as_string(day[missing]).tolist(),
+        status[missing].tolist(),
+        [country_id] * int(missing.sum())
+    ))
+    with Calendar._meta.database.atomic():
+        if first is None:
+            # The first materialization of the country, by the fastest path, which rebuilds indexes on SQLite.
+            bulk_load(Calendar, row_list, field_list)
+        else:
+            # A few days when extended, indexes are kept.
+            for batch in chunked(row_list, MAX_VARIABLE // len(field_list)):
+                Calendar.insert_many(batch, fields=field_list).execute()
+        for value in np.unique(status[changed]).tolist():
+            date_list: List[str] = np.datetime_as_string(day[changed[status[changed] == value]]).tolist()
+            for batch in chunked(date_list, MAX_VARIABLE - 2):
+                Calendar.update(status=value).where(
+                    (Calendar.country == country_id) & (Calendar.date.in_(batch))
+                ).execute()
+    return CalendarUpdate(inserted=len(row_list), updated=len(changed))
+
@@ -0,0 +1,195 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from peewee import ModelSelect, JOIN
+
+from .bulk import bulk_load
+from .model import DomesticAdministrativeDivisions, DomesticAdministrativeDivisionsClosure
+
+
+DAD = DomesticAdministrativeDivisions
+Closure = DomesticAdministrativeDivisionsClosure
+
+
+def closure_pairs(parent: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pairs of ancestor and descendant of a forest, one pass per level.
+
+    :param parent: np.ndarray of int, index of the parent of each node, -1 for roots.
+    :return: Tuple of np.ndarray, ancestor, descendant and depth, including each node with itself at depth 0.
+    """
+    parent = np.asarray(parent, dtype=np.int64)
+    node: np.ndarray = np.arange(len(parent))
+    ancestor: np.ndarray = node
+    piece_list: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    depth: int = 0
+    while len(node):
+        if depth > len(parent):
+            raise ValueError('There is a cycle in <parent>.')
+        piece_list.append((ancestor, node, np.full(len(node), depth, dtype=np.int64)))
+        keep: np.ndarray = parent[ancestor] >= 0
+        node, ancestor = node[keep], parent[ancestor[keep]]
+        depth += 1
+    return (
+        np.concatenate([x for x, _, _ in piece_list]),
+        np.concatenate([x for _, x, _ in piece_list]),
+        np.concatenate([x for _, _, x in piece_list]),
+    )
+
+
+def build_dad_closure() -> int:
+    """
+    Build the closure table of DomesticAdministrativeDivisions again, from <upper> of all rows, in bulk.
+    Called when DomesticAdministrativeDivisions is loaded.
+
+    :return: int, count of rows of the closure table.
+    """
+    Closure.create_table()
+    row_list: List[Tuple[int, Optional[int]]] = list(DAD.select(DAD.id, DAD.upper).tuples())
+    id_array: np.ndarray = np.asarray([x for x, _ in row_list], dtype=np.int64)
+    index_map: Dict[int, int] = {x: i for i, x in enumerate(id_array.tolist())}
+    ancestor, descendant, depth = closure_pairs(
+        np.asarray([-1 if x is None else index_map[x] for _, x in row_list], dtype=np.int64)
+    )
+    with Closure._meta.database.atomic():
+        Closure.delete().execute()
+        if not len(depth):
+            return 0
+        return bulk_load(
+            Closure,
+            zip(id_array[ancestor].tolist(), id_array[descendant].tolist(), depth.tolist()),
+            [Closure.ancestor, Closure.descendant, Closure.depth]
+        )
+
+
+def dad_descendants(symbol: str, depth: Optional[int] = None) -> ModelSelect:
+    """
+    Divisions under the division of <symbol>, by one query on the closure table.
+
+    :param symbol: str, symbol of the division.
+    :param depth: int, levels under the division, None means all, e.g. 1 for direct lowers.
+    :return: ModelSelect of DomesticAdministrativeDivisions, with <depth>, ordered by symbol.
+    """
+    ancestor = DAD.alias()
+    condition = (ancestor.symbol == symbol) & (Closure.depth > 0)
+    if depth is not None:
+        condition &= Closure.depth == depth
+    return DAD.select(DAD, Closure.depth.alias('depth')).join(
+        Closure, on=(Closure.descendant == DAD.id)
+    ).join(
+        ancestor, on=(Closure.ancestor == ancestor.id)
+    ).where(condition).order_by(DAD.symbol).objects()
+
+
+def dad_path(symbol: str) -> ModelSelect:
+    """
+    The division of <symbol> and all above it, by one query on the closure table.
+
+    :param symbol: str, symbol of the division.
+    :return: ModelSelect of DomesticAdministrativeDivisions, with <depth>, from the top to the division.
+    """
+    descendant = DAD.alias()
+    return DAD.select(DAD, Closure.depth.alias('depth')).join(
+        Closure, on=(Closure.ancestor == DAD.id)
+    ).join(
+        descendant, on=(Closure.descendant == descendant.id)
+    ).where(descendant.symbol == symbol).order_by(Closure.depth.desc()).objects()
+
+
+class DadTree:
+    """
+    In-memory tree of administrative divisions, for walking and rolling up values of regions.
+    Built once from pairs of symbol and upper symbol, walks are lookups of arrays of the closure.
+    """
+    _symbol: List[str]
+    _index: Dict[str, int]
+    _parent: np.ndarray
+    _ancestor: np.ndarray
+    _descendant: np.ndarray
+    _depth: np.ndarray
+    _lower: List[List[int]]
+
+    def __init__(self, pair_list: Iterable[Tuple[str, Optional[str]]]) -> None:
+        """
+        :param pair_list: Iterable of (symbol, symbol of upper), upper is None for the top.
+        """
+        pair_list = list(pair_list)
+        self._symbol = [x for x, _ in pair_list]
+        self._index = {x: i for i, x in enumerate(self._symbol)}
+        self._parent = np.asarray([-1 if y is None else self._index[y] for _, y in pair_list], dtype=np.int64)
+        self._ancestor, self._descendant, self._depth = closure_pairs(self._parent)
+        self._lower = [[] for _ in self._symbol]
+        for i, x in enumerate(self._parent.tolist()):
+            if x >= 0:
+                self._lower[x].append(i)
+
+    def __repr__(self) -> str:
+        return f'<DadTree(divisions={len(self._symbol)}, top={len(self.top())})>'
+
+    def __len__(self) -> int:
+        return len(self._symbol)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
+
+    @classmethod
+    def from_database(cls) -> 'DadTree':
+        """
+        Tree of all rows of DomesticAdministrativeDivisions, by one query.
+        """
+        upper = DAD.alias()
+        return cls(
+            DAD.select(DAD.symbol, upper.symbol).join(
+                upper, on=(DAD.upper == upper.id), join_type=JOIN.LEFT_OUTER
+            ).tuples()
+        )
+
+    def top(self) -> List[str]:
+        """
+        Divisions without upper, e.g. provinces.
+        """
+        return [self._symbol[i] for i in np.flatnonzero(self._parent < 0).tolist()]
+
+    def upper(self, symbol: str) -> Optional[str]:
+        index: int = int(self._parent[self._index[symbol]])
+        return self._symbol[index] if index >= 0 else None
+
+    def lower(self, symbol: str) -> List[str]:
+        return [self._symbol[i] for i in self._lower[self._index[symbol]]]
+
+    def path(self, symbol: str) -> List[str]:
+        """
+        Symbols from the top to <symbol>.
+        """
+        mask: np.ndarray = self._descendant == self._index[symbol]
+        order: np.ndarray = np.argsort(-self._depth[mask])
+        return [self._symbol[i] for i in self._ancestor[mask][order].tolist()]
+
+    def descendants(self, symbol: str, depth: Optional[int] = None) -> List[str]:
+        """
+        Symbols under <symbol>, all levels if <depth> is None.
+        """
+        mask: np.ndarray = (self._ancestor == self._index[symbol]) & (self._depth > 0)
+        if depth is not None:
+            mask &= self._depth == depth
+        return sorted(self._symbol[i] for i in self._descendant[mask].tolist())
+
+    def rollup(self, value: pd.Series) -> pd.Series:
+        """
+        Sum of values of each division and all under it.
+
+        :param value: pd.Series indexed by symbol, symbols not in the tree are ignored.
+        :return: pd.Series indexed by all symbols of the tree.
+        """
+        own: np.ndarray = np.zeros(len(self._symbol), dtype=np.float64)
+        index: pd.Series = pd.Series(self._index)
+        value = value[value.index.isin(index.index)]
+        np.add.at(own, index[value.index].to_numpy(), value.to_numpy(dtype=np.float64))
+        total: np.ndarray = np.bincount(self._ancestor, weights=own[self._descendant], minlength=len(self._symbol))
+        return pd.Series(total, index=self._symbol)
@@ -0,0 +1,218 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Type
+from itertools import repeat
+import datetime as dt
+import time
+
+import numpy as np
+from peewee import Model, Field, Insert, MySQLDatabase, chunked
+
+from InvestmentResearch.collector.reader.tdx.definition import TdxPeriodEnum, TdxRecordTypeEnum
+from InvestmentResearch.collector.reader.tdx.record import RECORD_COLUMN
+from .interface import resolve_database, driver_errors
+from .model import (
+    Stock,
+    CashRecord,
+    OrderRecord,
+    TradeRecord,
+    SettleRecord,
+)
+from .model.quote import QuotePeriod, StockQuoteDaily, StockQuoteMinutely
+
+
+# SQLite before 3.32 allows 999 variables in a statement.
+MAX_VARIABLE: int = 999
+
+RECORD_MODEL: Dict[TdxRecordTypeEnum, Type[Model]] = {
+    TdxRecordTypeEnum.Cash: CashRecord,
+    TdxRecordTypeEnum.Order: OrderRecord,
+    TdxRecordTypeEnum.Trade: TradeRecord,
+    TdxRecordTypeEnum.Settle: SettleRecord,
+}
+
+# Rows in one transaction of ingest_quote.
+TRANSACTION_ROWS: int = 200000
+
+QUOTE_PERIOD: Dict[TdxPeriodEnum, QuotePeriod] = {
+    TdxPeriodEnum.Minute1: QuotePeriod.Minute1,
+    TdxPeriodEnum.Minute5: QuotePeriod.Minute5,
+    TdxPeriodEnum.Day: QuotePeriod.Day,
+}
+
+PRICE_COLUMNS: List[str] = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+class IngestionProgress(NamedTuple):
+    """
+    Progress of ingest_quote.
+    """
+    rows: int
+    seconds: float
+    skipped: List[str]
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _unique_key(model: Type[Model]) -> List[Field]:
+    """
+    Fields of the first unique index of <model>.
+    """
+    for field_name_list, unique in model._meta.indexes:
+        if unique:
+            return [model._meta.fields[x] for x in field_name_list]
+    raise ValueError(f'{model.__name__} has no unique index.')
+
+
+def _on_conflict_update(
+        query: Insert,
+        model: Type[Model],
+        field_list: List[Field],
+        key_list: Optional[List[Field]] = None
+) -> Insert:
+    """
+    Update fields not in the unique key on conflict,
+    ON CONFLICT DO UPDATE for SQLite and PostgreSQL, ON DUPLICATE KEY UPDATE for MySQL.
+    """
+    key_list = _unique_key(model) if key_list is None else key_list
+    # Field overloads ==, compare by name.
+    key_name: List[str] = [x.name for x in key_list]
+    preserve: List[Field] = [x for x in field_list if x.name not in key_name]
+    if isinstance(resolve_database(model._meta.database), MySQLDatabase):
+        return query.on_conflict(preserve=preserve)
+    return query.on_conflict(conflict_target=key_list, preserve=preserve)
+
+
+def upsert(
+        model: Type[Model],
+        row_list: Iterable[Tuple],
+        field_list: List[Field],
+        key_list: Optional[List[Field]] = None
+) -> int:
+    """
+    Insert rows, or update rows of the same unique key, in one transaction.
+
+    :param model: Type[Model], with a unique index, e.g. StockQuoteDaily.
+    :param row_list: Iterable of tuple, values in the order of <field_list>.
+    :param field_list: List[Field], including all fields of the unique key.
+    :param key_list: List[Field], fields of a unique index or a unique field,
+                     None means the first unique index in Meta.indexes.
+    :return: int, count of rows inserted or updated.
+    """
+    count: int = 0
+    with model._meta.database.atomic():
+        for batch in chunked(row_list, MAX_VARIABLE // len(field_list)):
+            _on_conflict_update(
+                model.insert_many(batch, fields=field_list), model, field_list, key_list
+            ).execute()
+            count += len(batch)
+    return count
+
+
+def stock_id_map() -> Dict[str, int]:
+    """
+    Map from symbol to id of Stock, in one query.
+
+    :return: Dict[str, int].
+    """
+    return {symbol: id_ for symbol, id_ in Stock.select(Stock.symbol, Stock.id).tuples()}
+
+
+def _quote_rows(
+        quote_iter: Iterable[Tuple[str, Dict[str, np.ndarray]]],
+        period: TdxPeriodEnum,
+        name_list: List[str],
+        id_map: Dict[str, int],
+        skipped: List[str]
+) -> Iterator[Tuple]:
+    """
+    Rows of the quote model, values in the order of <name_list>, converted column by column.
+    """
+    for symbol, column in quote_iter:
+        if symbol not in id_map:
+            skipped.append(symbol)
+            continue
+        value: Dict[str, Iterable] = {x: column[x].tolist() for x in PRICE_COLUMNS}
+        value['symbol'] = repeat(id_map[symbol])
+        if period == TdxPeriodEnum.Day:
+            value['date'] = column['date'].astype(dt.date).tolist()
+        else:
+            value['datetime'] = column['datetime'].astype(dt.datetime).tolist()
+            value['period'] = repeat(QUOTE_PERIOD[period].value)
+        yield from zip(*[value[x] for x in name_list])
+
+
+def ingest_quote(
+        quote_iter: Iterable[Tuple[str, Dict[str, np.ndarray]]],
+        period: TdxPeriodEnum,
+        id_map: Optional[Dict[str, int]] = None,
+        progress: Optional[Callable[[IngestionProgress], None]] = None,
+        transaction_rows: int = TRANSACTION_ROWS,
+        replace: bool = False
+) -> IngestionProgress:
+    """
+    Load quotes of stocks into StockQuoteDaily or StockQuoteMinutely,
+    by executemany of tuples, in transactions of <transaction_rows> rows.
+
+    :param quote_iter: Iterable of (symbol, columns), columns are the Numpy result of read_quote.
+    :param period: TdxPeriodEnum.
+    :param id_map: Dict[str, int], map from symbol to id of Stock, None means stock_id_map().
+    :param progress: Callable, called with IngestionProgress after each transaction.
+    :param transaction_rows: int, rows in one transaction.
+    :param replace: bool, if True, bars already loaded are updated, otherwise they raise IntegrityError.
+    :return: IngestionProgress, symbols not in <id_map> are skipped.
+    """
+    model: Type[Model] = StockQuoteDaily if period == TdxPeriodEnum.Day else StockQuoteMinutely
+    model.create_table()
+    # Peewee puts columns of INSERT in the order of fields of the model.
+    field_list: List[Field] = [x for x in model._meta.sorted_fields if x is not model._meta.primary_key]
+
+    begin: float = time.perf_counter()
+    rows: int = 0
+    skipped: List[str] = []
+    row_iter: Iterator[Tuple] = _quote_rows(
+        quote_iter, period, [x.name for x in field_list], stock_id_map() if id_map is None else id_map, skipped
+    )
+    # One prepared statement, executed with all rows of a transaction.
+    query: Insert = model.insert({x: None for x in field_list}).returning()
+    if replace:
+        query = _on_conflict_update(query, model, field_list)
+    sql, _ = query.sql()
+    database = model._meta.database
+    for transaction in chunked(row_iter, transaction_rows):
+        # Errors of the driver are raised as those of peewee, as Model.insert does.
+        with database.atomic(), driver_errors():
+            database.cursor().executemany(sql, transaction)
+        rows += len(transaction)
+        if progress is not None:
+            progress(IngestionProgress(rows, time.perf_counter() - begin, skipped))
+    return IngestionProgress(rows, time.perf_counter() - begin, skipped)
+
+
+def ingest_record(record_list: Iterable[Dict[str, Any]], type_: TdxRecordTypeEnum) -> int:
+    """
+    Load records read by read_record / iter_record into the database, in one transaction.
+    Records already loaded, by the unique index of the model, are skipped,
+    so loading an overlapping export again is safe.
+
+    :param record_list: Iterable of Dict[str, Any], as read_record returns.
+    :param type_: TdxRecordTypeEnum.
+    :return: int, count of records inserted.
+    """
+    model: Type[Model] = RECORD_MODEL[type_]
+    model.create_table()
+
+    key_list: List[str] = [key for key, _, _ in RECORD_COLUMN[type_]]
+    field_list: List[Field] = [model._meta.fields[key] for key in key_list]
+    row_list: Iterable[Tuple] = (tuple(record[key] for key in key_list) for record in record_list)
+
+    with model._meta.database.atomic():
+        count_before: int = model.select().count()
+        for batch in chunked(row_list, MAX_VARIABLE // len(field_list)):
+            model.insert_many(batch, fields=field_list).on_conflict_ignore().execute()
+        return model.select().count() - count_before
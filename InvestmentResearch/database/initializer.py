@@ -3,16 +3,23 @@
 __author__ = 'Bruce Frank Wong'
 
 
-from typing import List, Type
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
 from pathlib import Path
 import csv
+import datetime as dt
+import hashlib
 
-from peewee import Model
+from peewee import Model, Field, chunked
 
 from InvestmentResearch.utility import PACKAGE_PATH, CONFIGS
 from .interface import db
+from .reference import reference
+from .ingestion import MAX_VARIABLE, upsert
+from .calendar import materialize_calendar
+from .dad import build_dad_closure
 from .model import (
     Country,
+    Calendar,
     Holiday,
     Exchange,
     ExchangeNotice,
@@ -20,60 +27,220 @@ from .model import (
     StockStatusEnum,
     Announcement,
     Stock,
+    DomesticAdministrativeDivisions,
+    DomesticAdministrativeDivisionsClosure,
+    PlantingArea,
+    DataDigest,
+    OptionProduct,
 )
 
 
 INITIAL_DATA_PATH: Path = PACKAGE_PATH.joinpath('data')
 
+Row = Dict[str, str]
 
-def initialize_country() -> None:
+
+class InitialTable(NamedTuple):
     """
-    Initialize the Country model.
-    :return: None.
+    A table loaded from a CSV file in INITIAL_DATA_PATH.
+    <convert> turns all rows of the CSV file into values of fields, foreign keys are ids.
+    Rows are upserted by <key>, or, if <key> is None, all rows of the table are replaced.
+    <after> builds tables derived from the table, in the same transaction.
     """
-    Country.create_table()
+    model: Type[Model]
+    csv_name: str
+    key: Optional[Tuple[str, ...]]
+    convert: Callable[[List[Row]], List[Dict[str, Any]]]
+    after: Optional[Callable[[], Any]] = None
 
-    csv_path: Path = INITIAL_DATA_PATH.joinpath('country.csv')
-    with open(csv_path, mode='r', newline='', encoding='utf-8') as csv_file:
-        reader = csv.DictReader(csv_file)
-        model_list = [
-            Country(
-                name_zh=row['name_zh'],
-                name_en=row['name_en'],
-                fullname_zh=row['fullname_zh'],
-                fullname_en=row['fullname_en'],
-                alpha2=row['alpha2'],
-                alpha3=row['alpha3'],
-                numeric=row['numeric']
-            ) for row in reader
-        ]
-
-    with db.atomic():
-        Country.bulk_create(model_list, batch_size=100)
 
+def _none_if_empty(value: str) -> Optional[str]:
+    return value if value else None
 
-def initialize_holiday() -> None:
+
+def _convert_country(row_list: List[Row]) -> List[Dict[str, Any]]:
+    return [
+        {
+            'name_zh': row['name_zh'],
+            'name_en': row['name_en'],
+            'fullname_zh': _none_if_empty(row['fullname_zh']),
+            'fullname_en': _none_if_empty(row['fullname_en']),
+            'alpha2': row['alpha2'],
+            'alpha3': row['alpha3'],
+            'numeric': row['numeric'],
+        } for row in row_list
+    ]
+
+
+def _convert_exchange(row_list: List[Row]) -> List[Dict[str, Any]]:
+    country: Dict[str, int] = reference.map('country_alpha3')
+    return [
+        {
+            'symbol': row['symbol'],
+            'name': row['name'],
+            'fullname': row['fullname'],
+            'url': _none_if_empty(row['url']),
+            'country': country[row['country']],
+        } for row in row_list
+    ]
+
+
+def _convert_holiday(row_list: List[Row]) -> List[Dict[str, Any]]:
+    country: Dict[str, int] = reference.map('country_alpha3')
+    return [
+        {
+            'begin': dt.date.fromisoformat(row['begin']),
+            'end': dt.date.fromisoformat(row['end']),
+            'name': row['name'],
+            'url': _none_if_empty(row['url']),
+            'country': country[row['country']],
+        } for row in row_list
+    ]
+
+
+def _dad_upper(symbol: str, id_map: Dict[str, int]) -> Optional[int]:
+    # Codes are SSCCDD, the upper is the prefecture SSCC00 if listed, otherwise the province SS0000.
+    for upper in (f'{symbol[:4]}00', f'{symbol[:2]}0000'):
+        if upper != symbol and upper in id_map:
+            return id_map[upper]
+    return None
+
+
+def _convert_dad(row_list: List[Row]) -> List[Dict[str, Any]]:
+    # Ids are given, so that <upper> is resolved without querying, uppers are sorted before lowers.
+    # Most rows leave <upper> empty, it is found by the code then.
+    row_list = sorted(row_list, key=lambda x: x['symbol'])
+    id_map: Dict[str, int] = {row['symbol']: i + 1 for i, row in enumerate(row_list)}
+    return [
+        {
+            'id': id_map[row['symbol']],
+            'symbol': row['symbol'],
+            'name': row['abbr_2'] if row['abbr_2'] else row['name'],
+            'fullname': row['name'],
+            'upper': id_map[row['upper']] if row['upper'] else _dad_upper(row['symbol'], id_map),
+        } for row in row_list
+    ]
+
+
+def _convert_option(row_list: List[Row]) -> List[Dict[str, Any]]:
+    exchange: Dict[str, int] = reference.map('exchange')
+    return [
+        {
+            'exchange': exchange[row['exchange']],
+            'symbol': row['symbol'],
+            'name': row['name'],
+            'underlying_exchange': row['underlying_exchange'],
+            'underlying_product': row['underlying_product'],
+            'mode': row['mode'],
+            'listed_date': dt.date.fromisoformat(row['listed_date']),
+            'listed_notice': _none_if_empty(row['listed_notice']),
+            'delisted_date': dt.date.fromisoformat(row['delisted_date']) if row['delisted_date'] else None,
+            'delisted_notice': _none_if_empty(row['delisted_notice']),
+            'first_listed_contract': _none_if_empty(row['first_listed_contract']),
+        } for row in row_list
+    ]
+
+
+def _convert_planting_area(row_list: List[Row]) -> List[Dict[str, Any]]:
+    # One column per province, empty cells are not surveyed.
+    return [
+        {
+            'year': int(row['年份']),
+            'product': row['品种'],
+            'province': province,
+            'area': float(area),
+        } for row in row_list
+        for province, area in row.items()
+        if province not in ('年份', '品种') and province is not None and area
+    ]
+
+
+# In the order of foreign keys.
+INITIAL_TABLE: List[InitialTable] = [
+    InitialTable(Country, 'country.csv', ('alpha3',), _convert_country),
+    InitialTable(Exchange, 'exchange.csv', ('symbol',), _convert_exchange),
+    InitialTable(Holiday, 'holiday.csv', None, _convert_holiday),
+    InitialTable(DomesticAdministrativeDivisions, 'dad.csv', None, _convert_dad, build_dad_closure),
+    InitialTable(OptionProduct, 'option.csv', ('exchange', 'symbol'), _convert_option),
+    InitialTable(PlantingArea, 'planting_area.csv', None, _convert_planting_area),
+]
+
+# Tables created empty.
+EMPTY_TABLE: List[Type[Model]] = [
+    ExchangeNotice,     # 交易所公告
+    Calendar,           # 由 Holiday 生成
+    DomesticAdministrativeDivisionsClosure,     # 由 DomesticAdministrativeDivisions 生成
+    Stock,
+    Announcement,       # 披露
+]
+
+
+def _digest(csv_path: Path) -> str:
+    return hashlib.sha256(csv_path.read_bytes()).hexdigest()
+
+
+def initialize_table(table: InitialTable, force: bool = False) -> bool:
     """
-    Initialize the Holiday model.
-    :return: None.
+    Load a table from its CSV file, in one transaction, skipped if the CSV file is not changed since last loaded.
+
+    :param table: InitialTable.
+    :param force: bool, if True, load even if not changed.
+    :return: bool, True if loaded.
     """
-    csv_path: Path = INITIAL_DATA_PATH.joinpath('holiday.csv')
+    csv_path: Path = INITIAL_DATA_PATH.joinpath(table.csv_name)
+    digest: str = _digest(csv_path)
+    DataDigest.create_table()
+    if not force and DataDigest.select().where(
+            (DataDigest.name == table.model._meta.table_name) & (DataDigest.digest == digest)
+    ).exists():
+        return False
 
     with open(csv_path, mode='r', newline='', encoding='utf-8') as csv_file:
-        reader = csv.DictReader(csv_file)
-        model_list = [
-            Holiday(
-                begin=row['begin'],
-                end=row['end'],
-                name=row['name'],
-                url=row['url'],
-                country=Country.get(Country.alpha3 == row['country'])
-            ) for row in reader
-        ]
-    
-    Holiday.create_table()
-    with db.atomic():
-        Holiday.bulk_create(model_list, batch_size=100)
+        row_list: List[Row] = list(csv.DictReader(csv_file))
+    value_list: List[Dict[str, Any]] = table.convert(row_list)
+    field_list: List[Field] = [table.model._meta.fields[x] for x in value_list[0].keys()] if value_list else []
+
+    table.model.create_table()
+    with table.model._meta.database.atomic():
+        if table.key is None:
+            table.model.delete().execute()
+            for batch in chunked(value_list, MAX_VARIABLE // max(len(field_list), 1)):
+                table.model.insert_many([tuple(x.values()) for x in batch], fields=field_list).execute()
+        elif value_list:
+            upsert(
+                table.model,
+                (tuple(x.values()) for x in value_list),
+                field_list,
+                [table.model._meta.fields[x] for x in table.key]
+            )
+        upsert(
+            DataDigest,
+            [(table.model._meta.table_name, digest, dt.datetime.now())],
+            [DataDigest.name, DataDigest.digest, DataDigest.loaded],
+            [DataDigest.name]
+        )
+        if table.after is not None:
+            table.after()
+    reference.invalidate(table.model)
+    return True
+
+
+def _initial_table(model: Type[Model]) -> InitialTable:
+    """
+    InitialTable of <model>, by model rather than by position, which changes when tables are added.
+    """
+    table: Optional[InitialTable] = next((x for x in INITIAL_TABLE if x.model is model), None)
+    if table is None:
+        raise ValueError(f'{model.__name__} is not in INITIAL_TABLE.')
+    return table
+
+
+def initialize_country() -> None:
+    """
+    Initialize the Country model.
+    :return: None.
+    """
+    initialize_table(_initial_table(Country))
 
 
 def initialize_exchange() -> None:
@@ -81,23 +248,15 @@ def initialize_exchange() -> None:
     Initialize the Exchange model.
     :return: None.
     """
-    csv_path: Path = INITIAL_DATA_PATH.joinpath('exchange.csv')
+    initialize_table(_initial_table(Exchange))
 
-    with open(csv_path, mode='r', newline='', encoding='utf-8') as csv_file:
-        reader = csv.DictReader(csv_file)
-        model_list = [
-            Exchange(
-                symbol=row['symbol'],
-                name=row['name'],
-                fullname=row['fullname'],
-                url=row['url'],
-                country=Country.get(Country.alpha3 == row['country'])
-            ) for row in reader
-        ]
-    
-    Exchange.create_table()
-    with db.atomic():
-        Exchange.bulk_create(model_list, batch_size=100)
+
+def initialize_holiday() -> None:
+    """
+    Initialize the Holiday model.
+    :return: None.
+    """
+    initialize_table(_initial_table(Holiday))
 
 
 def initialize_exchange_notice() -> None:
@@ -113,51 +272,35 @@ def initialize_stock_status() -> None:
     Initialize the StockStatus model.
     :return: None.
     """
-    model_list: List[StockStatus] = [StockStatus(status=status.value) for status in StockStatusEnum]
-
     StockStatus.create_table()
-    with db.atomic():
-        StockStatus.bulk_create(model_list, batch_size=100)
+    StockStatus.insert_many(
+        [(status.value,) for status in StockStatusEnum],
+        fields=[StockStatus.status]
+    ).on_conflict_ignore().execute()
 
 
-def initialize_all(drop: bool = False) -> None:
+def initialize_all(drop: bool = False, force: bool = False) -> List[str]:
     """
-    Initialize all the models.
-    :return: None.
+    Initialize all the models, tables of which the CSV file is not changed are skipped,
+    so it could be run again to refresh the database.
+    :param drop: bool, if True, drop all the tables first.
+    :param force: bool, if True, load all the CSV files even if not changed.
+    :return: List[str], names of tables loaded.
     """
-    if CONFIGS['DEBUG'] is not True:
-        model_list: List[Type[Model]] = [
-            Country,            # 国家
-            Holiday,            # 假日
-            Exchange,           # 交易所
-            ExchangeNotice,     # 交易所公告
-            Stock,
-            StockStatus,        # 股票状态
-            Announcement,       # 披露
-        ]
-        if drop is True:
-            print('Dropping tables:')
-            for i in range(len(model_list), 0, -1):
-                print(f'\t{model_list[i-1]} ...')
-                model_list[i-1].drop_table()
-
-        print('Creating tables:')
-        for model in model_list:
-            model.create_table()
-            print(f'\t{model} ...')
-
-        print('Initializing tables:')
-        print('\t<Model: Country> ...')
-        initialize_country()
-
-        print('\t<Model: Holiday> ...')
-        initialize_holiday()
-
-        print('\t<Model: Exchange> ...')
-        initialize_exchange()
-
-        print('\t<Model: ExchangeNotice> ...')
-        initialize_exchange_notice()
-
-        print('\t<Model: StockStatus> ...')
-        initialize_stock_status()
+    if CONFIGS['DEBUG'] is True:
+        return []
+
+    model_list: List[Type[Model]] = [x.model for x in INITIAL_TABLE] + EMPTY_TABLE + [StockStatus, DataDigest]
+    if drop is True:
+        db.drop_tables(model_list)
+        reference.invalidate()
+    db.create_tables(model_list)
+
+    loaded: List[str] = [
+        table.model._meta.table_name for table in INITIAL_TABLE if initialize_table(table, force or drop)
+    ]
+    initialize_stock_status()
+    # Extended every run, as days of next year are added when the year changes.
+    for country, in Holiday.select(Country.alpha3).join(Country).distinct().tuples():
+        materialize_calendar(country)
+    return loaded
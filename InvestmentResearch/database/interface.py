@@ -3,31 +3,98 @@
 __author__ = 'Bruce Frank Wong'
 
 
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Iterator, Optional, Type, Union
+from contextlib import contextmanager
+from pathlib import Path
 
 from peewee import (
     Database,
+    DatabaseProxy,
     SqliteDatabase,
     MySQLDatabase,
-    PostgresqlDatabase
+    PostgresqlDatabase,
+    PeeweeException,
+    DatabaseError,
+    DataError,
+    IntegrityError,
+    InterfaceError,
+    InternalError,
+    NotSupportedError,
+    OperationalError,
+    ProgrammingError,
 )
+from playhouse.pool import PooledMySQLDatabase, PooledPostgresqlDatabase
 
 from InvestmentResearch.utility import CONFIGS, PACKAGE_PATH
 
 
-def create_sqlite_database(settings: Dict[str, str]) -> SqliteDatabase:
-    return SqliteDatabase(
-        PACKAGE_PATH.joinpath(settings['database']),
-        pragmas={
-            'journal_mode': 'wal',
-            'encoding': 'utf8',
-            'cache_size': -640000,  # 64MB
-            'foreign_keys': 1,  # Enforce foreign-key constraints
-        }
-    )
+# Defaults of <pool> in a MySQL or PostgreSQL profile, which is true or a dict overriding some of them.
+#   max_connections, connections opened at most;
+#   stale_timeout, seconds, idle connections older than it are closed instead of reused;
+#   timeout, seconds to wait for a free connection when all are in use, 0 means waiting forever.
+POOL_SETTINGS: Dict[str, Any] = {
+    'max_connections': 20,
+    'stale_timeout': 300,
+    'timeout': 10,
+}
 
 
-def create_mysql_database(settings: Dict[str, str]) -> MySQLDatabase:
+def _pool_settings(settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Pool settings of the profile, None if not pooled.
+    """
+    pool: Union[bool, Dict[str, Any], None] = settings.get('pool')
+    if not pool:
+        return None
+    return {**POOL_SETTINGS, **(pool if isinstance(pool, dict) else {})}
+
+
+# Pragmas of SQLite, by <mode> of the profile.
+#   default, for reading and writing;
+#   analytic, the file is opened read-only as immutable, and read through mmap, nothing is locked or journaled,
+#             it should not be written by other connections while opened so.
+SQLITE_PRAGMAS: Dict[str, Dict[str, Any]] = {
+    'default': {
+        'journal_mode': 'wal',
+        'encoding': 'utf8',
+        'cache_size': -640000,  # 64MB
+        'foreign_keys': 1,  # Enforce foreign-key constraints
+    },
+    'analytic': {
+        'cache_size': -640000,
+        'mmap_size': 1 << 32,   # 4GB, as much as the file
+        'temp_store': 'memory',
+        'query_only': 1,
+    },
+}
+
+
+def create_sqlite_database(settings: Dict[str, Any]) -> SqliteDatabase:
+    """
+    Create a SQLite database, <mode> of the profile is a key of SQLITE_PRAGMAS, 'default' if not set.
+    """
+    path: Path = PACKAGE_PATH.joinpath(settings['database'])
+    mode: str = settings.get('mode', 'default')
+    if mode == 'analytic':
+        return SqliteDatabase(
+            f'{path.as_uri()}?mode=ro&immutable=1',
+            uri=True,
+            pragmas=SQLITE_PRAGMAS[mode]
+        )
+    return SqliteDatabase(path, pragmas=SQLITE_PRAGMAS[mode])
+
+
+def create_mysql_database(settings: Dict[str, Any]) -> MySQLDatabase:
+    pool: Optional[Dict[str, Any]] = _pool_settings(settings)
+    if pool is not None:
+        return PooledMySQLDatabase(
+            settings['database'],
+            user=settings['user'],
+            password=settings['password'],
+            host=settings['host'],
+            port=settings['port'],
+            **pool
+        )
     return MySQLDatabase(
         settings['database'],
         user=settings['user'],
@@ -37,12 +104,22 @@ def create_mysql_database(settings: Dict[str, str]) -> MySQLDatabase:
     )
 
 
-def create_postgresql_database(settings: Dict[str, str]) -> PostgresqlDatabase:
+def create_postgresql_database(settings: Dict[str, Any]) -> PostgresqlDatabase:
     """
-    Create a PostgreSQL connect.
+    Create a PostgreSQL connect, pooled if <pool> is set in the profile.
     :param settings:
     :return:
     """
+    pool: Optional[Dict[str, Any]] = _pool_settings(settings)
+    if pool is not None:
+        return PooledPostgresqlDatabase(
+            settings['database'],
+            user=settings['user'],
+            password=settings['password'],
+            host=settings['host'],
+            port=settings['port'],
+            **pool
+        )
     return PostgresqlDatabase(
         settings['database'],
         user=settings['user'],
@@ -52,14 +129,20 @@ def create_postgresql_database(settings: Dict[str, str]) -> PostgresqlDatabase:
     )
 
 
-def create_database() -> Database:
+def create_database(profile: Optional[str] = None) -> Database:
+    """
+    Create the database of a profile in CONFIGS['database'].
+
+    :param profile: str, None means CONFIGS['database']['current'], or 'dev' if not set.
+    :return: Database.
+    """
     driver_mapper: Dict[str, Callable] = {
         'SQLITE': create_sqlite_database,
         'MYSQL': create_mysql_database,
         'POSTGRESQL': create_postgresql_database,
     }
 
-    config_name: str = CONFIGS['database']['current']
+    config_name: str = CONFIGS['database'].get('current', 'dev') if profile is None else profile
     config: Dict[str, Any] = CONFIGS['database'][config_name]
     driver: str = config['driver'].upper()
 
@@ -68,4 +151,99 @@ def create_database() -> Database:
     return driver_mapper[driver](config)
 
 
-db: Database = create_database()
+class LazyDatabaseProxy(DatabaseProxy):
+    """
+    DatabaseProxy initialized by init_db() with the current profile on first use,
+    so importing models neither reads the profile nor connects.
+    """
+
+    def get_database(self) -> Database:
+        if self.obj is None:
+            init_db()
+        return self.obj
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr in DatabaseProxy.__slots__:
+            raise AttributeError(attr)
+        return getattr(self.get_database(), attr)
+
+    def __enter__(self) -> Database:
+        return self.get_database().__enter__()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        return self.get_database().__exit__(exc_type, exc_val, exc_tb)
+
+
+db: LazyDatabaseProxy = LazyDatabaseProxy()
+
+
+def init_db(profile: Optional[str] = None) -> Database:
+    """
+    Initialize db with a profile explicitly, or again with another one.
+
+    :param profile: str, name of a profile in CONFIGS['database'], None means the current one.
+    :return: Database, the database db stands for.
+    """
+    database: Database = create_database(profile)
+    db.initialize(database)
+    return database
+
+
+def resolve_database(database: Database) -> Database:
+    """
+    The database behind a proxy, e.g. Model._meta.database, for checking the backend.
+
+    :param database: Database or DatabaseProxy.
+    :return: Database.
+    """
+    if isinstance(database, LazyDatabaseProxy):
+        return database.get_database()
+    if isinstance(database, DatabaseProxy):
+        return database.obj
+    return database
+
+
+@contextmanager
+def connection(database: Optional[Database] = None) -> Iterator[Database]:
+    """
+    Connection of the current thread, opened if not yet, and closed on exit, which returns it to the pool.
+    Each thread has its own connection and cursor, so crawlers and loaders in threads should write within it.
+
+    :param database: Database, None means db.
+    :return: Database.
+    """
+    database = db if database is None else database
+    with database.connection_context():
+        yield database
+
+
+# Exceptions of peewee by the names of DB-API 2.0, which every driver uses for its own.
+DRIVER_ERRORS: Dict[str, Type[PeeweeException]] = {
+    x.__name__: x for x in (
+        DatabaseError,
+        DataError,
+        IntegrityError,
+        InterfaceError,
+        InternalError,
+        NotSupportedError,
+        OperationalError,
+        ProgrammingError,
+    )
+}
+
+
+@contextmanager
+def driver_errors() -> Iterator[None]:
+    """
+    Raise errors of the driver as those of peewee, as queries of peewee do, for statements run on raw cursors,
+    e.g. psycopg2.IntegrityError as peewee.IntegrityError. The original error is the __cause__.
+    """
+    try:
+        yield
+    except PeeweeException:
+        raise
+    except Exception as error:
+        name: Optional[str] = next((x.__name__ for x in type(error).__mro__ if x.__name__ in DRIVER_ERRORS), None)
+        if name is None:
+            raise
+        raise DRIVER_ERRORS[name](*error.args) from error
@@ -4,7 +4,11 @@ __author__ = 'Bruce Frank Wong'
 
 
 from .country import Country
-from .calendar import Holiday
+from .calendar import (
+    DayStatus,
+    Calendar,
+    Holiday,
+)
 from .exchange import (
     Exchange,
     ExchangeNotice,
@@ -15,8 +19,23 @@ from .stock import (
     Stock,
     Announcement,
 )
+from .record import (
+    CashRecord,
+    OrderRecord,
+    TradeRecord,
+    SettleRecord,
+)
+from .dad import (
+    DomesticAdministrativeDivisions,
+    DomesticAdministrativeDivisionsClosure,
+)
+from .data import (
+    PlantingArea,
+    DataDigest,
+)
 from .futures import (
     FuturesProduct,
+    OptionProduct,
     FuturesContractSpecification,
     FuturesContract,
     FuturesTransactionRule,
@@ -26,6 +45,8 @@ from .futures import (
 
 __all__ = [
     'Country',
+    'DayStatus',
+    'Calendar',
     'Holiday',
     'Exchange',
     'ExchangeNotice',
@@ -33,7 +54,16 @@ __all__ = [
     'StockStatus',
     'Stock',
     'Announcement',
+    'CashRecord',
+    'OrderRecord',
+    'TradeRecord',
+    'SettleRecord',
+    'DomesticAdministrativeDivisions',
+    'DomesticAdministrativeDivisionsClosure',
+    'PlantingArea',
+    'DataDigest',
     'FuturesProduct',
+    'OptionProduct',
     'FuturesContractSpecification',
     'FuturesContract',
     'FuturesTransactionRule',
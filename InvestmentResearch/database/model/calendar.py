@@ -38,6 +38,9 @@ class Calendar(BasicModel):
         depends_on = [
             Country,
         ]
+        indexes = (
+            (('country', 'date'), True),
+        )
 
     def __repr__(self):
         return f'<Calendar(' \
@@ -7,6 +7,7 @@ from peewee import (
     AutoField,
     CharField,
     FixedCharField,
+    IntegerField,
     ForeignKeyField,
 )
 
@@ -18,7 +19,7 @@ class DomesticAdministrativeDivisions(BasicModel):
     Domestic Administrative Divisions.
     """
     id = AutoField()
-    symbol = FixedCharField(verbose_name='代码', max_length=17)
+    symbol = FixedCharField(verbose_name='代码', max_length=17, unique=True)
     name = FixedCharField(verbose_name='名称/简称', max_length=3)
     fullname = CharField(verbose_name='全称')
 
@@ -32,6 +33,33 @@ class DomesticAdministrativeDivisions(BasicModel):
                f')>'
 
 
+class DomesticAdministrativeDivisionsClosure(BasicModel):
+    """
+    Closure table of DomesticAdministrativeDivisions, one row per pair of ancestor and descendant,
+    including each division with itself at depth 0.
+    """
+    id = AutoField()
+    ancestor = ForeignKeyField(DomesticAdministrativeDivisions, backref='descendant_closure', on_delete='CASCADE')
+    descendant = ForeignKeyField(DomesticAdministrativeDivisions, backref='ancestor_closure', on_delete='CASCADE')
+    depth = IntegerField(verbose_name='层级差')
+
+    class Meta:
+        depends_on = [
+            DomesticAdministrativeDivisions,
+        ]
+        indexes = (
+            (('ancestor', 'descendant'), True),
+            (('descendant', 'depth'), False),
+        )
+
+    def __repr__(self):
+        return f'<DomesticAdministrativeDivisionsClosure(' \
+               f'ancestor={self.ancestor_id}, ' \
+               f'descendant={self.descendant_id}, ' \
+               f'depth={self.depth}' \
+               f')>'
+
+
 class Province(BasicModel):
     """
     Domestic Administrative Divisions, Province.
@@ -7,7 +7,9 @@ from peewee import (
     AutoField,
     CharField,
     FixedCharField,
+    DateTimeField,
     IntegerField,
+    FloatField,
     ForeignKeyField,
 )
 
@@ -15,7 +17,40 @@ from .base import BasicModel
 
 
 class PlantingArea(BasicModel):
+    """
+    Planting area of crops, by province.
+    """
     id = AutoField()
     year = IntegerField(verbose_name='年份')
-    product = IntegerField(verbose_name='种类')
-    area = IntegerField(verbose_name='面积')
+    product = CharField(verbose_name='种类')
+    province = CharField(verbose_name='省份')
+    area = FloatField(verbose_name='面积')
+
+    class Meta:
+        indexes = (
+            (('year', 'product', 'province'), True),
+        )
+
+    def __repr__(self):
+        return f'<PlantingArea(' \
+               f'year={self.year}, ' \
+               f'product={self.product}, ' \
+               f'province={self.province}, ' \
+               f'area={self.area}' \
+               f')>'
+
+
+class DataDigest(BasicModel):
+    """
+    Digest of a CSV file in the data directory, as loaded into its table.
+    """
+    name = CharField(verbose_name='表名', primary_key=True)
+    digest = FixedCharField(verbose_name='SHA-256', max_length=64)
+    loaded = DateTimeField(verbose_name='载入时间')
+
+    def __repr__(self):
+        return f'<DataDigest(' \
+               f'name={self.name}, ' \
+               f'digest={self.digest}, ' \
+               f'loaded={self.loaded}' \
+               f')>'
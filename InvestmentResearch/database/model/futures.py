@@ -55,6 +55,40 @@ class FuturesProduct(BasicModel):
         return f'<FuturesProduct(exchange={self.exchange.symbol}, symbol={self.symbol})>'
 
 
+class OptionProduct(BasicModel):
+    """
+    Option product on futures.
+    """
+    id = AutoField(primary_key=True)
+    exchange = ForeignKeyField(Exchange, backref='option_list', on_delete='CASCADE')
+    symbol = CharField(verbose_name='品种代码')
+    name = CharField(verbose_name='品种名称')
+    underlying_exchange = CharField(verbose_name='标的交易所')
+    underlying_product = CharField(verbose_name='标的品种')
+    mode = CharField(verbose_name='行权方式')
+    listed_date = DateField(verbose_name='上市日期')
+    listed_notice = CharField(verbose_name='上市公告URL', null=True)
+    delisted_date = DateField(verbose_name='退市日期', null=True)
+    delisted_notice = CharField(verbose_name='退市公告URL', null=True)
+    first_listed_contract = CharField(verbose_name='首批上市合约', null=True)
+
+    class Meta:
+        depends_on = [
+            Exchange,
+        ]
+        indexes = (
+            (('exchange', 'symbol'), True),
+        )
+
+    def __repr__(self):
+        return f'<OptionProduct(' \
+               f'symbol={self.symbol}, ' \
+               f'name={self.name}, ' \
+               f'mode={self.mode}, ' \
+               f'listed_date={self.listed_date}' \
+               f')>'
+
+
 class FuturesContractSpecification(BasicModel):
     """
     Futures contract specification.
@@ -89,6 +123,9 @@ class FuturesContract(BasicModel):
         depends_on = [
             FuturesProduct,
         ]
+        indexes = (
+            (('product', 'delivery_month'), True),
+        )
 
     def __str__(self):
         x = self.expiration_date
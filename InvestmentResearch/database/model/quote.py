@@ -54,6 +54,9 @@ class StockQuoteDaily(BasicModel):
         depends_on = [
             Stock,
         ]
+        indexes = (
+            (('symbol', 'date'), True),
+        )
 
 
 class StockQuoteTick(BasicModel):
@@ -76,6 +79,9 @@ class StockQuoteTick(BasicModel):
         depends_on = [
             Stock,
         ]
+        indexes = (
+            (('symbol', 'datetime'), True),
+        )
 
 
 class StockQuoteMinutely(BasicModel):
@@ -99,6 +105,9 @@ class StockQuoteMinutely(BasicModel):
         depends_on = [
             Stock,
         ]
+        indexes = (
+            (('symbol', 'period', 'datetime'), True),
+        )
 
 
 class FuturesQuoteDaily(BasicModel):
@@ -125,6 +134,9 @@ class FuturesQuoteDaily(BasicModel):
             FuturesProduct,
             FuturesContract,
         ]
+        indexes = (
+            (('contract', 'date'), True),
+        )
 
 
 class FuturesQuoteTick(BasicModel):
@@ -151,6 +163,9 @@ class FuturesQuoteTick(BasicModel):
             FuturesProduct,
             FuturesContract,
         ]
+        indexes = (
+            (('contract', 'datetime'), True),
+        )
 
 
 class FuturesQuotationMinutely(BasicModel):
@@ -178,3 +193,6 @@ class FuturesQuotationMinutely(BasicModel):
             FuturesProduct,
             FuturesContract,
         ]
+        indexes = (
+            (('contract', 'period', 'datetime'), True),
+        )
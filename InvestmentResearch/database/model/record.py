@@ -0,0 +1,138 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from peewee import (
+    AutoField,
+    CharField,
+    DateField,
+    TimeField,
+    IntegerField,
+    FloatField,
+)
+
+from .base import BasicModel
+
+
+class CashRecord(BasicModel):
+    """
+    Cash transfer record, 银证转帐.
+    """
+    id = AutoField(primary_key=True)
+    date = DateField(verbose_name='发生日期')
+    time = TimeField(verbose_name='转帐时间')
+    offset = CharField(verbose_name='业务名称')
+    amount = FloatField(verbose_name='转帐金额')
+
+    class Meta:
+        indexes = (
+            (('date', 'time', 'offset', 'amount'), True),
+        )
+
+    def __repr__(self):
+        return f'<CashRecord(' \
+               f'date={self.date}, ' \
+               f'time={self.time}, ' \
+               f'offset={self.offset}, ' \
+               f'amount={self.amount}' \
+               f')>'
+
+
+class OrderRecord(BasicModel):
+    """
+    Order record, 历史委托.
+    """
+    id = AutoField(primary_key=True)
+    date = DateField(verbose_name='委托日期')
+    time = TimeField(verbose_name='委托时间')
+    symbol = CharField(verbose_name='证券代码')
+    name = CharField(verbose_name='证券名称')
+    offset = CharField(verbose_name='买卖标志')
+    status = CharField(verbose_name='状态说明')
+    price_order = FloatField(verbose_name='委托价格')
+    volume_order = IntegerField(verbose_name='委托数量')
+    order_sn = CharField(verbose_name='委托编号')
+    price_trade = FloatField(verbose_name='成交价格')
+    volume_trade = FloatField(verbose_name='成交数量')
+    mode = CharField(verbose_name='报价方式')
+    account = CharField(verbose_name='股东代码')
+
+    class Meta:
+        indexes = (
+            (('account', 'date', 'order_sn'), True),
+        )
+
+    def __repr__(self):
+        return f'<OrderRecord(' \
+               f'date={self.date}, ' \
+               f'symbol={self.symbol}, ' \
+               f'offset={self.offset}, ' \
+               f'order_sn={self.order_sn}, ' \
+               f'status={self.status}' \
+               f')>'
+
+
+class TradeRecord(BasicModel):
+    """
+    Trade record, 历史成交.
+    """
+    id = AutoField(primary_key=True)
+    date = DateField(verbose_name='成交日期')
+    symbol = CharField(verbose_name='证券代码')
+    name = CharField(verbose_name='证券名称')
+    offset = CharField(verbose_name='买卖标志')
+    price = FloatField(verbose_name='成交价格')
+    volume = IntegerField(verbose_name='成交数量')
+    trade_sn = CharField(verbose_name='成交编号')
+    order_sn = CharField(verbose_name='委托编号')
+    account = CharField(verbose_name='股东代码')
+
+    class Meta:
+        indexes = (
+            (('account', 'date', 'trade_sn'), True),
+        )
+
+    def __repr__(self):
+        return f'<TradeRecord(' \
+               f'date={self.date}, ' \
+               f'symbol={self.symbol}, ' \
+               f'offset={self.offset}, ' \
+               f'price={self.price}, ' \
+               f'volume={self.volume}, ' \
+               f'trade_sn={self.trade_sn}' \
+               f')>'
+
+
+class SettleRecord(BasicModel):
+    """
+    Settlement record, 资金流水.
+    """
+    id = AutoField(primary_key=True)
+    date = DateField(verbose_name='发生日期')
+    subject = CharField(verbose_name='业务名称')
+    change = FloatField(verbose_name='发生金额')
+    balance = FloatField(verbose_name='剩余金额')
+    currency = CharField(verbose_name='币种')
+    symbol = CharField(verbose_name='证券代码')
+    name = CharField(verbose_name='证券名称')
+    offset = CharField(verbose_name='买卖标志')
+    price = FloatField(verbose_name='成交价格')
+    volume = FloatField(verbose_name='成交数量')
+    commission = FloatField(verbose_name='佣金')
+    tax = FloatField(verbose_name='印花税')
+    transfer_fee = FloatField(verbose_name='过户费')
+    other_fee = FloatField(verbose_name='其他费')
+
+    class Meta:
+        indexes = (
+            (('date', 'subject', 'change', 'balance'), True),
+        )
+
+    def __repr__(self):
+        return f'<SettleRecord(' \
+               f'date={self.date}, ' \
+               f'subject={self.subject}, ' \
+               f'change={self.change}, ' \
+               f'balance={self.balance}' \
+               f')>'
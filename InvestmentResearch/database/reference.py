@@ -0,0 +1,141 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+import threading
+
+from peewee import Model, Field, chunked
+
+from .interface import db
+from .model import (
+    Country,
+    Exchange,
+    Stock,
+    FuturesProduct,
+    FuturesContract,
+)
+
+
+# Natural keys of reference tables, name: (model, fields of the key).
+# Keys of one field are the value itself, keys of several fields are tuples.
+REFERENCE_KEY: Dict[str, Tuple[Type[Model], Tuple[str, ...]]] = {
+    'country_alpha2': (Country, ('alpha2',)),
+    'country_alpha3': (Country, ('alpha3',)),
+    'country_numeric': (Country, ('numeric',)),
+    'exchange': (Exchange, ('symbol',)),
+    'stock': (Stock, ('symbol',)),
+    'futures_product': (FuturesProduct, ('symbol',)),
+    'futures_contract': (FuturesContract, ('product', 'delivery_month')),
+}
+
+# SQLite before 3.32 allows 999 variables in a statement.
+MAX_VARIABLE: int = 999
+
+
+class ReferenceCache:
+    """
+    Maps from natural keys to ids of reference tables, each loaded by one query on first use.
+    Rows written by ensure() update the maps, other writes to these tables should call invalidate().
+    """
+    _map: Dict[str, Dict[Any, int]]
+    _lock: threading.RLock
+
+    def __init__(self) -> None:
+        self._map = {}
+        self._lock = threading.RLock()
+
+    def __repr__(self) -> str:
+        return f'<ReferenceCache(loaded={sorted(self._map.keys())})>'
+
+    @staticmethod
+    def _key_fields(name: str) -> Tuple[Type[Model], List[Field]]:
+        model, key = REFERENCE_KEY[name]
+        return model, [model._meta.fields[x] for x in key]
+
+    def _load(self, name: str) -> Dict[Any, int]:
+        model, field_list = self._key_fields(name)
+        query = model.select(model._meta.primary_key, *field_list).tuples()
+        if len(field_list) == 1:
+            return {key: id_ for id_, key in query}
+        return {tuple(key): id_ for id_, *key in query}
+
+    def map(self, name: str) -> Dict[Any, int]:
+        """
+        Map from natural key to id.
+
+        :param name: str, a key of REFERENCE_KEY.
+        :return: Dict, should not be modified.
+        """
+        with self._lock:
+            if name not in self._map:
+                self._map[name] = self._load(name)
+            return self._map[name]
+
+    def warm(self, name_list: Optional[Iterable[str]] = None) -> None:
+        """
+        Load maps in advance.
+
+        :param name_list: Iterable of str, None means all of REFERENCE_KEY.
+        """
+        for name in (REFERENCE_KEY.keys() if name_list is None else name_list):
+            self.map(name)
+
+    def get(self, name: str, key: Any) -> Optional[int]:
+        """
+        Id of a natural key, None if not existed.
+        """
+        return self.map(name).get(key)
+
+    def ensure(self, name: str, row_list: Iterable[Dict[str, Any]]) -> Dict[Any, int]:
+        """
+        Ids of natural keys of <row_list>, rows of keys not existed are inserted, in one transaction.
+        Rows inserted by others meanwhile are ignored by the unique index of the key, and their ids are returned.
+
+        :param name: str, a key of REFERENCE_KEY.
+        :param row_list: Iterable of Dict, values of fields, including those of the key, foreign keys are ids.
+        :return: Dict, map from natural keys of <row_list> to ids.
+        """
+        model, field_list = self._key_fields(name)
+        key_name: List[str] = [x.name for x in field_list]
+
+        def key_of(row: Dict[str, Any]) -> Any:
+            return row[key_name[0]] if len(key_name) == 1 else tuple(row[x] for x in key_name)
+
+        with self._lock:
+            id_map: Dict[Any, int] = self.map(name)
+            missing: Dict[Any, Dict[str, Any]] = {}
+            key_list: List[Any] = []
+            for row in row_list:
+                key: Any = key_of(row)
+                key_list.append(key)
+                if key not in id_map and key not in missing:
+                    missing[key] = row
+            if missing:
+                column_list: List[str] = sorted({x for row in missing.values() for x in row.keys()})
+                with model._meta.database.atomic():
+                    for batch in chunked(missing.values(), MAX_VARIABLE // len(column_list)):
+                        model.insert_many(
+                            [tuple(row.get(x) for x in column_list) for row in batch],
+                            fields=[model._meta.fields[x] for x in column_list]
+                        ).on_conflict_ignore().execute()
+                self.invalidate(model)
+                id_map = self.map(name)
+            return {key: id_map[key] for key in key_list}
+
+    def invalidate(self, model: Optional[Type[Model]] = None) -> None:
+        """
+        Drop maps of <model>, they are loaded again on next use.
+
+        :param model: Type[Model], None means all.
+        """
+        with self._lock:
+            for name, (key_model, _) in REFERENCE_KEY.items():
+                if model is None or key_model is model:
+                    self._map.pop(name, None)
+
+
+# Process-wide, dropped when db is initialized with another database.
+reference: ReferenceCache = ReferenceCache()
+db.attach_callback(lambda _: reference.invalidate())
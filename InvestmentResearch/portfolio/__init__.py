@@ -0,0 +1,25 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from .ledger import (
+    Ledger,
+)
+from .reconcile import (
+    ReconcileStatusEnum,
+    Reconciliation,
+    reconcile_order,
+    reconcile_settle,
+    reconcile,
+)
+
+
+__all__ = [
+    'Ledger',
+    'ReconcileStatusEnum',
+    'Reconciliation',
+    'reconcile_order',
+    'reconcile_settle',
+    'reconcile',
+]
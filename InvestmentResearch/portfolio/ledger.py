@@ -0,0 +1,239 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+Records = Union[pd.DataFrame, Iterable[Dict[str, Any]]]
+
+
+BUY: str = '买入'
+SELL: str = '卖出'
+
+FEE_COLUMNS: List[str] = ['commission', 'tax', 'transfer_fee', 'other_fee']
+
+# Carried from one update to the next, per symbol.
+STATE_COLUMNS: List[str] = ['position', 'cost', 'realized'] + FEE_COLUMNS
+
+# Span of log(ratio) of a block of _replay, exp() of it is far from the overflow of float64.
+REBASE_LOG: float = 300.0
+
+HISTORY_COLUMNS: List[str] = ['date', 'symbol', 'quantity', 'price', 'cash', 'average_cost'] + STATE_COLUMNS
+
+
+def _to_trade_frame(record: Records) -> pd.DataFrame:
+    """
+    Buy and sell rows of Settle or Trade records, in the order of date.
+    Records of Trade have no fees, the cash is price * volume.
+
+    :param record: pd.DataFrame as read_record_dataframe returns, or Dict items as read_record returns.
+    :return: pd.DataFrame, columns are date, symbol, quantity (negative for sell), price, cash, and fees.
+    """
+    df: pd.DataFrame = record if isinstance(record, pd.DataFrame) else pd.DataFrame(list(record))
+    if df.empty:
+        return pd.DataFrame(columns=['date', 'symbol', 'quantity', 'price', 'cash'] + FEE_COLUMNS)
+    df = df[df['offset'].isin([BUY, SELL])]
+
+    sign: np.ndarray = np.where(df['offset'] == BUY, 1.0, -1.0)
+    volume: np.ndarray = df['volume'].to_numpy(dtype=np.float64)
+    price: np.ndarray = df['price'].to_numpy(dtype=np.float64)
+    fee: Dict[str, np.ndarray] = {
+        x: df[x].to_numpy(dtype=np.float64) if x in df.columns else np.zeros(len(df)) for x in FEE_COLUMNS
+    }
+    cash: np.ndarray
+    if 'change' in df.columns:
+        cash = df['change'].to_numpy(dtype=np.float64)
+    else:
+        cash = -sign * price * volume - sum(fee.values())
+
+    trade: pd.DataFrame = pd.DataFrame(
+        {
+            'date': pd.to_datetime(df['date']).to_numpy(),
+            'symbol': df['symbol'].astype(str).to_numpy(),
+            'quantity': sign * volume,
+            'price': price,
+            'cash': cash,
+            **fee,
+        }
+    )
+    # Stable, rows of the same day keep the order of the export.
+    return trade.sort_values('date', kind='mergesort', ignore_index=True)
+
+
+def _replay(trade: pd.DataFrame, state: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replay trades on the carried state, by average cost.
+    Fees of buying are added to the cost, fees of selling are taken from the realized P&L.
+
+    Between two flat positions of a symbol, the cost follows
+        cost[i] = cost[i - 1] * ratio[i] + bought[i],
+    where ratio is position[i] / position[i - 1] for sells and 1 for buys, so with L = cumsum(log(ratio)),
+        cost[i] = sum(bought[j] * exp(L[i] - L[j]) for j <= i) + cost[0] * exp(L[i]),
+    which is done with grouped cumsum. To keep exp() finite, a segment is cut into blocks where L spans less than
+    REBASE_LOG, and the cost at the end of the previous block is carried forward; the carry of earlier blocks
+    is less than exp(-REBASE_LOG) of it, under the precision of float64, so it is dropped.
+
+    :param trade: pd.DataFrame, as _to_trade_frame returns.
+    :param state: pd.DataFrame, indexed by symbol, columns are STATE_COLUMNS.
+    :return: pd.DataFrame, columns are HISTORY_COLUMNS, the state after each trade.
+    """
+    symbol: pd.Series = trade['symbol']
+    carry: Dict[str, np.ndarray] = {
+        x: symbol.map(state[x]).fillna(0.0).to_numpy(dtype=np.float64) for x in STATE_COLUMNS
+    }
+    by_symbol = trade.groupby('symbol', sort=False)
+
+    quantity: np.ndarray = trade['quantity'].to_numpy()
+    position: np.ndarray = carry['position'] + by_symbol['quantity'].cumsum().to_numpy()
+    if (position < 0).any():
+        short: List[str] = sorted(set(symbol[position < 0]))
+        raise ValueError(f'Selling more than held, symbol: {short}.')
+
+    sell: np.ndarray = quantity < 0
+    closing: np.ndarray = position == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_ratio: np.ndarray = np.where(sell & ~closing, np.log(position / (position - quantity)), 0.0)
+    closed: pd.Series = pd.Series(closing, index=trade.index)
+    segment: pd.Series = closed.groupby(symbol).cumsum() - closed
+    growth: pd.Series = pd.Series(log_ratio, index=trade.index).groupby([symbol, segment]).cumsum()
+    block: pd.Series = np.floor(-growth / REBASE_LOG).astype(np.int64)
+    key: List[pd.Series] = [symbol, segment, block]
+
+    # Within a block, relative to its first row.
+    reference: pd.Series = growth.groupby(key).transform('first')
+    bought: pd.Series = pd.Series(np.where(sell, 0.0, -trade['cash'].to_numpy()), index=trade.index)
+    local: pd.Series = np.exp(growth - reference) * (bought * np.exp(reference - growth)).groupby(key).cumsum()
+
+    # Carried from the end of the previous block, or from the state for the first block.
+    code: np.ndarray = pd.Series(0, index=trade.index).groupby(key, sort=False).ngroup().to_numpy()
+    block_end: pd.DataFrame = pd.DataFrame(
+        {'symbol': symbol, 'segment': segment, 'growth': growth, 'local': local, 'carry': carry['cost']}
+    ).groupby(code).last()
+    previous: pd.DataFrame = block_end.groupby(['symbol', 'segment'], sort=False)[['growth', 'local']].shift(1)
+    first_block: np.ndarray = previous['growth'].isna().to_numpy()
+    carry_cost: np.ndarray = np.where(
+        first_block,
+        np.where(block_end['segment'].to_numpy() == 0, block_end['carry'].to_numpy(), 0.0),
+        previous['local'].to_numpy()
+    )
+    carry_growth: np.ndarray = np.where(first_block, 0.0, previous['growth'].to_numpy())
+    cost: np.ndarray = np.where(
+        closing,
+        0.0,
+        local.to_numpy() + np.exp(growth.to_numpy() - carry_growth[code]) * carry_cost[code]
+    )
+
+    cost_before: np.ndarray = pd.Series(cost, index=trade.index).groupby(symbol).shift(1).to_numpy()
+    cost_before = np.where(np.isnan(cost_before), carry['cost'], cost_before)
+    realized: pd.Series = pd.Series(
+        np.where(sell, trade['cash'].to_numpy() - (cost_before - cost), 0.0),
+        index=trade.index
+    )
+
+    history: pd.DataFrame = trade[['date', 'symbol', 'quantity', 'price', 'cash']].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        history['average_cost'] = np.where(closing, np.nan, cost / position)
+    history['position'] = position
+    history['cost'] = cost
+    history['realized'] = carry['realized'] + realized.groupby(symbol).cumsum().to_numpy()
+    for x in FEE_COLUMNS:
+        history[x] = carry[x] + by_symbol[x].cumsum().to_numpy()
+    return history
+
+
+class Ledger:
+    """
+    Positions, cost basis, realized / unrealized P&L and fees, replayed from Settle or Trade records.
+    Records could be fed in several updates, each update only replays the new records on the carried state.
+    """
+    _history: pd.DataFrame
+    _state: pd.DataFrame
+
+    def __init__(self, record: Optional[Records] = None) -> None:
+        self._history = pd.DataFrame(columns=HISTORY_COLUMNS)
+        self._state = pd.DataFrame(columns=STATE_COLUMNS, dtype=np.float64)
+        if record is not None:
+            self.update(record)
+
+    @property
+    def history(self) -> pd.DataFrame:
+        """
+        State of the symbol after each trade, fees and realized P&L are cumulative.
+        """
+        return self._history
+
+    @property
+    def state(self) -> pd.DataFrame:
+        """
+        Latest state, indexed by symbol.
+        """
+        return self._state
+
+    def __repr__(self) -> str:
+        return f'<Ledger(symbol={len(self._state)}, trade={len(self._history)})>'
+
+    def update(self, record: Records) -> pd.DataFrame:
+        """
+        Replay new records.
+
+        :param record: pd.DataFrame as read_record_dataframe returns, or Dict items as read_record returns,
+                       of TdxRecordTypeEnum.Settle or TdxRecordTypeEnum.Trade,
+                       not earlier than records already replayed.
+        :return: pd.DataFrame, rows appended to history.
+        """
+        trade: pd.DataFrame = _to_trade_frame(record)
+        if trade.empty:
+            return self._history.iloc[0:0]
+        if len(self._history) > 0 and trade['date'].iloc[0] < self._history['date'].iloc[-1]:
+            raise ValueError(
+                f'Records should not be earlier than {self._history["date"].iloc[-1].date()}, '
+                f'got {trade["date"].iloc[0].date()}.'
+            )
+
+        appended: pd.DataFrame = _replay(trade, self._state)
+        appended.index = pd.RangeIndex(len(self._history), len(self._history) + len(appended))
+        self._history = appended if len(self._history) == 0 else pd.concat([self._history, appended])
+
+        latest: pd.DataFrame = appended.groupby('symbol', sort=False)[STATE_COLUMNS].last()
+        self._state = pd.concat([self._state.drop(index=latest.index, errors='ignore'), latest]).sort_index()
+        return appended
+
+    def position(self, price: Optional[Mapping[str, float]] = None) -> pd.DataFrame:
+        """
+        Latest positions, marked to <price> if given.
+
+        :param price: Mapping from symbol to price, e.g. Dict[str, float] or pd.Series.
+        :return: pd.DataFrame, indexed by symbol.
+        """
+        result: pd.DataFrame = self._state.copy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['average_cost'] = np.where(result['position'] > 0, result['cost'] / result['position'], np.nan)
+        if price is not None:
+            result['price'] = result.index.map(lambda x: price.get(x, np.nan)).astype(np.float64)
+            result['market_value'] = result['position'] * result['price']
+            result['unrealized'] = result['market_value'] - result['cost']
+        return result
+
+    def mark_to_market(self, close: pd.DataFrame) -> pd.DataFrame:
+        """
+        Daily mark to market.
+
+        :param close: pd.DataFrame, indexed by date, one column of close prices per symbol.
+        :return: pd.DataFrame, indexed as <close>,
+                 columns are (field, symbol), fields are position, cost, realized, market_value and unrealized.
+        """
+        day: pd.DatetimeIndex = pd.DatetimeIndex(close.index)
+        end_of_day: pd.DataFrame = self._history.groupby(['date', 'symbol'], sort=True)[STATE_COLUMNS].last()
+        result: Dict[str, pd.DataFrame] = {}
+        for x in ('position', 'cost', 'realized'):
+            wide: pd.DataFrame = end_of_day[x].unstack('symbol')
+            wide = wide.reindex(wide.index.union(day)).ffill().reindex(day)
+            result[x] = wide.reindex(columns=close.columns).fillna(0.0).set_axis(close.index)
+        result['market_value'] = result['position'] * close
+        result['unrealized'] = result['market_value'] - result['cost']
+        return pd.concat(result, axis=1, names=['field', 'symbol'])
@@ -0,0 +1,143 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import List, NamedTuple
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+from .ledger import BUY, SELL, FEE_COLUMNS, Records
+
+
+class ReconcileStatusEnum(Enum):
+    """
+    Status of a reconciled order or trade.
+    """
+    Filled = '全部成交'
+    Partial = '部分成交'
+    Unfilled = '未成交'
+    Overfilled = '成交超出委托'
+    Orphan = '成交无委托'
+    Matched = '已交收'
+    Unsettled = '成交无交收'
+    Unmatched = '交收无成交'
+
+    def __repr__(self) -> str:
+        return f'<ReconcileStatusEnum(name={self.name}, value={self.value})>'
+
+
+# Orders are numbered by account and day.
+ORDER_KEY: List[str] = ['account', 'date', 'order_sn']
+
+# The Settle export has no trade number, trades are paired with the n-th settlement of the same key.
+SETTLE_KEY: List[str] = ['date', 'symbol', 'offset', 'volume']
+
+_STATUS_CATEGORY: pd.CategoricalDtype = pd.CategoricalDtype([x.name for x in ReconcileStatusEnum])
+
+
+class Reconciliation(NamedTuple):
+    """
+    Result of reconcile, items of which the status is not Filled or Matched need attention.
+    """
+    order: pd.DataFrame
+    settle: pd.DataFrame
+
+
+def _to_frame(record: Records) -> pd.DataFrame:
+    df: pd.DataFrame = record.copy() if isinstance(record, pd.DataFrame) else pd.DataFrame(list(record))
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def reconcile_order(order: Records, trade: Records) -> pd.DataFrame:
+    """
+    Join orders to trades on account, date and order_sn, by hash join.
+
+    :param order: records of TdxRecordTypeEnum.Order, pd.DataFrame or Dict items.
+    :param trade: records of TdxRecordTypeEnum.Trade, pd.DataFrame or Dict items.
+    :return: pd.DataFrame, one row per order, and per order_sn of trades without order,
+             columns are account, date, order_sn, symbol, offset, volume_order, volume_filled, trade_count, status.
+    """
+    order_df: pd.DataFrame = _to_frame(order)[ORDER_KEY + ['symbol', 'offset', 'volume_order']]
+    trade_df: pd.DataFrame = _to_frame(trade)
+    fill: pd.DataFrame = trade_df.groupby(ORDER_KEY, sort=False).agg(
+        symbol_trade=('symbol', 'first'),
+        offset_trade=('offset', 'first'),
+        volume_filled=('volume', 'sum'),
+        trade_count=('volume', 'size'),
+    ).reset_index()
+
+    result: pd.DataFrame = order_df.merge(fill, on=ORDER_KEY, how='outer', indicator=True, sort=False)
+    result['symbol'] = result['symbol'].fillna(result.pop('symbol_trade'))
+    result['offset'] = result['offset'].fillna(result.pop('offset_trade'))
+    result['volume_filled'] = result['volume_filled'].fillna(0)
+    result['trade_count'] = result['trade_count'].fillna(0).astype(np.int64)
+
+    side: pd.Series = result.pop('_merge')
+    status: np.ndarray = np.select(
+        [
+            side == 'right_only',
+            result['volume_filled'] == 0,
+            result['volume_filled'] < result['volume_order'],
+            result['volume_filled'] > result['volume_order'],
+        ],
+        [
+            ReconcileStatusEnum.Orphan.name,
+            ReconcileStatusEnum.Unfilled.name,
+            ReconcileStatusEnum.Partial.name,
+            ReconcileStatusEnum.Overfilled.name,
+        ],
+        default=ReconcileStatusEnum.Filled.name
+    )
+    result['status'] = pd.Series(status, index=result.index).astype(_STATUS_CATEGORY)
+    return result
+
+
+def reconcile_settle(trade: Records, settle: Records) -> pd.DataFrame:
+    """
+    Join trades to settlements on date, symbol, offset and volume, by hash join.
+    Trades of the same key are paired with settlements of the same key in order.
+
+    :param trade: records of TdxRecordTypeEnum.Trade, pd.DataFrame or Dict items.
+    :param settle: records of TdxRecordTypeEnum.Settle, pd.DataFrame or Dict items.
+    :return: pd.DataFrame, one row per trade, and per settlement of buying or selling without trade,
+             columns are those of Trade, with change and fees of Settle, and status.
+    """
+    trade_df: pd.DataFrame = _to_frame(trade)
+    settle_df: pd.DataFrame = _to_frame(settle)
+    settle_df = settle_df[settle_df['offset'].isin([BUY, SELL])][SETTLE_KEY + ['change'] + FEE_COLUMNS]
+    for df in (trade_df, settle_df):
+        df['volume'] = df['volume'].astype(np.float64)
+        df['occurrence'] = df.groupby(SETTLE_KEY, sort=False).cumcount()
+
+    result: pd.DataFrame = trade_df.merge(
+        settle_df, on=SETTLE_KEY + ['occurrence'], how='outer', indicator=True, sort=False
+    ).drop(columns='occurrence')
+    side: pd.Series = result.pop('_merge')
+    status: np.ndarray = np.select(
+        [side == 'left_only', side == 'right_only'],
+        [ReconcileStatusEnum.Unsettled.name, ReconcileStatusEnum.Unmatched.name],
+        default=ReconcileStatusEnum.Matched.name
+    )
+    result['status'] = pd.Series(status, index=result.index).astype(_STATUS_CATEGORY)
+    return result
+
+
+def reconcile(order: Records, trade: Records, settle: Records) -> Reconciliation:
+    """
+    Reconcile orders, trades and settlements, in time linear to the count of records.
+
+    :param order: records of TdxRecordTypeEnum.Order.
+    :param trade: records of TdxRecordTypeEnum.Trade.
+    :param settle: records of TdxRecordTypeEnum.Settle.
+    :return: Reconciliation.
+    """
+    trade_df: pd.DataFrame = _to_frame(trade)
+    return Reconciliation(
+        order=reconcile_order(order, trade_df),
+        settle=reconcile_settle(trade_df, settle),
+    )
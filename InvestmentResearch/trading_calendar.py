@@ -0,0 +1,280 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from functools import lru_cache
+from pathlib import Path
+import csv
+import datetime as dt
+
+import numpy as np
+
+from .utility import PACKAGE_PATH
+
+
+__all__ = ['WEEKEND', 'weekend_mask', 'holiday_mask', 'TradingCalendar', 'trading_calendar']
+
+
+# Saturday and Sunday, by dt.date.weekday().
+WEEKEND: Tuple[int, ...] = (5, 6)
+
+HOLIDAY_CSV: Path = PACKAGE_PATH.joinpath('data', 'holiday.csv')
+EXCHANGE_CSV: Path = PACKAGE_PATH.joinpath('data', 'exchange.csv')
+
+_EPOCH_ORDINAL: int = dt.date(1970, 1, 1).toordinal()
+
+# 1970-01-01 is Thursday.
+_EPOCH_WEEKDAY: int = 3
+
+Dates = Union[Iterable[dt.date], np.ndarray]
+
+
+def _to_day(day: dt.date) -> int:
+    """
+    Days since 1970-01-01, the integer of np.datetime64[D].
+    """
+    return day.toordinal() - _EPOCH_ORDINAL
+
+
+def _to_day_array(day_list: Dates) -> np.ndarray:
+    return np.asarray(day_list, dtype='datetime64[D]').astype(np.int64)
+
+
+def weekend_mask(begin: dt.date, end: dt.date, weekend: Tuple[int, ...] = WEEKEND) -> np.ndarray:
+    """
+    Whether each day from <begin> to <end> is a weekend.
+
+    :return: np.ndarray of bool, one per day.
+    """
+    weekday: np.ndarray = (_to_day(begin) + _EPOCH_WEEKDAY + np.arange((end - begin).days + 1)) % 7
+    return np.isin(weekday, weekend)
+
+
+def holiday_mask(holiday_list: Iterable[Tuple[dt.date, dt.date]], begin: dt.date, end: dt.date) -> np.ndarray:
+    """
+    Whether each day from <begin> to <end> is in a holiday.
+    Ranges are expanded in one pass, by +1 at the begin and -1 after the end of each, then cumsum.
+
+    :param holiday_list: Iterable of (begin, end) of holidays, both inclusive, may overlap.
+    :return: np.ndarray of bool, one per day.
+    """
+    length: int = (end - begin).days + 1
+    range_array: np.ndarray = np.asarray(
+        [((x - begin).days, (y - begin).days + 1) for x, y in holiday_list], dtype=np.int64
+    ).reshape(-1, 2).clip(0, length)
+    change: np.ndarray = np.zeros(length + 1, dtype=np.int64)
+    np.add.at(change, range_array[:, 0], 1)
+    np.add.at(change, range_array[:, 1], -1)
+    return np.cumsum(change[:-1]) > 0
+
+
+class TradingCalendar:
+    """
+    Trading days of a span of dates, which are not weekends or holidays, or are given explicitly.
+    Every query is O(1) by indexing arrays built once:
+        _trading, whether a day is a trading day, indexed by days since <begin>;
+        _rank, count of trading days from <begin> to a day, inclusive;
+        _trading_day, days of trading days, in order.
+    Vectorized queries take arrays of dates, of np.datetime64 or dt.date, and return np.ndarray.
+    Dates out of the span raise ValueError.
+    """
+    _begin: int
+    _trading: np.ndarray
+    _rank: np.ndarray
+    _trading_day: np.ndarray
+
+    def __init__(self, begin: dt.date, end: dt.date, trading: np.ndarray) -> None:
+        """
+        :param begin: dt.date, the first day of the span.
+        :param end: dt.date, the last day of the span.
+        :param trading: np.ndarray of bool, one per day from <begin> to <end>.
+        """
+        if len(trading) != (end - begin).days + 1:
+            raise ValueError(f'<trading> should have one value per day from {begin} to {end}.')
+        self._begin = _to_day(begin)
+        self._trading = np.asarray(trading, dtype=np.bool_)
+        self._rank = np.cumsum(self._trading, dtype=np.int64)
+        self._trading_day = self._begin + np.flatnonzero(self._trading)
+
+    def __repr__(self) -> str:
+        return f'<TradingCalendar(' \
+               f'begin={self.begin}, ' \
+               f'end={self.end}, ' \
+               f'trading_days={len(self._trading_day)}' \
+               f')>'
+
+    @classmethod
+    def from_holiday(
+            cls,
+            holiday_list: Iterable[Tuple[dt.date, dt.date]],
+            begin: dt.date,
+            end: dt.date,
+            weekend: Tuple[int, ...] = WEEKEND
+    ) -> 'TradingCalendar':
+        """
+        Trading calendar of days which are not weekends or holidays.
+
+        :param holiday_list: Iterable of (begin, end) of holidays, both inclusive, may overlap.
+        :param begin: dt.date, the first day of the span.
+        :param end: dt.date, the last day of the span.
+        :param weekend: Tuple[int, ...], weekdays of weekends, Monday is 0.
+        :return: TradingCalendar.
+        """
+        trading: np.ndarray = ~weekend_mask(begin, end, weekend) & ~holiday_mask(holiday_list, begin, end)
+        return cls(begin, end, trading)
+
+    @classmethod
+    def from_trading_day(cls, trading_day_list: Dates, begin: dt.date, end: dt.date) -> 'TradingCalendar':
+        """
+        Trading calendar of trading days given, e.g. by get_trading_calendar of SSIC.
+
+        :param trading_day_list: dates of trading days, those out of the span are ignored.
+        :param begin: dt.date, the first day of the span.
+        :param end: dt.date, the last day of the span.
+        :return: TradingCalendar.
+        """
+        length: int = (end - begin).days + 1
+        index: np.ndarray = _to_day_array(trading_day_list) - _to_day(begin)
+        trading: np.ndarray = np.zeros(length, dtype=np.bool_)
+        trading[index[(index >= 0) & (index < length)]] = True
+        return cls(begin, end, trading)
+
+    @property
+    def begin(self) -> dt.date:
+        return dt.date.fromordinal(self._begin + _EPOCH_ORDINAL)
+
+    @property
+    def end(self) -> dt.date:
+        return dt.date.fromordinal(self._begin + len(self._trading) - 1 + _EPOCH_ORDINAL)
+
+    def _index(self, day: dt.date) -> int:
+        index: int = _to_day(day) - self._begin
+        if not 0 <= index < len(self._trading):
+            raise ValueError(f'{day} is out of the calendar from {self.begin} to {self.end}.')
+        return index
+
+    def _index_array(self, day_list: Dates) -> np.ndarray:
+        index: np.ndarray = _to_day_array(day_list) - self._begin
+        if index.size and (index.min() < 0 or index.max() >= len(self._trading)):
+            raise ValueError(f'Some dates are out of the calendar from {self.begin} to {self.end}.')
+        return index
+
+    def _trading_day_at(self, position: int) -> dt.date:
+        if not 0 <= position < len(self._trading_day):
+            raise ValueError(f'The trading day is out of the calendar from {self.begin} to {self.end}.')
+        return dt.date.fromordinal(int(self._trading_day[position]) + _EPOCH_ORDINAL)
+
+    def _trading_day_array_at(self, position: np.ndarray) -> np.ndarray:
+        if position.size and (position.min() < 0 or position.max() >= len(self._trading_day)):
+            raise ValueError(f'Some trading days are out of the calendar from {self.begin} to {self.end}.')
+        return self._trading_day[position].astype('datetime64[D]')
+
+    def is_trading_day(self, day: dt.date) -> bool:
+        return bool(self._trading[self._index(day)])
+
+    def next(self, day: dt.date) -> dt.date:
+        """
+        The first trading day after <day>.
+        """
+        return self._trading_day_at(int(self._rank[self._index(day)]))
+
+    def prev(self, day: dt.date) -> dt.date:
+        """
+        The last trading day before <day>.
+        """
+        index: int = self._index(day)
+        return self._trading_day_at(int(self._rank[index]) - int(self._trading[index]) - 1)
+
+    def trading_days_between(self, begin: dt.date, end: dt.date) -> int:
+        """
+        Count of trading days from <begin> to <end>, both inclusive, 0 if <end> is before <begin>.
+        """
+        index_begin: int = self._index(begin)
+        count: int = int(self._rank[self._index(end)] - self._rank[index_begin] + self._trading[index_begin])
+        return max(count, 0)
+
+    def trading_day_list(self, begin: dt.date, end: dt.date) -> List[dt.date]:
+        """
+        Trading days from <begin> to <end>, both inclusive, clipped to the span.
+        """
+        day_array: np.ndarray = self._trading_day[
+            np.searchsorted(self._trading_day, _to_day(begin)):np.searchsorted(self._trading_day, _to_day(end), 'right')
+        ]
+        return [dt.date.fromordinal(x + _EPOCH_ORDINAL) for x in day_array.tolist()]
+
+    def shift(self, day: dt.date, n: int) -> dt.date:
+        """
+        The <n>-th trading day after <day> if <n> is positive, before <day> if negative.
+        If <n> is 0, <day> itself if it is a trading day, otherwise the next one.
+        """
+        index: int = self._index(day)
+        trading: bool = bool(self._trading[index])
+        return self._trading_day_at(int(self._rank[index]) - 1 + n + (not trading and n <= 0))
+
+    def is_trading_day_array(self, day_list: Dates) -> np.ndarray:
+        """
+        Vectorized is_trading_day, np.ndarray of bool.
+        """
+        return self._trading[self._index_array(day_list)]
+
+    def next_array(self, day_list: Dates) -> np.ndarray:
+        """
+        Vectorized next, np.ndarray of np.datetime64[D].
+        """
+        return self._trading_day_array_at(self._rank[self._index_array(day_list)])
+
+    def prev_array(self, day_list: Dates) -> np.ndarray:
+        """
+        Vectorized prev, np.ndarray of np.datetime64[D].
+        """
+        index: np.ndarray = self._index_array(day_list)
+        return self._trading_day_array_at(self._rank[index] - self._trading[index] - 1)
+
+    def trading_days_between_array(self, begin_list: Dates, end_list: Dates) -> np.ndarray:
+        """
+        Vectorized trading_days_between, np.ndarray of int64.
+        """
+        index_begin: np.ndarray = self._index_array(begin_list)
+        count: np.ndarray = self._rank[self._index_array(end_list)] - self._rank[index_begin] + self._trading[index_begin]
+        return np.maximum(count, 0)
+
+    def shift_array(self, day_list: Dates, n: Union[int, np.ndarray]) -> np.ndarray:
+        """
+        Vectorized shift, <n> is an int or an array of the same length as <day_list>, np.ndarray of np.datetime64[D].
+        """
+        index: np.ndarray = self._index_array(day_list)
+        n = np.asarray(n, dtype=np.int64)
+        return self._trading_day_array_at(self._rank[index] - 1 + n + (~self._trading[index] & (n <= 0)))
+
+
+def _read_csv(csv_path: Path) -> List[Dict[str, str]]:
+    with open(csv_path, mode='r', newline='', encoding='utf-8') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+@lru_cache(maxsize=None)
+def trading_calendar(region: str = 'CHN', end: Optional[dt.date] = None) -> TradingCalendar:
+    """
+    Trading calendar of a country or an exchange, from data/holiday.csv and weekends, built once per arguments.
+    Holidays of an exchange are those of its country in data/exchange.csv.
+    Years after the last one in data/holiday.csv only exclude weekends.
+
+    :param region: str, alpha3 of a country, or symbol of an exchange.
+    :param end: dt.date, the last day of the calendar, None means the end of next year.
+    :return: TradingCalendar, from the first year in data/holiday.csv.
+    """
+    exchange_country: Dict[str, str] = {x['symbol']: x['country'] for x in _read_csv(EXCHANGE_CSV)}
+    country: str = exchange_country.get(region, region)
+    holiday_list: List[Tuple[dt.date, dt.date]] = [
+        (dt.date.fromisoformat(x['begin']), dt.date.fromisoformat(x['end']))
+        for x in _read_csv(HOLIDAY_CSV) if x['country'] == country
+    ]
+    if not holiday_list:
+        raise ValueError(f'No holiday of {region} in {HOLIDAY_CSV.name}.')
+
+    begin: dt.date = dt.date(min(x for x, _ in holiday_list).year, 1, 1)
+    if end is None:
+        end = dt.date(max(max(y for _, y in holiday_list).year, dt.date.today().year) + 1, 12, 31)
+    return TradingCalendar.from_holiday(holiday_list, begin, end)
@@ -79,3 +79,324 @@ def test_database_initialize_stock_status():
     db.connect()
     initialize_stock_status()
     db.close()
+
+
+@pytest.mark.run(order=8)
+def test_database_pool():
+    """
+    Test for pooled databases and connections of threads.
+    """
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from peewee import SqliteDatabase
+    from playhouse.pool import PooledMySQLDatabase, PooledPostgresqlDatabase
+    from InvestmentResearch.database import connection
+    from InvestmentResearch.database.interface import create_mysql_database, create_postgresql_database
+
+    settings = {'database': 'ir', 'user': 'ir', 'password': '', 'host': 'localhost', 'port': 5432}
+    assert not isinstance(create_mysql_database(settings), PooledMySQLDatabase)
+    pooled = create_postgresql_database({**settings, 'pool': {'max_connections': 4}})
+    assert isinstance(pooled, PooledPostgresqlDatabase)
+    assert pooled._max_connections == 4
+    assert pooled._stale_timeout == 300
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = SqliteDatabase(Path(directory).joinpath('pool.sqlite'), pragmas={'journal_mode': 'wal'})
+        database.execute_sql('CREATE TABLE test(name varchar);')
+        database.close()
+
+        def write(i: int) -> bool:
+            with connection(database) as conn:
+                with conn.atomic():
+                    conn.execute_sql('INSERT INTO test VALUES (?);', (str(i),))
+            return database.is_closed()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert all(executor.map(write, range(20)))
+        with connection(database):
+            assert database.execute_sql('SELECT COUNT(*) FROM test;').fetchone()[0] == 20
+        database.close()
+
+
+@pytest.mark.run(order=8)
+def test_database_lazy(tmp_path, monkeypatch):
+    """
+    Test for initializing the database on first use, or by profile.
+    """
+    from peewee import SqliteDatabase
+    from InvestmentResearch.utility import CONFIGS
+    from InvestmentResearch.database import db, init_db
+
+    profile = {'driver': 'sqlite', 'database': str(tmp_path.joinpath('lazy.sqlite'))}
+    monkeypatch.setitem(CONFIGS['database'], 'lazy', profile)
+    monkeypatch.setitem(CONFIGS['database'], 'current', 'lazy')
+
+    previous = db.obj
+    try:
+        db.initialize(None)
+        assert db.obj is None
+        assert db.execute_sql('SELECT 1;').fetchone()[0] == 1
+        assert isinstance(db.obj, SqliteDatabase)
+        assert str(db.obj.database) == profile['database']
+        db.close()
+
+        database = init_db('lazy')
+        assert db.obj is database
+    finally:
+        db.close()
+        db.initialize(previous)
+
+
+@pytest.mark.run(order=8)
+def test_database_sqlite_mode(tmp_path):
+    """
+    Test for the bulk-load mode and the analytic mode of SQLite.
+    """
+    from peewee import SqliteDatabase, OperationalError
+    from InvestmentResearch.database import Stock, sqlite_bulk_mode
+    from InvestmentResearch.database.interface import create_sqlite_database
+    from InvestmentResearch.database.model.quote import StockQuoteDaily
+
+    path = tmp_path.joinpath('mode.sqlite')
+    database = create_sqlite_database({'database': str(path)})
+    with database.bind_ctx([Stock, StockQuoteDaily]):
+        database.create_tables([Stock, StockQuoteDaily])
+        database.pragma('foreign_keys', 0)
+        index_before = sorted(x.name for x in database.get_indexes('stock_quote_daily'))
+        synchronous = database.pragma('synchronous')
+
+        with sqlite_bulk_mode([StockQuoteDaily], database):
+            assert database.pragma('synchronous') == 0
+            assert database.pragma('temp_store') == 2
+            index_list = database.get_indexes('stock_quote_daily')
+            assert [x.unique for x in index_list] == [True]
+            StockQuoteDaily.insert_many(
+                [(1, '2021-07-12', 1.0, 1.0, 1.0, 1.0, 1, 1.0)],
+                fields=['symbol', 'date', 'open', 'high', 'low', 'close', 'volume', 'amount']
+            ).execute()
+
+        assert database.pragma('synchronous') == synchronous
+        assert sorted(x.name for x in database.get_indexes('stock_quote_daily')) == index_before
+        assert database.execute_sql('SELECT COUNT(*) FROM sqlite_stat1;').fetchone()[0] > 0
+    database.close()
+
+    analytic = create_sqlite_database({'database': str(path), 'mode': 'analytic'})
+    assert isinstance(analytic, SqliteDatabase)
+    assert analytic.execute_sql('SELECT COUNT(*) FROM stock_quote_daily;').fetchone()[0] == 1
+    assert analytic.pragma('query_only') == 1
+    with pytest.raises(OperationalError):
+        analytic.execute_sql('DELETE FROM stock_quote_daily;')
+    analytic.close()
+
+
+@pytest.mark.run(order=8)
+def test_database_reference():
+    """
+    Test for the cache of reference tables.
+    """
+    from peewee import SqliteDatabase, IntegrityError
+    from InvestmentResearch.database import Country, Exchange, reference
+    from InvestmentResearch.database.model import FuturesProduct, FuturesContract
+
+    class CountingDatabase(SqliteDatabase):
+        count: int = 0
+
+        def execute_sql(self, sql, params=None, *args, **kwargs):
+            self.count += 1
+            return super().execute_sql(sql, params, *args, **kwargs)
+
+    model_list = [Country, Exchange, FuturesProduct, FuturesContract]
+    memory_db = CountingDatabase(':memory:')
+    with memory_db.bind_ctx(model_list):
+        memory_db.create_tables(model_list)
+        reference.invalidate()
+        reference.ensure(
+            'country_alpha3',
+            [{'alpha3': 'CHN', 'alpha2': 'CN', 'numeric': '156', 'name_zh': '中国', 'name_en': 'China'}]
+        )
+        reference.ensure(
+            'exchange',
+            [{'symbol': 'SHFE', 'name': '上期所', 'fullname': '上海期货交易所',
+              'country': reference.get('country_alpha3', 'CHN')}]
+        )
+
+        memory_db.count = 0
+        for _ in range(100):
+            assert reference.get('country_alpha3', 'CHN') == 1
+            assert reference.get('country_alpha2', 'CN') == 1
+            assert reference.get('exchange', 'SHFE') == 1
+        assert reference.get('country_alpha3', 'USA') is None
+        assert memory_db.count == 1     # country_alpha2 loaded
+
+        product_list = [{'exchange': 1, 'symbol': x, 'name_zh': x} for x in ('cu', 'al', 'cu', 'zn')]
+        product_map = reference.ensure('futures_product', product_list)
+        assert FuturesProduct.select().count() == 3
+        assert product_map == {x.symbol: x.id for x in FuturesProduct.select()}
+        contract_map = reference.ensure(
+            'futures_contract',
+            [{'product': product_map['cu'], 'delivery_month': f'21{x:02d}'} for x in range(1, 13)]
+        )
+        assert len(contract_map) == 12
+        assert contract_map[(product_map['cu'], '2112')] == FuturesContract.get(
+            FuturesContract.delivery_month == '2112'
+        ).id
+
+        memory_db.count = 0
+        assert reference.ensure('futures_product', product_list) == product_map
+        assert memory_db.count == 0
+
+        # Inserted by another process after the map was loaded.
+        FuturesContract.create(product=product_map['al'], delivery_month='2201')
+        with pytest.raises(IntegrityError):
+            FuturesContract.create(product=product_map['al'], delivery_month='2201')
+        contract_map = reference.ensure(
+            'futures_contract',
+            [{'product': product_map['al'], 'delivery_month': x} for x in ('2201', '2202')]
+        )
+        assert FuturesContract.select().where(FuturesContract.product == product_map['al']).count() == 2
+        assert contract_map[(product_map['al'], '2201')] == FuturesContract.get(
+            (FuturesContract.product == product_map['al']) & (FuturesContract.delivery_month == '2201')
+        ).id
+
+        FuturesProduct.delete().where(FuturesProduct.symbol == 'zn').execute()
+        reference.invalidate(FuturesProduct)
+        assert reference.get('futures_product', 'zn') is None
+        reference.invalidate()
+
+
+@pytest.mark.run(order=8)
+def test_database_initialize_all():
+    """
+    Test for initializing all the tables, again and again.
+    """
+    import time
+    from peewee import SqliteDatabase
+    from InvestmentResearch.database import initialize_all, reference
+    from InvestmentResearch.database.initializer import INITIAL_TABLE, EMPTY_TABLE
+    from InvestmentResearch.database.model import (
+        Country, Exchange, Holiday, StockStatus, DataDigest, DomesticAdministrativeDivisions, PlantingArea
+    )
+
+    model_list = [x.model for x in INITIAL_TABLE] + EMPTY_TABLE + [StockStatus, DataDigest]
+    memory_db = SqliteDatabase(':memory:', pragmas={'foreign_keys': 1})
+    with memory_db.bind_ctx(model_list):
+        reference.invalidate()
+        begin = time.perf_counter()
+        assert initialize_all() == [x.model._meta.table_name for x in INITIAL_TABLE]
+        assert time.perf_counter() - begin < 5
+        count = {x: x.select().count() for x in model_list}
+        assert count[Country] > 200
+        assert count[StockStatus] == 5
+        assert Exchange.get(Exchange.symbol == 'SHFE').country.alpha3 == 'CHN'
+        assert Holiday.select().join(Country).where(Country.alpha3 == 'CHN').count() == count[Holiday]
+        county = DomesticAdministrativeDivisions.get(DomesticAdministrativeDivisions.symbol == '110101')
+        assert county.upper.fullname == '北京市'
+        assert PlantingArea.get(
+            (PlantingArea.year == 1999) & (PlantingArea.product == '玉米') & (PlantingArea.province == '北京')
+        ).area == 207.7
+
+        assert initialize_all() == []
+        assert {x: x.select().count() for x in model_list} == count
+        assert len(initialize_all(force=True)) == len(INITIAL_TABLE)
+        assert {x: x.select().count() for x in model_list} == count
+        assert len(initialize_all(drop=True)) == len(INITIAL_TABLE)
+        assert {x: x.select().count() for x in model_list} == count
+        reference.invalidate()
+
+
+@pytest.mark.run(order=8)
+def test_database_calendar():
+    """
+    Test for materializing Calendar from Holiday, and extending it after holidays added.
+    """
+    import datetime as dt
+    from peewee import SqliteDatabase
+    from InvestmentResearch.database import materialize_calendar, reference
+    from InvestmentResearch.database.initializer import INITIAL_TABLE, initialize_table
+    from InvestmentResearch.database.model import Country, Holiday, Calendar, DayStatus, DataDigest
+    from InvestmentResearch.trading_calendar import trading_calendar
+
+    memory_db = SqliteDatabase(':memory:', pragmas={'foreign_keys': 1})
+    with memory_db.bind_ctx([Country, Holiday, Calendar, DataDigest]):
+        reference.invalidate()
+        memory_db.create_tables([Country, Holiday, Calendar, DataDigest])
+        initialize_table(INITIAL_TABLE[0])
+        initialize_table(INITIAL_TABLE[2])
+
+        update = materialize_calendar('CHN')
+        calendar = trading_calendar('CHN')
+        begin, end = calendar.begin, Calendar.select(Calendar.date).order_by(Calendar.date.desc()).scalar()
+        assert update.inserted == (end - begin).days + 1 == Calendar.select().count()
+        assert update.updated == 0
+        trading_day = Calendar.select(Calendar.date).join(Country).where(
+            (Country.alpha3 == 'CHN') & (Calendar.status == DayStatus.TradingDay.value)
+        ).order_by(Calendar.date)
+        assert [x.date for x in trading_day] == calendar.trading_day_list(begin, end)
+        assert Calendar.get(Calendar.date == dt.date(2021, 10, 2)).status == DayStatus.Holiday.value
+        assert Calendar.get(Calendar.date == dt.date(2021, 10, 16)).status == DayStatus.Weekend.value
+        assert materialize_calendar('CHN') == (0, 0)
+
+        Holiday.create(
+            begin=dt.date(2022, 1, 1), end=dt.date(2022, 1, 3), name='元旦', country=reference.get('country_alpha3', 'CHN')
+        )
+        assert materialize_calendar('CHN', end=end + dt.timedelta(days=10)) == (10, 3)
+        assert Calendar.get(Calendar.date == dt.date(2022, 1, 3)).status == DayStatus.Holiday.value
+        reference.invalidate()
+
+
+@pytest.mark.run(order=8)
+def test_database_dad():
+    """
+    Test for the closure table and the in-memory tree of administrative divisions.
+    """
+    import time
+    import pandas as pd
+    from peewee import SqliteDatabase
+    from InvestmentResearch.database import DadTree, dad_descendants, dad_path
+    from InvestmentResearch.database.dad import closure_pairs
+    from InvestmentResearch.database.initializer import INITIAL_TABLE, initialize_table
+    from InvestmentResearch.database.model import (
+        DomesticAdministrativeDivisions, DomesticAdministrativeDivisionsClosure, DataDigest
+    )
+
+    model_list = [DomesticAdministrativeDivisions, DomesticAdministrativeDivisionsClosure, DataDigest]
+    memory_db = SqliteDatabase(':memory:', pragmas={'foreign_keys': 1})
+    with memory_db.bind_ctx(model_list):
+        memory_db.create_tables(model_list)
+        begin = time.perf_counter()
+        assert initialize_table(INITIAL_TABLE[3])
+        assert time.perf_counter() - begin < 5
+
+        division_count = DomesticAdministrativeDivisions.select().count()
+        closure_count = DomesticAdministrativeDivisionsClosure.select().count()
+        assert closure_count > 2 * division_count
+
+        assert [x.symbol for x in dad_path('130102')] == ['130000', '130100', '130102']
+        assert [x.depth for x in dad_path('130102')] == [2, 1, 0]
+        assert [x.symbol for x in dad_descendants('110000')][:2] == ['110101', '110102']
+        county_list = [x.symbol for x in dad_descendants('130000', depth=2)]
+        assert '130102' in county_list
+        assert all(x.startswith('13') for x in county_list)
+
+        tree = DadTree.from_database()
+        assert len(tree) == division_count
+        assert len(tree.top()) == 29
+        assert tree.upper('130102') == '130100'
+        assert tree.upper('130000') is None
+        assert '130102' in tree.lower('130100')
+        assert tree.path('130102') == ['130000', '130100', '130102']
+        assert tree.descendants('130000') == [x.symbol for x in dad_descendants('130000')]
+        assert tree.descendants('130000', depth=2) == county_list
+
+        rollup = tree.rollup(pd.Series({'130102': 1.0, '130103': 2.0, '130100': 4.0, '999999': 8.0}))
+        assert rollup['130102'] == 1.0
+        assert rollup['130100'] == 7.0
+        assert rollup['130000'] == 7.0
+        assert rollup['110000'] == 0.0
+
+        # Loaded again, with the closure table built again.
+        assert initialize_table(INITIAL_TABLE[3], force=True)
+        assert DomesticAdministrativeDivisionsClosure.select().count() == closure_count
+
+    with pytest.raises(ValueError):
+        closure_pairs([1, 0])
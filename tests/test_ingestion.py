@@ -0,0 +1,258 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+import pytest
+
+import datetime as dt
+
+
+def make_trade(count: int, begin: int = 0) -> list:
+    return [
+        {
+            'date': dt.date(2021, 7, 12) + dt.timedelta(days=i // 10),
+            'symbol': '600000',
+            'name': '浦发银行',
+            'offset': '买入' if i % 2 == 0 else '卖出',
+            'price': 10.0 + i / 100,
+            'volume': 100,
+            'trade_sn': f'{i:08d}',
+            'order_sn': f'{i:06d}',
+            'account': 'A123456789',
+        } for i in range(begin, begin + count)
+    ]
+
+
+@pytest.mark.run(order=12)
+def test_ingest_record():
+    """
+    Test for loading records idempotently.
+    """
+    from peewee import SqliteDatabase
+    from InvestmentResearch.collector.reader.tdx import TdxRecordTypeEnum
+    from InvestmentResearch.database.ingestion import ingest_record
+    from InvestmentResearch.database.model import TradeRecord
+
+    memory_db = SqliteDatabase(':memory:')
+    with memory_db.bind_ctx([TradeRecord]):
+        assert ingest_record(make_trade(250), TdxRecordTypeEnum.Trade) == 250
+        assert ingest_record(make_trade(250), TdxRecordTypeEnum.Trade) == 0
+        assert ingest_record(make_trade(100, 200), TdxRecordTypeEnum.Trade) == 50
+        assert TradeRecord.select().count() == 300
+        assert TradeRecord.get(TradeRecord.trade_sn == '00000299').price == 12.99
+
+
+@pytest.mark.run(order=13)
+def test_ingest_quote():
+    """
+    Test for loading quotes in batches.
+    """
+    import numpy as np
+    from peewee import SqliteDatabase
+    from InvestmentResearch.collector.reader.tdx import TdxPeriodEnum
+    from InvestmentResearch.database import Stock
+    from InvestmentResearch.database.ingestion import ingest_quote
+    from InvestmentResearch.database.model.quote import StockQuoteDaily, StockQuoteMinutely
+
+    def make_column(count: int, time_key: str, unit: str) -> dict:
+        return {
+            time_key: np.datetime64('2021-07-12', unit) + np.arange(count),
+            'open': np.full(count, 10.0),
+            'high': np.full(count, 10.5),
+            'low': np.full(count, 9.5),
+            'close': np.linspace(10.0, 11.0, count),
+            'amount': np.full(count, 1e6),
+            'volume': np.arange(count, dtype=np.int64),
+        }
+
+    memory_db = SqliteDatabase(':memory:')
+    with memory_db.bind_ctx([Stock, StockQuoteDaily, StockQuoteMinutely]):
+        Stock.create_table()
+        for symbol in ('600000', '000001'):
+            Stock.create(exchange=1, symbol=symbol, name=symbol[:4], market='A')
+
+        progress_list = []
+        quote_list = [
+            ('600000', make_column(300, 'date', 'D')),
+            ('999999', make_column(10, 'date', 'D')),
+            ('000001', make_column(200, 'date', 'D')),
+        ]
+        result = ingest_quote(quote_list, TdxPeriodEnum.Day, progress=progress_list.append, transaction_rows=128)
+        assert result.rows == 500
+        assert result.skipped == ['999999']
+        assert result.rows_per_second > 0
+        assert [x.rows for x in progress_list] == [128, 256, 384, 500]
+        assert StockQuoteDaily.select().count() == 500
+        row = StockQuoteDaily.select().join(Stock).where(Stock.symbol == '000001').order_by(
+            StockQuoteDaily.date.desc()
+        ).get()
+        assert row.date == dt.date(2021, 7, 12) + dt.timedelta(days=199)
+        assert row.close == 11.0
+        assert row.volume == 199
+
+        result = ingest_quote([('600000', make_column(240, 'datetime', 'm'))], TdxPeriodEnum.Minute5)
+        assert result.rows == 240
+        row = StockQuoteMinutely.select().order_by(StockQuoteMinutely.datetime.desc()).get()
+        assert row.period == 'Minute5'
+        assert row.datetime == dt.datetime(2021, 7, 12, 3, 59)
+
+
+@pytest.mark.run(order=14)
+def test_upsert_quote():
+    """
+    Test for loading quotes again, by upsert.
+    """
+    import numpy as np
+    from peewee import SqliteDatabase, IntegrityError
+    from InvestmentResearch.collector.reader.tdx import TdxPeriodEnum
+    from InvestmentResearch.database import Stock
+    from InvestmentResearch.database.ingestion import ingest_quote, upsert
+    from InvestmentResearch.database.model.quote import StockQuoteDaily
+
+    def make_column(count: int, close: float) -> dict:
+        return {
+            'date': np.datetime64('2021-07-12', 'D') + np.arange(count),
+            'open': np.full(count, 10.0),
+            'high': np.full(count, 10.5),
+            'low': np.full(count, 9.5),
+            'close': np.full(count, close),
+            'amount': np.full(count, 1e6),
+            'volume': np.arange(count, dtype=np.int64),
+        }
+
+    memory_db = SqliteDatabase(':memory:')
+    with memory_db.bind_ctx([Stock, StockQuoteDaily]):
+        Stock.create_table()
+        Stock.create(exchange=1, symbol='600000', name='浦发银行', market='A')
+
+        ingest_quote([('600000', make_column(100, 10.0))], TdxPeriodEnum.Day)
+        with pytest.raises(IntegrityError):
+            ingest_quote([('600000', make_column(100, 10.0))], TdxPeriodEnum.Day)
+        ingest_quote([('600000', make_column(150, 11.0))], TdxPeriodEnum.Day, replace=True)
+        assert StockQuoteDaily.select().count() == 150
+        assert StockQuoteDaily.select().where(StockQuoteDaily.close == 11.0).count() == 150
+
+        field_list = [StockQuoteDaily.symbol, StockQuoteDaily.date, StockQuoteDaily.close,
+                      StockQuoteDaily.open, StockQuoteDaily.high, StockQuoteDaily.low,
+                      StockQuoteDaily.volume, StockQuoteDaily.amount]
+        row_list = [(1, dt.date(2021, 7, 12), 12.0, 10.0, 12.0, 10.0, 1, 1.0),
+                    (1, dt.date(2022, 1, 4), 13.0, 10.0, 13.0, 10.0, 1, 1.0)]
+        assert upsert(StockQuoteDaily, row_list, field_list) == 2
+        assert StockQuoteDaily.select().count() == 151
+        assert StockQuoteDaily.get(StockQuoteDaily.date == dt.date(2021, 7, 12)).close == 12.0
+
+        # Range queries of a symbol use the unique index.
+        plan = memory_db.execute_sql(
+            'EXPLAIN QUERY PLAN SELECT * FROM stock_quote_daily WHERE symbol_id = 1 AND date >= ?',
+            (dt.date(2021, 8, 1),)
+        ).fetchall()
+        assert 'USING INDEX stock_quote_daily_symbol_id_date' in str(plan)
+
+
+@pytest.mark.run(order=15)
+def test_bulk_load():
+    """
+    Test for loading rows by the native path of the database.
+    """
+    import csv
+    import io
+    from peewee import SqliteDatabase, IntegrityError
+    from InvestmentResearch.database import Stock
+    from InvestmentResearch.database.bulk import CsvStream, bulk_load
+    from InvestmentResearch.database.bulk import copy_sql
+    from InvestmentResearch.database.model.quote import StockQuoteDaily
+
+    field_list = [x for x in StockQuoteDaily._meta.sorted_fields if x.name != 'id']
+    row_list = [
+        (dt.date(2021, 7, 12) + dt.timedelta(days=i), 1, 10.0, 10.5, 9.5, 10.25, i, 1e6)
+        for i in range(25)
+    ]
+
+    stream = CsvStream(row_list, chunk_rows=10)
+    text = ''.join(iter(lambda: stream.read(100), ''))
+    assert stream.count == 25
+    assert text.splitlines()[0] == '"2021-07-12",1,10.0,10.5,9.5,10.25,0,1000000.0'
+    assert CsvStream([(1, None, 'a,b')]).read() == '1,\\N,"a,b"\n'
+    # Empty strings and NULL are told apart.
+    assert CsvStream([('', None, '\\N', 'a"b')]).read() == '"",\\N,"\\N","a""b"\n'
+    assert len(list(csv.reader(io.StringIO(text)))) == 25
+    assert ''.join(CsvStream(row_list, chunk_rows=7)) == text
+    assert copy_sql(StockQuoteDaily, field_list) == \
+        'COPY "stock_quote_daily" ("date", "symbol_id", "open", "high", "low", "close", "volume", "amount") ' \
+        'FROM STDIN WITH (FORMAT csv, NULL \'\\N\')'
+
+    memory_db = SqliteDatabase(':memory:')
+    with memory_db.bind_ctx([Stock, StockQuoteDaily]):
+        memory_db.create_tables([Stock, StockQuoteDaily])
+        index_before = sorted(x.name for x in memory_db.get_indexes('stock_quote_daily'))
+
+        assert bulk_load(StockQuoteDaily, iter(row_list), field_list) == 25
+        assert StockQuoteDaily.select().count() == 25
+        assert sorted(x.name for x in memory_db.get_indexes('stock_quote_daily')) == index_before
+
+        with pytest.raises(IntegrityError):
+            bulk_load(StockQuoteDaily, row_list[:3], field_list)
+        assert StockQuoteDaily.select().count() == 25
+        assert sorted(x.name for x in memory_db.get_indexes('stock_quote_daily')) == index_before
+
+
+@pytest.mark.run(order=15)
+def test_driver_errors():
+    """
+    Test for raising errors of drivers as those of peewee, by the names of DB-API 2.0.
+    """
+    import peewee
+    from InvestmentResearch.database.interface import driver_errors
+
+    # As psycopg2.errors.UniqueViolation, a subclass of psycopg2.IntegrityError.
+    class Error(Exception):
+        pass
+
+    class IntegrityError(Error):
+        pass
+
+    class UniqueViolation(IntegrityError):
+        pass
+
+    with pytest.raises(peewee.IntegrityError) as info:
+        with driver_errors():
+            raise UniqueViolation('duplicate key value violates unique constraint')
+    assert isinstance(info.value.__cause__, UniqueViolation)
+    assert str(info.value) == 'duplicate key value violates unique constraint'
+
+    with pytest.raises(peewee.IntegrityError) as info:
+        with driver_errors():
+            raise peewee.IntegrityError('raised by peewee')
+    assert info.value.__cause__ is None
+    with pytest.raises(Error):
+        with driver_errors():
+            raise Error('not of DB-API 2.0')
+
+
+@pytest.mark.run(order=15)
+def test_lazy_import():
+    """
+    Test for importing the database package without numpy, pandas or the TDX reader,
+    which are loaded on the first access of ingestion.
+    """
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    code = 'import sys\n' \
+           'import InvestmentResearch.database as database\n' \
+           'heavy = ["numpy", "pandas", "InvestmentResearch.collector.reader.tdx"]\n' \
+           'assert not any(x in sys.modules for x in heavy), [x for x in heavy if x in sys.modules]\n' \
+           'from InvestmentResearch.database import ingest_quote, reference\n' \
+           'assert all(x in sys.modules for x in heavy)\n' \
+           'assert ingest_quote is sys.modules["InvestmentResearch.database.ingestion"].ingest_quote\n' \
+           'assert "bulk_load" in dir(database)\n'
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, cwd=Path(__file__).parents[1]
+    )
+    assert result.returncode == 0, result.stderr
+
+    import InvestmentResearch.database as database
+    with pytest.raises(AttributeError):
+        getattr(database, 'not_a_name')
@@ -0,0 +1,156 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+import pytest
+
+import datetime as dt
+
+
+def make_settle(date: dt.date, symbol: str, offset: str, price: float, volume: int, fee: float) -> dict:
+    amount: float = price * volume
+    return {
+        'date': date,
+        'subject': f'证券{offset}',
+        'change': -amount - fee if offset == '买入' else amount - fee,
+        'balance': 0.0,
+        'currency': '人民币',
+        'symbol': symbol,
+        'name': '',
+        'offset': offset,
+        'price': price,
+        'volume': float(volume),
+        'commission': fee,
+        'tax': 0.0,
+        'transfer_fee': 0.0,
+        'other_fee': 0.0,
+    }
+
+
+SETTLE_LIST: list = [
+    make_settle(dt.date(2021, 7, 12), '600000', '买入', 10.0, 1000, 5.0),
+    make_settle(dt.date(2021, 7, 12), '000001', '买入', 20.0, 500, 5.0),
+    make_settle(dt.date(2021, 7, 13), '600000', '买入', 11.0, 1000, 5.0),
+    make_settle(dt.date(2021, 7, 14), '600000', '卖出', 12.0, 1000, 17.0),
+    make_settle(dt.date(2021, 7, 15), '600000', '卖出', 9.0, 1000, 14.0),
+    make_settle(dt.date(2021, 7, 16), '600000', '买入', 10.0, 500, 5.0),
+    make_settle(dt.date(2021, 7, 16), '000001', '卖出', 21.0, 200, 5.0),
+]
+
+
+@pytest.mark.run(order=14)
+def test_ledger():
+    """
+    Test for replaying records into positions and P&L.
+    """
+    import numpy as np
+    import pandas as pd
+    from InvestmentResearch.portfolio import Ledger
+
+    ledger = Ledger(SETTLE_LIST)
+    history = ledger.history
+    rows = history[history['symbol'] == '600000']
+    assert rows['position'].tolist() == [1000, 2000, 1000, 0, 500]
+    assert np.allclose(rows['cost'], [10005, 21010, 10505, 0, 5005])
+    assert np.allclose(rows['realized'], [0, 0, 1478, -41, -41])
+    assert np.isnan(rows['average_cost'].iloc[3])
+
+    position = ledger.position({'600000': 11.0, '000001': 19.0})
+    assert position.loc['600000', 'position'] == 500
+    assert position.loc['600000', 'commission'] == 46.0
+    assert np.isclose(position.loc['600000', 'unrealized'], 5500 - 5005)
+    assert np.isclose(position.loc['000001', 'cost'], 10005 * 0.6)
+    assert np.isclose(position.loc['000001', 'realized'], 4195 - 10005 * 0.4)
+
+    # Incremental updates give the same state.
+    incremental = Ledger()
+    for i in range(0, len(SETTLE_LIST), 3):
+        incremental.update(SETTLE_LIST[i:i + 3])
+    pd.testing.assert_frame_equal(incremental.state, ledger.state)
+    pd.testing.assert_frame_equal(incremental.history, ledger.history)
+    with pytest.raises(ValueError):
+        incremental.update(SETTLE_LIST[:1])
+    with pytest.raises(ValueError):
+        Ledger(SETTLE_LIST[3:4])
+
+    close = pd.DataFrame(
+        {'600000': [10.5, 11.5, 12.5, 9.5, 10.5], '000001': [20.0, 20.0, 20.0, 20.0, 19.0]},
+        index=pd.date_range('2021-07-12', periods=5),
+    )
+    mark = ledger.mark_to_market(close)
+    assert mark['position']['600000'].tolist() == [1000, 2000, 1000, 0, 500]
+    assert np.allclose(mark['unrealized']['600000'], [10500 - 10005, 23000 - 21010, 12500 - 10505, 0, 5250 - 5005])
+    assert np.allclose(mark['realized']['600000'], [0, 0, 1478, -41, -41])
+
+
+@pytest.mark.run(order=14)
+def test_ledger_trade_around():
+    """
+    Test for many buy / sell cycles around a core position, the cost basis should not drift.
+    """
+    import numpy as np
+    from InvestmentResearch.portfolio import Ledger
+
+    day = dt.date(2021, 1, 4)
+    settle_list = [make_settle(day, '600000', '买入', 10.0, 100, 0.0)]
+    for _ in range(200):
+        settle_list.append(make_settle(day, '600000', '买入', 10.0, 10000, 0.0))
+        settle_list.append(make_settle(day, '600000', '卖出', 10.0, 10000, 0.0))
+
+    ledger = Ledger(settle_list)
+    assert np.isfinite(ledger.history['cost']).all()
+    assert ledger.state.loc['600000', 'position'] == 100
+    assert np.isclose(ledger.state.loc['600000', 'cost'], 1000.0)
+    assert np.isclose(ledger.state.loc['600000', 'realized'], 0.0)
+
+    incremental = Ledger(settle_list[:201])
+    incremental.update(settle_list[201:])
+    assert np.isclose(incremental.state.loc['600000', 'cost'], 1000.0)
+
+
+@pytest.mark.run(order=15)
+def test_reconcile():
+    """
+    Test for reconciling orders, trades and settlements.
+    """
+    from InvestmentResearch.portfolio import reconcile
+
+    day = dt.date(2021, 7, 12)
+    order_list = [
+        {'account': 'A1', 'date': day, 'order_sn': '1', 'symbol': '600000', 'offset': '买入', 'volume_order': 1000},
+        {'account': 'A1', 'date': day, 'order_sn': '2', 'symbol': '600000', 'offset': '买入', 'volume_order': 1000},
+        {'account': 'A1', 'date': day, 'order_sn': '3', 'symbol': '000001', 'offset': '买入', 'volume_order': 500},
+        {'account': 'A2', 'date': day, 'order_sn': '1', 'symbol': '000001', 'offset': '卖出', 'volume_order': 200},
+    ]
+    trade_list = [
+        {'account': 'A1', 'date': day, 'order_sn': '1', 'trade_sn': 'a', 'symbol': '600000', 'offset': '买入',
+         'price': 10.0, 'volume': 600},
+        {'account': 'A1', 'date': day, 'order_sn': '1', 'trade_sn': 'b', 'symbol': '600000', 'offset': '买入',
+         'price': 10.0, 'volume': 400},
+        {'account': 'A1', 'date': day, 'order_sn': '2', 'trade_sn': 'c', 'symbol': '600000', 'offset': '买入',
+         'price': 10.0, 'volume': 400},
+        {'account': 'A2', 'date': day, 'order_sn': '9', 'trade_sn': 'd', 'symbol': '000001', 'offset': '卖出',
+         'price': 20.0, 'volume': 100},
+    ]
+    settle_list = [
+        make_settle(day, '600000', '买入', 10.0, 400, 5.0),
+        make_settle(day, '600000', '买入', 10.0, 600, 5.0),
+        make_settle(day, '000001', '卖出', 20.0, 300, 5.0),
+    ]
+
+    result = reconcile(order_list, trade_list, settle_list)
+    status = result.order.set_index(['account', 'order_sn'])['status']
+    assert status[('A1', '1')] == 'Filled'
+    assert status[('A1', '2')] == 'Partial'
+    assert status[('A1', '3')] == 'Unfilled'
+    assert status[('A2', '1')] == 'Unfilled'
+    assert status[('A2', '9')] == 'Orphan'
+    assert result.order.set_index(['account', 'order_sn']).loc[('A1', '1'), 'trade_count'] == 2
+
+    status = result.settle.set_index(result.settle['trade_sn'].fillna('-'))['status']
+    assert status['a'] == 'Matched'
+    assert status['b'] == 'Matched'
+    assert status['c'] == 'Unsettled'
+    assert status['d'] == 'Unsettled'
+    assert status['-'] == 'Unmatched'
@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+import pytest
+
+import numpy as np
+
+
+def make_quote() -> dict:
+    """
+    1 minute bars of two symbols, the first one with night session.
+    """
+    return {
+        'symbol': np.array(['rb2110'] * 5 + ['hc2110'] * 2),
+        'datetime': np.array(
+            [
+                '2021-07-16T21:01', '2021-07-16T21:02',
+                '2021-07-19T09:01', '2021-07-19T09:02', '2021-07-19T15:00',
+                '2021-07-19T09:01', '2021-07-19T10:01',
+            ],
+            dtype='datetime64[m]'
+        ),
+        'open': np.array([10.0, 11.0, 12.0, 13.0, 14.0, 20.0, 21.0]),
+        'high': np.array([10.5, 11.5, 12.5, 13.5, 14.5, 20.5, 21.5]),
+        'low': np.array([9.5, 10.5, 11.5, 12.5, 13.5, 19.5, 20.5]),
+        'close': np.array([10.2, 11.2, 12.2, 13.2, 14.2, 20.2, 21.2]),
+        'amount': np.array([100.0, 110.0, 120.0, 130.0, 140.0, 200.0, 210.0]),
+        'volume': np.array([10, 11, 12, 13, 14, 20, 21]),
+    }
+
+
+@pytest.mark.run(order=11)
+def test_resample_intraday():
+    """
+    Test for resampling to intraday periods, with and without night session.
+    """
+    from InvestmentResearch.database.model.quote import QuotePeriod
+    from InvestmentResearch.collector.resample import resample
+
+    result = resample(make_quote(), QuotePeriod.Hour1, 'SHFE')
+    assert list(result['symbol']) == ['rb2110', 'rb2110', 'hc2110', 'hc2110']
+    assert list(result['datetime'].astype(str)) == [
+        '2021-07-19T09:02', '2021-07-19T15:00', '2021-07-19T09:01', '2021-07-19T10:01',
+    ]
+    assert list(result['open']) == [12.0, 14.0, 20.0, 21.0]
+    assert list(result['close']) == [13.2, 14.2, 20.2, 21.2]
+    assert list(result['volume']) == [25, 14, 20, 21]
+
+    result = resample(make_quote(), QuotePeriod.Hour1N, 'SHFE')
+    assert list(result['datetime'].astype(str))[:2] == ['2021-07-16T21:02', '2021-07-19T09:02']
+    assert result['high'][0] == 11.5
+    assert result['low'][0] == 9.5
+
+
+@pytest.mark.run(order=11)
+def test_resample_all():
+    """
+    Test for resampling to all periods in one pass.
+    """
+    import pandas as pd
+    from InvestmentResearch.database.model.quote import QuotePeriod
+    from InvestmentResearch.collector.resample import resample_all
+
+    df = pd.DataFrame(make_quote())
+    df['symbol'] = df['symbol'].astype('category')
+    result = resample_all(df, 'SHFE')
+    assert len(result[QuotePeriod.Minute1]) == 7
+    assert len(result[QuotePeriod.Minute3]) == 5
+
+    day = result[QuotePeriod.Day]
+    assert day['symbol'].dtype == 'category'
+    assert list(day['date'].astype(str)) == ['2021-07-19', '2021-07-19']
+    assert list(day['open']) == [10.0, 20.0]
+    assert list(day['close']) == [14.2, 21.2]
+    assert list(day['volume']) == [60, 41]
+
+    # Night session of Friday belongs to Monday, the same week.
+    assert list(result[QuotePeriod.Week]['volume']) == [60, 41]
+
+
+@pytest.mark.run(order=11)
+def test_resample_exchange():
+    """
+    Test for resampling a panel of several exchanges, as read_market returns.
+    """
+    import pandas as pd
+    from InvestmentResearch.database.model.quote import QuotePeriod
+    from InvestmentResearch.collector.reader.tdx import TdxExchangeEnum
+    from InvestmentResearch.collector.resample import resample, resample_all
+
+    df = pd.DataFrame(make_quote())
+    exchange_category = [x.name for x in TdxExchangeEnum]
+    df.insert(0, 'exchange', pd.Categorical(['SHFE'] * 5 + ['HKEX'] * 2, categories=exchange_category))
+    df['symbol'] = df['symbol'].astype('category')
+
+    with pytest.raises(ValueError, match='HKEX'):
+        resample(df, QuotePeriod.Minute5)
+    with pytest.raises(ValueError, match='HKEX'):
+        resample_all(df)
+
+    supported = df[df['exchange'] != 'HKEX']
+    assert list(resample(supported, QuotePeriod.Day)['volume']) == [60]
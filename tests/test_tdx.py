@@ -0,0 +1,492 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+import pytest
+
+from typing import List, Tuple
+from pathlib import Path
+import datetime as dt
+import struct
+
+
+DAILY_DATA: List[Tuple[int, int, int, int, int, float, int, int]] = [
+    (20210712, 1001, 1020, 995, 1010, 1.5e8, 15000000, 0),
+    (20210713, 1010, 1033, 1002, 1029, 2.25e8, 21000000, 0),
+    (20210714, 1029, 1030, 987, 990, 1.75e8, 17500000, 0),
+    (20210716, 990, 999, 981, 997, 1.0e8, 10000000, 0),
+]
+
+
+def make_daily_file(tdx_path: Path, symbol: str = '600000') -> Path:
+    quote_file: Path = tdx_path.joinpath('vipdoc', 'sh', 'lday', f'sh{symbol}.day')
+    quote_file.parent.mkdir(parents=True, exist_ok=True)
+    pattern = struct.Struct(r'<IIIIIfII')
+    with open(quote_file, 'wb') as f:
+        for item in DAILY_DATA:
+            f.write(pattern.pack(*item))
+    return quote_file
+
+
+# (date, minute, open, high, low, close, amount, volume, reserved), SHFE rb with night session.
+MINUTELY_DATA: List[Tuple[int, int, float, float, float, float, float, int, int]] = [
+    ((2021 - 2004) * 2048 + 715, 21 * 60 + 1, 5600.0, 5610.0, 5598.0, 5605.0, 5.6e7, 1000, 0),
+    ((2021 - 2004) * 2048 + 715, 21 * 60 + 2, 5605.0, 5606.0, 5590.0, 5591.0, 4.5e7, 800, 0),
+    ((2021 - 2004) * 2048 + 716, 9 * 60 + 1, 5591.0, 5620.5, 5591.0, 5620.0, 6.7e7, 1200, 0),
+    ((2021 - 2004) * 2048 + 716, 9 * 60 + 2, 5620.0, 5625.0, 5612.0, 5613.0, 3.3e7, 600, 0),
+    ((2021 - 2004) * 2048 + 716, 15 * 60, 5613.0, 5613.0, 5600.0, 5601.0, 2.8e7, 500, 0),
+]
+
+
+def make_minutely_file(tdx_path: Path, symbol: str = 'rb2110') -> Path:
+    quote_file: Path = tdx_path.joinpath('vipdoc', 'ds', 'minline', f'30#ds{symbol}.lc1')
+    quote_file.parent.mkdir(parents=True, exist_ok=True)
+    pattern = struct.Struct(r'<HHfffffII')
+    with open(quote_file, 'wb') as f:
+        for item in MINUTELY_DATA:
+            f.write(pattern.pack(*item))
+    return quote_file
+
+
+@pytest.fixture
+def tdx_path(tmp_path, monkeypatch) -> Path:
+    from InvestmentResearch.utility import CONFIGS
+
+    monkeypatch.setitem(CONFIGS, 'tdx', str(tmp_path))
+    make_daily_file(tmp_path)
+    make_minutely_file(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.run(order=10)
+def test_read_quote_daily_numpy(tdx_path):
+    """
+    Test for the vectorized decoder of *.day file.
+    """
+    import numpy as np
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        read_quote,
+    )
+
+    result = read_quote(TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Numpy)
+    assert result['date'].dtype == np.dtype('datetime64[D]')
+    assert result['date'][-1] == np.datetime64('2021-07-16')
+    assert result['volume'].dtype == np.int64
+
+    # Same values as the per-record path.
+    tuple_list = list(read_quote(TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Tuple))
+    assert len(tuple_list) == len(DAILY_DATA)
+    for i, item in enumerate(tuple_list):
+        assert item[0] == result['date'][i].astype(dt.date)
+        assert item[1:5] == (result['open'][i], result['high'][i], result['low'][i], result['close'][i])
+        assert item[6] == result['volume'][i]
+
+
+@pytest.mark.run(order=10)
+def test_read_quote_daily_dataframe(tdx_path):
+    """
+    Test for read_quote returning pd.DataFrame.
+    """
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        read_quote,
+    )
+
+    df = read_quote(TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Dataframe)
+    assert list(df.columns) == ['date', 'open', 'high', 'low', 'close', 'amount', 'volume']
+    assert len(df) == len(DAILY_DATA)
+    assert df['close'].iloc[1] == 10.29
+
+
+@pytest.mark.run(order=10)
+def test_read_quote_date_range(tdx_path):
+    """
+    Test for reading a date range from the memory-mapped file.
+    """
+    import numpy as np
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        read_quote,
+        map_quote,
+    )
+
+    record = map_quote(
+        TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day,
+        start=dt.date(2021, 7, 13), end=dt.date(2021, 7, 15)
+    )
+    assert isinstance(record, np.memmap)
+    assert list(record['date']) == [20210713, 20210714]
+
+    result = read_quote(
+        TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Tuple,
+        start=dt.date(2021, 7, 14)
+    )
+    assert [item[0] for item in result] == [dt.date(2021, 7, 14), dt.date(2021, 7, 16)]
+
+    result = read_quote(
+        TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Numpy,
+        end=dt.date(2021, 7, 1)
+    )
+    assert len(result['date']) == 0
+
+
+@pytest.mark.run(order=10)
+def test_read_quote_incremental(tdx_path):
+    """
+    Test for reading appended records only.
+    """
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        TdxQuoteCheckpoint,
+        read_quote_incremental,
+    )
+
+    checkpoint = TdxQuoteCheckpoint(tdx_path.joinpath('checkpoint.json'))
+    arguments = (TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Numpy, checkpoint)
+
+    result, is_full = read_quote_incremental(*arguments)
+    assert is_full is True
+    assert len(result['date']) == len(DAILY_DATA)
+
+    result, is_full = read_quote_incremental(*arguments)
+    assert is_full is False
+    assert len(result['date']) == 0
+
+    # Appended.
+    quote_file = tdx_path.joinpath('vipdoc', 'sh', 'lday', 'sh600000.day')
+    with open(quote_file, 'ab') as f:
+        f.write(struct.pack(r'<IIIIIfII', 20210719, 997, 1001, 990, 1000, 1.0e8, 10000000, 0))
+    result, is_full = read_quote_incremental(*arguments)
+    assert is_full is False
+    assert list(result['close']) == [10.0]
+
+    # Checkpoint persisted.
+    result, is_full = read_quote_incremental(*arguments[:-1], TdxQuoteCheckpoint(checkpoint.checkpoint_file))
+    assert is_full is False
+    assert len(result['date']) == 0
+    assert not checkpoint.checkpoint_file.with_name('checkpoint.json.tmp').exists()
+
+    # Not saved if nothing changed, e.g. an empty file.
+    checkpoint.checkpoint_file.unlink()
+    read_quote_incremental(*arguments)
+    tdx_path.joinpath('vipdoc', 'sh', 'lday', 'sh600036.day').touch()
+    result, is_full = read_quote_incremental(TdxExchangeEnum.SSE, '600036', *arguments[2:])
+    assert len(result['date']) == 0
+    assert not checkpoint.checkpoint_file.exists()
+    checkpoint.save()
+
+    # Rewritten.
+    make_daily_file(tdx_path)
+    result, is_full = read_quote_incremental(*arguments)
+    assert is_full is True
+    assert len(result['date']) == len(DAILY_DATA)
+
+
+@pytest.mark.run(order=10)
+def test_read_market(tdx_path):
+    """
+    Test for reading the whole market as a panel.
+    """
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        scan_quote,
+        read_market,
+    )
+
+    make_daily_file(tdx_path, '600036')
+    assert scan_quote(TdxPeriodEnum.Day) == [(TdxExchangeEnum.SSE, '600000'), (TdxExchangeEnum.SSE, '600036')]
+
+    df = read_market(TdxPeriodEnum.Day, max_workers=2)
+    assert len(df) == 2 * len(DAILY_DATA)
+    assert df['symbol'].dtype == 'category'
+    assert list(df['symbol'].cat.categories) == ['600000', '600036']
+    assert (df['exchange'] == 'SSE').all()
+
+    panel = read_market(TdxPeriodEnum.Day, TdxQuoteTypeEnum.Numpy, max_workers=1)
+    assert list(panel['symbol'][:len(DAILY_DATA) + 1]) == ['600000'] * len(DAILY_DATA) + ['600036']
+    assert (panel['close'] == df['close'].to_numpy()).all()
+
+
+@pytest.mark.run(order=10)
+def test_read_market_minutely(tdx_path):
+    """
+    Test for reading the whole market of minutely quotes.
+    """
+    import numpy as np
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        scan_quote,
+        read_market,
+    )
+
+    make_minutely_file(tdx_path, 'rb2201')
+    assert scan_quote(TdxPeriodEnum.Minute1) == [(TdxExchangeEnum.SHFE, 'rb2110'), (TdxExchangeEnum.SHFE, 'rb2201')]
+
+    df = read_market(TdxPeriodEnum.Minute1, max_workers=2)
+    assert len(df) == 2 * len(MINUTELY_DATA)
+    assert list(df.columns) == ['exchange', 'symbol', 'datetime', 'open', 'high', 'low', 'close', 'amount', 'volume']
+    assert list(df['symbol'][:len(MINUTELY_DATA) + 1]) == ['rb2110'] * len(MINUTELY_DATA) + ['rb2201']
+    assert (df['exchange'] == 'SHFE').all()
+
+    panel = read_market(TdxPeriodEnum.Minute1, TdxQuoteTypeEnum.Numpy, max_workers=1)
+    assert panel['datetime'][0] == np.datetime64('2021-07-15T21:01')
+    assert list(panel['close'][:len(MINUTELY_DATA)]) == [item[5] for item in MINUTELY_DATA]
+    assert len(read_market(TdxPeriodEnum.Minute5, max_workers=1)) == 0
+
+
+@pytest.mark.run(order=10)
+def test_read_quote_cached(tdx_path):
+    """
+    Test for the cache of decoded quotes.
+    """
+    import os
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        TdxQuoteCache,
+        read_quote_cached,
+    )
+
+    cache = TdxQuoteCache(tdx_path.joinpath('cache'))
+    arguments = (TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Numpy, cache)
+
+    result = read_quote_cached(*arguments)
+    assert len(list(cache.cache_path.glob('*.npz'))) == 1
+    assert (read_quote_cached(*arguments)['close'] == result['close']).all()
+
+    # Changed source file replaces the stale entry.
+    quote_file = tdx_path.joinpath('vipdoc', 'sh', 'lday', 'sh600000.day')
+    with open(quote_file, 'ab') as f:
+        f.write(struct.pack(r'<IIIIIfII', 20210719, 997, 1001, 990, 1000, 1.0e8, 10000000, 0))
+    os.utime(quote_file, ns=(0, 0))
+    assert len(read_quote_cached(*arguments)['close']) == len(DAILY_DATA) + 1
+    assert len(list(cache.cache_path.glob('*.npz'))) == 1
+
+    cache.invalidate(quote_file)
+    assert len(list(cache.cache_path.glob('*.npz'))) == 0
+
+    # Evicted when over size.
+    make_daily_file(tdx_path, '600036')
+    small_cache = TdxQuoteCache(cache.cache_path, max_bytes=1)
+    read_quote_cached(TdxExchangeEnum.SSE, '600036', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Numpy, small_cache)
+    assert len(list(cache.cache_path.glob('*.npz'))) == 0
+
+
+@pytest.mark.run(order=10)
+def test_read_quote_minutely(tdx_path):
+    """
+    Test for the vectorized decoder of *.lc1 file, and the agreement of all result types.
+    """
+    import numpy as np
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        read_quote,
+    )
+
+    arguments = (TdxExchangeEnum.SHFE, 'rb2110', TdxPeriodEnum.Minute1)
+    result = read_quote(*arguments, TdxQuoteTypeEnum.Numpy)
+    assert result['datetime'].dtype == np.dtype('datetime64[m]')
+    assert result['datetime'][0] == np.datetime64('2021-07-15T21:01')
+    assert result['datetime'][-1] == np.datetime64('2021-07-16T15:00')
+    assert list(result['high']) == [item[3] for item in MINUTELY_DATA]
+
+    tuple_list = list(read_quote(*arguments, TdxQuoteTypeEnum.Tuple))
+    dict_list = list(read_quote(*arguments, TdxQuoteTypeEnum.Dict))
+    df = read_quote(*arguments, TdxQuoteTypeEnum.Dataframe)
+    assert list(df.columns) == ['datetime', 'open', 'high', 'low', 'close', 'amount', 'volume']
+    for i, item in enumerate(MINUTELY_DATA):
+        assert tuple_list[i] == (
+            result['datetime'][i].astype(dt.datetime).date(),
+            result['datetime'][i].astype(dt.datetime).time(),
+        ) + item[2:8]
+        assert dict_list[i] == {
+            'date': tuple_list[i][0],
+            'time': tuple_list[i][1],
+            'open': item[2],
+            'high': item[3],
+            'low': item[4],
+            'close': item[5],
+            'amount': item[6],
+            'volume': item[7],
+        }
+        assert df['open'].iloc[i] == item[2]
+
+    result = read_quote(*arguments, TdxQuoteTypeEnum.Numpy, start=dt.datetime(2021, 7, 16, 9, 2))
+    assert list(result['close']) == [5613.0, 5601.0]
+
+
+@pytest.mark.run(order=10)
+def test_map_quote_minutely(tdx_path):
+    """
+    Test for bounds of bar time, which cut a zero-copy slice of the memory map.
+    """
+    import numpy as np
+    from InvestmentResearch.collector.reader.tdx import TdxExchangeEnum, TdxPeriodEnum, map_quote
+
+    arguments = (TdxExchangeEnum.SHFE, 'rb2110', TdxPeriodEnum.Minute1)
+    record = map_quote(*arguments, start=dt.datetime(2021, 7, 15, 21, 2), end=dt.datetime(2021, 7, 16, 9, 2))
+    assert list(record['close']) == [5591.0, 5620.0, 5613.0]
+    assert isinstance(record, np.memmap) and not record.flags.owndata
+    assert np.shares_memory(record, record.base)
+
+    record = map_quote(*arguments, start=dt.datetime(2021, 7, 16, 9, 2), end=dt.datetime(2021, 7, 16, 14, 59))
+    assert list(record['close']) == [5613.0]
+    record = map_quote(*arguments, start=dt.date(2021, 7, 16), end=dt.datetime(2021, 7, 16, 9, 0))
+    assert len(record) == 0
+    record = map_quote(*arguments, start=dt.datetime(2021, 7, 16, 10, 0), end=dt.datetime(2021, 7, 15, 23, 0))
+    assert len(record) == 0
+
+
+@pytest.mark.run(order=10)
+def test_quote_file_index(tdx_path):
+    """
+    Test for the index of quote files.
+    """
+    import os
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxPeriodEnum,
+        open_index,
+        build_index,
+        changed_since,
+        symbols_on,
+    )
+
+    database = open_index(tdx_path.joinpath('index.sqlite'))
+    assert build_index() == 2
+    assert build_index() == 0
+
+    result = symbols_on(dt.date(2021, 7, 13))
+    assert [(x.exchange, x.symbol, x.count) for x in result] == [('SSE', '600000', len(DAILY_DATA))]
+    assert result[0].first_date == dt.date(2021, 7, 12)
+    assert result[0].last_date == dt.date(2021, 7, 16)
+    assert symbols_on(dt.date(2021, 7, 15)) == []
+    assert len(symbols_on(dt.date(2021, 7, 15), exact=False)) == 1
+    assert [x.symbol for x in symbols_on(dt.date(2021, 7, 15), TdxPeriodEnum.Minute1)] == ['rb2110']
+
+    # Refreshed incrementally.
+    quote_file = make_daily_file(tdx_path, '600036')
+    os.utime(quote_file, (2e9, 2e9))
+    assert build_index() == 1
+    assert [x.symbol for x in changed_since(dt.datetime.fromtimestamp(1.9e9))] == ['600036']
+
+    quote_file.unlink()
+    assert build_index() == 0
+    assert len(symbols_on(dt.date(2021, 7, 13))) == 1
+    database.close()
+
+
+@pytest.mark.run(order=10)
+def test_read_quote_chunks(tdx_path):
+    """
+    Test for reading in chunks.
+    """
+    import numpy as np
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        read_quote_chunks,
+    )
+
+    chunk_list = list(read_quote_chunks(TdxExchangeEnum.SHFE, 'rb2110', TdxPeriodEnum.Minute1, chunk_rows=2))
+    assert [len(x) for x in chunk_list] == [2, 2, 1]
+    assert chunk_list[0]['close'].dtype == np.float32
+    assert chunk_list[0]['volume'].dtype == np.int64
+    assert [x for chunk in chunk_list for x in chunk['volume']] == [item[7] for item in MINUTELY_DATA]
+
+
+@pytest.mark.run(order=10)
+def test_read_quote_record(tdx_path, capsys):
+    """
+    Test for the compact record type.
+    """
+    import numpy as np
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxExchangeEnum,
+        TdxPeriodEnum,
+        TdxQuoteTypeEnum,
+        Bar,
+        MinuteBar,
+        read_quote,
+        show_quote,
+    )
+
+    series = read_quote(TdxExchangeEnum.SSE, '600000', TdxPeriodEnum.Day, TdxQuoteTypeEnum.Record)
+    assert len(series) == len(DAILY_DATA)
+    assert isinstance(series[0], Bar)
+    assert series[1].day == dt.date(2021, 7, 13)
+    assert series[1].close == 1029
+    assert not hasattr(series[1], '__dict__')
+
+    part = series[1:3]
+    assert len(part) == 2
+    assert np.shares_memory(part.data, series.data)
+    assert [x.volume for x in part] == [21000000, 17500000]
+    assert (part.to_numpy()['close'] == [10.29, 9.9]).all()
+
+    series = read_quote(TdxExchangeEnum.SHFE, 'rb2110', TdxPeriodEnum.Minute1, TdxQuoteTypeEnum.Record)
+    assert isinstance(series[-1], MinuteBar)
+    assert series[-1].moment == dt.datetime(2021, 7, 16, 15, 0)
+    assert series[2].high == 5620500
+
+    show_quote(TdxExchangeEnum.SHFE, 'rb2110', TdxPeriodEnum.Minute1, TdxQuoteTypeEnum.Record)
+    assert capsys.readouterr().out.splitlines()[2].startswith('2021-07-16, 09:01:00, open: 5591.00, high: 5620.50')
+
+
+SETTLE_DATA: str = '\t'.join(
+    ['发生日期', '业务名称', '发生金额', '剩余金额', '币种', '证券代码', '证券名称', '买卖标志',
+     '成交价格', '成交数量', '佣金', '印花税', '过户费', '其他费']
+) + '\n' + '\n'.join(
+    [
+        '\t'.join(['="20210712"', '="证券买入"', '="-10015.00"', '89985.00', '="人民币"', '="600000"', '="浦发银行"',
+                   '="买入"', '10.01', '1000', '5.00', '0.00', '0.20', '0.00']),
+        '\t'.join(['="20210716"', '="证券卖出"', '10251.94', '100236.94', '="人民币"', '="600000"', '="浦发银行"',
+                   '="卖出"', '10.27', '1000', '5.00', '10.27', '0.20', '0.00']),
+    ]
+) + '\n'
+
+
+@pytest.mark.run(order=10)
+def test_read_record(tmp_path):
+    """
+    Test for reading record files, row by row and vectorized.
+    """
+    from InvestmentResearch.collector.reader.tdx import (
+        TdxRecordTypeEnum,
+        iter_record,
+        read_record,
+        read_record_dataframe,
+    )
+
+    record_file = tmp_path.joinpath('settle.txt')
+    record_file.write_text(SETTLE_DATA, encoding='gbk')
+
+    record_list = read_record(record_file, TdxRecordTypeEnum.Settle)
+    assert record_list == list(iter_record(record_file, TdxRecordTypeEnum.Settle))
+    assert record_list[0]['date'] == dt.date(2021, 7, 12)
+    assert record_list[0]['change'] == -10015.0
+    assert record_list[1]['change'] == 10251.94
+    assert record_list[1]['name'] == '浦发银行'
+
+    df = read_record_dataframe(record_file, TdxRecordTypeEnum.Settle)
+    assert list(df.columns) == list(record_list[0].keys())
+    for i, record in enumerate(record_list):
+        row = df.iloc[i].to_dict()
+        row['date'] = row['date'].date()
+        assert row == record
@@ -0,0 +1,82 @@
+# -*- coding: UTF-8 -*-
+
+__author__ = 'Bruce Frank Wong'
+
+
+import pytest
+
+import datetime as dt
+
+
+@pytest.mark.run(order=16)
+def test_trading_calendar():
+    """
+    Test for trading-day arithmetic of the calendar from holiday.csv.
+    """
+    from InvestmentResearch.trading_calendar import trading_calendar
+
+    calendar = trading_calendar('CHN')
+    assert trading_calendar('SHFE').trading_day_list(calendar.begin, calendar.end) == \
+        calendar.trading_day_list(calendar.begin, calendar.end)
+
+    # 国庆节 2021-10-01 to 2021-10-07, Friday 2021-10-08 is a trading day.
+    assert calendar.is_trading_day(dt.date(2021, 9, 30))
+    assert not calendar.is_trading_day(dt.date(2021, 10, 4))
+    assert not calendar.is_trading_day(dt.date(2021, 10, 9))
+    assert calendar.next(dt.date(2021, 9, 30)) == dt.date(2021, 10, 8)
+    assert calendar.next(dt.date(2021, 10, 3)) == dt.date(2021, 10, 8)
+    assert calendar.prev(dt.date(2021, 10, 8)) == dt.date(2021, 9, 30)
+    assert calendar.prev(dt.date(2021, 10, 9)) == dt.date(2021, 10, 8)
+    assert calendar.shift(dt.date(2021, 9, 30), 1) == dt.date(2021, 10, 8)
+    assert calendar.shift(dt.date(2021, 10, 3), 1) == dt.date(2021, 10, 8)
+    assert calendar.shift(dt.date(2021, 10, 3), -1) == dt.date(2021, 9, 30)
+    assert calendar.shift(dt.date(2021, 10, 3), 0) == dt.date(2021, 10, 8)
+    assert calendar.shift(dt.date(2021, 10, 8), 0) == dt.date(2021, 10, 8)
+    assert calendar.trading_days_between(dt.date(2021, 9, 27), dt.date(2021, 10, 10)) == 5
+    assert calendar.trading_days_between(dt.date(2021, 10, 10), dt.date(2021, 9, 27)) == 0
+    assert calendar.trading_day_list(dt.date(2021, 9, 29), dt.date(2021, 10, 11)) == [
+        dt.date(2021, 9, 29), dt.date(2021, 9, 30), dt.date(2021, 10, 8), dt.date(2021, 10, 11)
+    ]
+
+    with pytest.raises(ValueError):
+        calendar.is_trading_day(dt.date(1990, 1, 1))
+    with pytest.raises(ValueError):
+        calendar.prev(calendar.begin)
+
+
+@pytest.mark.run(order=16)
+def test_trading_calendar_array():
+    """
+    Test for vectorized queries, against numpy business days of the same holidays.
+    """
+    import numpy as np
+    from InvestmentResearch.trading_calendar import TradingCalendar
+
+    holiday_list = [
+        (dt.date(2021, 1, 1), dt.date(2021, 1, 3)),
+        (dt.date(2021, 2, 11), dt.date(2021, 2, 17)),
+        (dt.date(2021, 2, 15), dt.date(2021, 2, 19)),
+    ]
+    begin, end = dt.date(2020, 12, 1), dt.date(2021, 3, 31)
+    calendar = TradingCalendar.from_holiday(holiday_list, begin, end)
+    holiday = np.concatenate([np.arange(x, y + dt.timedelta(days=1), dtype='datetime64[D]') for x, y in holiday_list])
+    busday = np.busdaycalendar(holidays=holiday)
+
+    day = np.arange(np.datetime64('2020-12-10'), np.datetime64('2021-03-20'))
+    assert (calendar.is_trading_day_array(day) == np.is_busday(day, busdaycal=busday)).all()
+    assert (calendar.next_array(day) == np.busday_offset(day, 1, roll='backward', busdaycal=busday)).all()
+    assert (calendar.prev_array(day) == np.busday_offset(day, -1, roll='forward', busdaycal=busday)).all()
+    for n in (-7, -1, 1, 7):
+        roll = 'backward' if n > 0 else 'forward'
+        assert (calendar.shift_array(day, n) == np.busday_offset(day, n, roll=roll, busdaycal=busday)).all()
+    assert (calendar.shift_array(day, 0) == np.busday_offset(day, 0, roll='forward', busdaycal=busday)).all()
+    assert (
+        calendar.trading_days_between_array(day, day + 10) == np.busday_count(day, day + 11, busdaycal=busday)
+    ).all()
+    assert [calendar.shift(x, 3) for x in day.tolist()] == calendar.shift_array(day, 3).tolist()
+
+    trading_day = calendar.trading_day_list(begin, end)
+    assert calendar.trading_day_list(begin, end) == \
+        TradingCalendar.from_trading_day(trading_day, begin, end).trading_day_list(begin, end)
+    with pytest.raises(ValueError):
+        calendar.next_array(np.array(['2021-03-31'], dtype='datetime64[D]'))